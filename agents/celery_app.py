@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+from contextlib import AbstractContextManager
+from typing import Any
+
 import duckdb
 from celery import Celery
 
 from agents.config import AgentConfig
 from agents.supervisor.schedule import BEAT_SCHEDULE
+from libs.storage.connection import get_manager
 from libs.storage.schema import init_schema
 
 config = AgentConfig()
@@ -13,18 +17,27 @@ _schema_initialized = False
 
 
 def get_worker_conn() -> duckdb.DuckDBPyConnection:
-    """Open a fresh DuckDB write connection for a task.
+    """Open a cursor on the process-wide database for a task.
 
-    Caller must close the connection when done.
+    Caller must close the cursor when done; the database itself stays open.
     """
     global _schema_initialized  # noqa: PLW0603
-    conn = duckdb.connect(config.db_path)
+    conn = get_manager(config.db_path).open_cursor()
     if not _schema_initialized:
         init_schema(conn)
         _schema_initialized = True
     return conn
 
 
+def write_lock() -> AbstractContextManager[Any]:
+    """The process-wide DuckDB write lock.
+
+    Tasks that spend most of a run on network calls hold it only around their
+    writes, so other tasks can use the database while they wait.
+    """
+    return get_manager(config.db_path).write_lock
+
+
 app = Celery("divyadrishti")
 app.autodiscover_tasks([
     "agents.trend_scout",
@@ -39,6 +52,7 @@ app.autodiscover_tasks([
     "agents.rollup_accountant",
 ], related_name="tasks")
 app.autodiscover_tasks(["agents.trend_scout"], related_name="backfill")
+app.autodiscover_tasks(["agents.thread_harvester"], related_name="firehose")
 app.conf.update(
     broker_url=config.redis_url,
     result_backend=config.redis_url,
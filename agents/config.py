@@ -5,5 +5,18 @@ class AgentConfig(BaseSettings):
     redis_url: str = "redis://localhost:6379/0"
     db_path: str = "divyadrishti.duckdb"
     author_salt: str = "default-salt"
+    harvest_concurrency: int = 16
+    firehose_batch_size: int = 1000  # new item ids fetched per run
+    firehose_concurrency: int = 32
+    opinion_batches_per_run: int = 8
+    opinion_concurrency: int = 4
+    embedding_concurrency: int = 4
+    embedding_encoding: str = "float32"  # float32 | float16 | int8
+    backfill_window_seconds: int = 21600
+    backfill_windows_per_run: int = 8
+    backfill_concurrency: int = 4
+    scheduler_workers: int = 1
+    pipeline_mode: bool = False  # react to upstream events instead of polling sweeps
+    cold_tier_age_days: int = 90  # items older than this move to Parquet
 
     model_config = {"env_prefix": "DD_"}
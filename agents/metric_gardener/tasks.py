@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import uuid
 
-from agents.celery_app import app, get_worker_conn
+from agents.celery_app import app, get_worker_conn, write_lock
 from agents.metric_gardener.topic_discovery import (
     anchor_topics,
     discover_topics,
@@ -51,36 +51,36 @@ def garden_metrics() -> int:
         to_create, to_update, to_retire = reconcile_topics(anchored, existing)
 
         count = 0
-
-        # Create new nodes
-        for topic in to_create:
-            node_id = f"auto-{uuid.uuid4().hex[:12]}"
-            node_repo.upsert(MetricNode(
-                node_id=node_id,
-                label=str(topic.get("label", "")),
-                definition=str(topic.get("definition", "")),
-                centroid=topic.get("centroid", []),  # type: ignore[arg-type]
-                status="active",
-            ))
-            count += 1
-
-        # Update merged nodes
-        for update in to_update:
-            node_repo.upsert(MetricNode(
-                node_id=str(update["node_id"]),
-                label=str(update.get("label", "")),
-                definition=str(update.get("definition", "")),
-                centroid=update.get("centroid", []),  # type: ignore[arg-type]
-                status="active",
-            ))
-            count += 1
-
-        # Retire stale nodes
-        for node_id in to_retire:
-            existing_node = node_repo.get_by_id(node_id)
-            if existing_node:
-                existing_node.status = "retired"
-                node_repo.upsert(existing_node)
+        with write_lock():
+            # Create new nodes
+            for topic in to_create:
+                node_id = f"auto-{uuid.uuid4().hex[:12]}"
+                node_repo.upsert(MetricNode(
+                    node_id=node_id,
+                    label=str(topic.get("label", "")),
+                    definition=str(topic.get("definition", "")),
+                    centroid=topic.get("centroid", []),  # type: ignore[arg-type]
+                    status="active",
+                ))
+                count += 1
+
+            # Update merged nodes
+            for update in to_update:
+                node_repo.upsert(MetricNode(
+                    node_id=str(update["node_id"]),
+                    label=str(update.get("label", "")),
+                    definition=str(update.get("definition", "")),
+                    centroid=update.get("centroid", []),  # type: ignore[arg-type]
+                    status="active",
+                ))
+                count += 1
+
+            # Retire stale nodes
+            for node_id in to_retire:
+                existing_node = node_repo.get_by_id(node_id)
+                if existing_node:
+                    existing_node.status = "retired"
+                    node_repo.upsert(existing_node)
 
         return count
     finally:
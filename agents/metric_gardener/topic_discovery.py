@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import json
+from collections.abc import Sequence
 
+import numpy as np
+
+from libs.nlp.embeddings import cosine_similarity_matrix
+from libs.nlp.embeddings import get_model as get_embedding_model
 from libs.nlp.navigator import get_client, get_labeling_model
-from libs.nlp.embeddings import cosine_similarity, get_model as get_embedding_model
 
 _DISCOVER_PROMPT = """\
 You are a topic analyst for a Hacker News intelligence dashboard.
@@ -78,12 +82,21 @@ def anchor_topics(topics: list[dict[str, object]]) -> list[dict[str, object]]:
     return topics
 
 
+def _as_vector(value: object) -> np.ndarray | None:
+    """``value`` as a float32 vector, or None if it is not a non-empty one."""
+    if isinstance(value, (list, np.ndarray)) and len(value) > 0:
+        return np.asarray(value, dtype=np.float32)
+    return None
+
+
 def reconcile_topics(
-    new_topics: list[dict[str, object]],
-    existing_nodes: list[tuple[str, str, list[float]]],
+    new_topics: Sequence[dict[str, object]],
+    existing_nodes: Sequence[tuple[str, str, Sequence[float] | np.ndarray]],
 ) -> tuple[list[dict[str, object]], list[dict[str, object]], list[str]]:
     """Phase 3: Match new topics against existing nodes.
 
+    All topics are scored against all nodes with one similarity matrix.
+
     Args:
         new_topics: Topics with centroids from anchor_topics().
         existing_nodes: List of (node_id, label, centroid) for active nodes.
@@ -95,31 +108,30 @@ def reconcile_topics(
     to_update: list[dict[str, object]] = []
     matched_existing: set[str] = set()
 
-    for topic in new_topics:
-        centroid = topic.get("centroid")
-        if not centroid or not isinstance(centroid, list):
-            continue
-
-        best_sim = -1.0
-        best_node_id = None
-        best_label = None
-
-        for node_id, label, existing_centroid in existing_nodes:
-            if not existing_centroid:
-                continue
-            sim = cosine_similarity(centroid, existing_centroid)
-            if sim > best_sim:
-                best_sim = sim
-                best_node_id = node_id
-                best_label = label
-
-        if best_sim >= _MERGE_THRESHOLD and best_node_id is not None:
+    topics = [(t, v) for t in new_topics if (v := _as_vector(t.get("centroid"))) is not None]
+    nodes = [
+        (node_id, label, v)
+        for node_id, label, c in existing_nodes if (v := _as_vector(c)) is not None
+    ]
+    if not topics:
+        sims = np.empty((0, 0), dtype=np.float32)
+    elif not nodes:
+        sims = np.empty((len(topics), 0), dtype=np.float32)
+    else:
+        sims = cosine_similarity_matrix(
+            np.stack([v for _, v in topics]), np.stack([v for _, _, v in nodes]),
+        )
+
+    for row, (topic, _) in enumerate(topics):
+        best = int(np.argmax(sims[row])) if nodes else -1
+        if best >= 0 and sims[row, best] >= _MERGE_THRESHOLD:
+            best_node_id, best_label, _ = nodes[best]
             matched_existing.add(best_node_id)
             to_update.append({
                 "node_id": best_node_id,
                 "label": topic.get("label", best_label),
                 "definition": topic.get("definition", ""),
-                "centroid": centroid,
+                "centroid": topic["centroid"],
             })
         else:
             to_create.append(topic)
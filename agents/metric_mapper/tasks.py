@@ -1,81 +1,164 @@
 from __future__ import annotations
 
+import asyncio
 import time
-
-from agents.celery_app import app, get_worker_conn
-from libs.nlp.embeddings import cosine_similarity, get_model, softmax_weights
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+from redis import Redis
+
+from agents.celery_app import app, get_worker_conn, write_lock
+from agents.config import AgentConfig
+from agents.pipeline import run_limit, scope_to_items
+from libs.events.channels import METRIC_MAPPING, STREAM_MAXLEN
+from libs.events.publisher import EventPublisher
+from libs.nlp.embeddings import get_model, normalize_rows, softmax_rows
 from libs.nlp.navigator import get_embedding_model
-from libs.schemas.embedding import Embedding
 from libs.schemas.item_metric_edge import ItemMetricEdge
 from libs.storage.embedding_repository import EmbeddingRepository
+from libs.storage.inference_cache_repository import InferenceCacheRepository
 from libs.storage.item_metric_edge_repository import ItemMetricEdgeRepository
 from libs.storage.metric_node_repository import MetricNodeRepository
+from libs.storage.pipeline_queue_repository import MAPPING, PipelineQueueRepository
+from libs.storage.vector_index import get_index
+from libs.utils.text_clean import content_hash
+
+if TYPE_CHECKING:
+    import duckdb
 
 _TOP_K = 5
 _MIN_WEIGHT = 0.12
 
 
+def _centroid_matrix(
+    centroids: Sequence[tuple[str, Sequence[float] | np.ndarray]],
+) -> tuple[list[str], np.ndarray]:
+    """Stack centroids into an L2-normalized (nodes x dim) float32 matrix."""
+    usable = [(node_id, c) for node_id, c in centroids if len(c)]
+    node_ids = [node_id for node_id, _ in usable]
+    if not usable:
+        return node_ids, np.empty((0, 0), dtype=np.float32)
+    matrix = np.asarray([c for _, c in usable], dtype=np.float32)
+    return node_ids, normalize_rows(matrix)
+
+
+def _top_k_edges(
+    item_ids: list[int],
+    vectors: np.ndarray,
+    node_ids: list[str],
+    centroids: np.ndarray,
+    created_at: int,
+) -> list[ItemMetricEdge]:
+    """Map each item to its top-K nearest nodes with softmax edge weights."""
+    sims = normalize_rows(vectors) @ centroids.T  # (items x nodes) cosine similarity
+    k = min(_TOP_K, len(node_ids))
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_sims, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    weights = softmax_rows(np.take_along_axis(top_sims, order, axis=1))
+
+    edges: list[ItemMetricEdge] = []
+    for row, item_id in enumerate(item_ids):
+        for idx, w in zip(top[row], weights[row], strict=True):
+            if w >= _MIN_WEIGHT:
+                edges.append(ItemMetricEdge(
+                    item_id=item_id, node_id=node_ids[idx],
+                    weight=round(float(w), 4), created_at=created_at,
+                ))
+    return edges
+
+
+def _encode_cached(
+    conn: duckdb.DuckDBPyConnection,
+    texts: list[str],
+    model_version: str,
+    now: int,
+    concurrency: int,
+    encoding: str = "float32",
+) -> np.ndarray:
+    """Embed ``texts``, paying the API only for content not already in the cache.
+
+    New vectors are cached in ``encoding``, like the embedding table.
+    """
+    cache = InferenceCacheRepository(conn, encoding=encoding)
+    hashes = [content_hash(t) for t in texts]
+    known = cache.get_embeddings(hashes, model_version)
+    missing = list({h: t for h, t in zip(hashes, texts, strict=True) if h not in known}.items())
+    if missing:
+        fresh = asyncio.run(get_model().aencode_batch([t for _, t in missing], concurrency))
+        with write_lock():
+            cache.put_embeddings([h for h, _ in missing], fresh, model_version, now)
+        known.update(zip((h for h, _ in missing), fresh, strict=True))
+    return np.stack([known[h] for h in hashes])
+
+
 @app.task(name="metric_mapper.map_items_to_metrics")
-def map_items_to_metrics(batch_size: int = 50) -> int:
-    """Embed items and map them to metric nodes."""
+def map_items_to_metrics(batch_size: int = 256, item_ids: list[int] | None = None) -> int:
+    """Embed queued items and map them to metric nodes.
+
+    Embedding requests are chunked and sent concurrently, so a run can claim
+    several provider-sized batches at once. ``item_ids`` limits the run to
+    those items (pipeline mode).
+    """
+    if item_ids == []:
+        return 0
+    config = AgentConfig()
     conn = get_worker_conn()
-    emb_repo = EmbeddingRepository(conn)
     node_repo = MetricNodeRepository(conn)
     edge_repo = ItemMetricEdgeRepository(conn)
+    queue = PipelineQueueRepository(conn)
 
     try:
-        # find items with text_clean but no embedding
-        rows = conn.execute(
-            "SELECT h.id, h.text_clean FROM hn_item h "
-            "LEFT JOIN embedding e ON h.id = e.item_id "
-            "WHERE h.text_clean IS NOT NULL AND e.item_id IS NULL "
-            "LIMIT ?",
-            [batch_size],
+        scope, params = scope_to_items("q.item_id", item_ids)
+        queued = conn.execute(
+            "SELECT h.id, h.text_clean FROM pipeline_queue q "
+            "JOIN hn_item h ON q.item_id = h.id "
+            f"WHERE q.stage = ? {scope}LIMIT ?",
+            [MAPPING, *params, run_limit(batch_size, item_ids)],
         ).fetchall()
-
+        rows = [r for r in queued if r[1] is not None]
         if not rows:
+            with write_lock():
+                queue.complete(MAPPING, [r[0] for r in queued])
             return 0
 
-        model = get_model()
-        item_ids = [r[0] for r in rows]
-        texts = [r[1] for r in rows]
-        vectors = model.encode_batch(texts)
-
-        # get all active centroids
-        centroids = node_repo.get_all_centroids()
+        index = get_index(conn, config.db_path)
+        emb_repo = EmbeddingRepository(conn, index=index, encoding=config.embedding_encoding)
         now = int(time.time())
-        count = 0
-
-        for item_id, vec in zip(item_ids, vectors):
-            emb_repo.upsert(Embedding(
-                item_id=item_id, embedding=vec,
-                model_version=get_embedding_model(),
-            ))
-
-            if not centroids:
-                count += 1
-                continue
-
-            # compute similarities
-            sims = [cosine_similarity(vec, c) for _, c in centroids]
-
-            # top-K indices
-            indexed = sorted(enumerate(sims), key=lambda x: x[1], reverse=True)[:_TOP_K]
-            top_indices = [i for i, _ in indexed]
-            top_sims = [sims[i] for i in top_indices]
-
-            # softmax weights
-            weights = softmax_weights(top_sims)
-
-            for idx, w in zip(top_indices, weights):
-                if w >= _MIN_WEIGHT:
-                    node_id = centroids[idx][0]
-                    edge_repo.upsert(ItemMetricEdge(
-                        item_id=item_id, node_id=node_id,
-                        weight=round(w, 4), created_at=now,
-                    ))
-            count += 1
-
-        return count
+        mapped_ids = [r[0] for r in rows]
+        model_version = get_embedding_model()
+        vectors = _encode_cached(
+            conn, [r[1] for r in rows], model_version, now, config.embedding_concurrency,
+            config.embedding_encoding,
+        )
+
+        # all active centroids, normalized once for the whole batch
+        node_ids, centroids = node_repo.get_centroid_matrix()
+        edges: list[ItemMetricEdge] = []
+        if node_ids:
+            edges = _top_k_edges(
+                mapped_ids, vectors, node_ids, normalize_rows(centroids), now,
+            )
+        with write_lock():
+            emb_repo.upsert_vectors(
+                np.asarray(mapped_ids), vectors, [model_version] * len(mapped_ids),
+            )
+            edge_repo.upsert_many(edges)
+            queue.complete(MAPPING, [r[0] for r in queued])
+        index.maybe_save()
+
+        redis = Redis.from_url(config.redis_url)
+        try:
+            EventPublisher(redis).publish(METRIC_MAPPING, {
+                "items_count": len(mapped_ids),
+                "edges_count": len(edges),
+                "item_ids": mapped_ids,
+                "node_ids": sorted({e.node_id for e in edges}),
+            }, maxlen=STREAM_MAXLEN)
+        finally:
+            redis.close()
+        return len(mapped_ids)
     finally:
         conn.close()
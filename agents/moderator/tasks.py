@@ -3,29 +3,43 @@ from __future__ import annotations
 import time
 
 from agents.celery_app import app, get_worker_conn
+from agents.pipeline import publish_downstream, run_limit, scope_to_items
+from libs.events.channels import HN_MODERATED
 from libs.schemas.moderation_flag import ModerationFlag
 from libs.storage.moderation_flag_repository import ModerationFlagRepository
+from libs.storage.pipeline_queue_repository import MODERATE, PipelineQueueRepository
 from libs.utils.moderation import check_offensive, redact_pii
 
 
 @app.task(name="moderator.moderate_items")
-def moderate_items(batch_size: int = 100) -> int:
-    """Scan text_clean for PII and offensive content."""
+def moderate_items(batch_size: int = 100, item_ids: list[int] | None = None) -> int:
+    """Scan text_clean of queued items for PII and offensive content.
+
+    ``item_ids`` limits the run to those items (pipeline mode). Items that are
+    not blocked are queued for the NLP stages, after redaction; nothing else
+    queues them, so no unmoderated text reaches an outside model.
+    """
+    if item_ids == []:
+        return 0
     conn = get_worker_conn()
     repo = ModerationFlagRepository(conn)
+    queue = PipelineQueueRepository(conn)
 
     try:
+        scope, params = scope_to_items("q.item_id", item_ids)
         rows = conn.execute(
-            "SELECT h.id, h.text_clean FROM hn_item h "
-            "LEFT JOIN moderation_flag m ON h.id = m.item_id "
-            "WHERE h.text_clean IS NOT NULL AND m.item_id IS NULL "
-            "LIMIT ?",
-            [batch_size],
+            "SELECT h.id, h.text_clean FROM pipeline_queue q "
+            "JOIN hn_item h ON q.item_id = h.id "
+            f"WHERE q.stage = ? {scope}LIMIT ?",
+            [MODERATE, *params, run_limit(batch_size, item_ids)],
         ).fetchall()
 
         now = int(time.time())
         count = 0
+        passed: list[int] = []
         for item_id, text_clean in rows:
+            if text_clean is None:
+                continue
             is_offensive, reason = check_offensive(text_clean)
             if is_offensive:
                 repo.upsert(ModerationFlag(
@@ -33,6 +47,7 @@ def moderate_items(batch_size: int = 100) -> int:
                     reason=reason, flagged_at=now,
                 ))
             else:
+                passed.append(item_id)
                 redacted = redact_pii(text_clean)
                 if redacted != text_clean:
                     conn.execute(
@@ -48,6 +63,8 @@ def moderate_items(batch_size: int = 100) -> int:
                         item_id=item_id, status="clean", flagged_at=now,
                     ))
             count += 1
+        queue.advance(MODERATE, [r[0] for r in rows], passed, now)
+        publish_downstream(HN_MODERATED, passed)
         return count
     finally:
         conn.close()
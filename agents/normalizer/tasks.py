@@ -1,37 +1,53 @@
 from __future__ import annotations
 
+import time
+
 from agents.celery_app import app, get_worker_conn
+from agents.pipeline import publish_downstream, run_limit, scope_to_items
+from libs.events.channels import HN_NORMALIZED
+from libs.storage.pipeline_queue_repository import NORMALIZE, PipelineQueueRepository
 from libs.utils.text_clean import clean_hn_html, content_hash
 
 
 @app.task(name="normalizer.normalize_items")
-def normalize_items(batch_size: int = 100) -> int:
-    """Clean text for items that have raw text but no text_clean."""
+def normalize_items(batch_size: int = 100, item_ids: list[int] | None = None) -> int:
+    """Clean text for items queued for normalization.
+
+    ``item_ids`` limits the run to those items (pipeline mode).
+    """
+    if item_ids == []:
+        return 0
     conn = get_worker_conn()
+    queue = PipelineQueueRepository(conn)
 
     try:
+        scope, params = scope_to_items("q.item_id", item_ids)
         rows = conn.execute(
-            'SELECT id, "text" FROM hn_item '
-            'WHERE "text" IS NOT NULL AND text_clean IS NULL '
-            "LIMIT ?",
-            [batch_size],
+            'SELECT h.id, h."text", h.text_clean FROM pipeline_queue q '
+            "JOIN hn_item h ON q.item_id = h.id "
+            f"WHERE q.stage = ? {scope}LIMIT ?",
+            [NORMALIZE, *params, run_limit(batch_size, item_ids)],
         ).fetchall()
 
         seen_hashes: set[str] = set()
-        count = 0
-        for item_id, text in rows:
-            cleaned = clean_hn_html(text)
-            if not cleaned:
-                continue
-            h = content_hash(cleaned)
-            if h in seen_hashes:
-                continue
-            seen_hashes.add(h)
-            conn.execute(
-                "UPDATE hn_item SET text_clean = ? WHERE id = ?",
-                [cleaned, item_id],
-            )
-            count += 1
-        return count
+        normalized: list[int] = []
+        done: list[int] = []
+        for item_id, text, text_clean in rows:
+            cleaned = clean_hn_html(text) if text and text_clean is None else ""
+            if cleaned:
+                h = content_hash(cleaned)
+                if h in seen_hashes:
+                    continue  # duplicate within this batch; stays queued for the next
+                seen_hashes.add(h)
+                conn.execute(
+                    "UPDATE hn_item SET text_clean = ? WHERE id = ?",
+                    [cleaned, item_id],
+                )
+                normalized.append(item_id)
+            done.append(item_id)
+
+        queue.advance(NORMALIZE, done, normalized, int(time.time()))
+        publish_downstream(HN_NORMALIZED, normalized)
+        return len(normalized)
     finally:
         conn.close()
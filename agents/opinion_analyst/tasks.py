@@ -1,53 +1,157 @@
 from __future__ import annotations
 
+import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
-from agents.celery_app import app, get_worker_conn
+from agents.celery_app import app, get_worker_conn, write_lock
+from agents.config import AgentConfig
+from agents.pipeline import publish_downstream, run_limit, scope_to_items
+from libs.events.channels import NLP_OPINION
+from libs.nlp.navigator import get_opinion_model
 from libs.nlp.sentiment import get_model
 from libs.schemas.opinion_signal import OpinionSignal
+from libs.storage.inference_cache_repository import InferenceCacheRepository
 from libs.storage.opinion_signal_repository import OpinionSignalRepository
+from libs.storage.pipeline_queue_repository import SENTIMENT, PipelineQueueRepository
+from libs.utils.text_clean import content_hash
+
+if TYPE_CHECKING:
+    from libs.nlp.sentiment import SentimentModel
+
+logger = logging.getLogger(__name__)
 
 # Only analyze items within the month rollup window — older items can't affect metrics
 _MAX_AGE_SECS = 30 * 86400
+# Runs a text may go unscored before it gets a neutral signal instead
+_MAX_ATTEMPTS = 3
+_FALLBACK_VERSION = "fallback"
+
+_DISCARD_EXPIRED_SQL = """
+DELETE FROM pipeline_queue
+WHERE stage = ? AND item_id IN (
+    SELECT q.item_id FROM pipeline_queue q
+    JOIN hn_item h ON q.item_id = h.id
+    WHERE q.stage = ? AND (h."time" IS NULL OR h."time" < ? OR h.text_clean IS NULL)
+)
+"""
+
+
+def _predict_shards(
+    model: SentimentModel,
+    texts: list[str],
+    batch_size: int,
+    concurrency: int,
+) -> list[OpinionSignal | None]:
+    """Score ``texts`` in ``batch_size`` shards, at most ``concurrency`` in flight.
+
+    Results keep input order. A shard that still fails after the model's own
+    retries yields ``None`` for its texts, as does a text the model skipped,
+    so they stay pending (and uncached) for the next run.
+    """
+    shards = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    def predict(shard: list[str]) -> list[OpinionSignal | None]:
+        try:
+            return list(model.predict_batch(shard))
+        except Exception:
+            logger.exception("Sentiment shard of %d texts failed", len(shard))
+            return [None] * len(shard)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(shards)))) as pool:
+        return [signal for result in pool.map(predict, shards) for signal in result]
 
 
 @app.task(name="opinion_analyst.analyze_opinions")
-def analyze_opinions(batch_size: int = 50) -> int:
-    """Run sentiment analysis on items with text_clean but no opinion_signal."""
+def analyze_opinions(batch_size: int = 50, item_ids: list[int] | None = None) -> int:
+    """Run sentiment analysis on items queued for it.
+
+    Each run claims up to ``opinion_batches_per_run`` batches of the newest
+    backlog, or just ``item_ids`` in pipeline mode. Texts already scored (by
+    content hash) come from the cache; the rest are scored concurrently and
+    cached. A text the model has not scored after ``_MAX_ATTEMPTS`` runs gets
+    a neutral signal so it stops holding its queue row.
+    """
+    if item_ids == []:
+        return 0
+    config = AgentConfig()
     conn = get_worker_conn()
     repo = OpinionSignalRepository(conn)
+    cache = InferenceCacheRepository(conn)
+    queue = PipelineQueueRepository(conn)
 
     try:
-        cutoff = int(time.time()) - _MAX_AGE_SECS
+        now = int(time.time())
+        cutoff = now - _MAX_AGE_SECS
+        # too old to affect any rollup window: drop rather than score
+        with write_lock():
+            conn.execute(_DISCARD_EXPIRED_SQL, [SENTIMENT, SENTIMENT, cutoff])
+        scope, params = scope_to_items("q.item_id", item_ids)
         rows = conn.execute(
-            "SELECT h.id, h.text_clean FROM hn_item h "
-            "LEFT JOIN opinion_signal o ON h.id = o.item_id "
-            'WHERE h.text_clean IS NOT NULL AND o.item_id IS NULL AND h."time" >= ? '
-            'ORDER BY h."time" DESC '
+            "SELECT h.id, h.text_clean FROM pipeline_queue q "
+            "JOIN hn_item h ON q.item_id = h.id "
+            f'WHERE q.stage = ? AND h.text_clean IS NOT NULL {scope}ORDER BY h."time" DESC '
             "LIMIT ?",
-            [cutoff, batch_size],
+            [SENTIMENT, *params,
+             run_limit(batch_size * config.opinion_batches_per_run, item_ids)],
         ).fetchall()
 
         if not rows:
             return 0
 
         item_ids = [r[0] for r in rows]
-        texts = [r[1] for r in rows]
+        hashes = [content_hash(r[1]) for r in rows]
 
-        model = get_model()
-        signals = model.predict_batch(texts)
+        # cache entries are only valid for the model that produced them
+        model_version = get_opinion_model()
+        known: dict[str, OpinionSignal | None] = dict(cache.get_sentiments(hashes, model_version))
+        missing = list(
+            {h: r[1] for h, r in zip(hashes, rows, strict=True) if h not in known}.items(),
+        )
+        if missing:
+            fresh = _predict_shards(
+                get_model(), [t for _, t in missing], batch_size, config.opinion_concurrency,
+            )
+            scored = [(h, s) for (h, _), s in zip(missing, fresh, strict=True) if s is not None]
+            with write_lock():
+                cache.put_sentiments(
+                    [h for h, _ in scored], [s for _, s in scored], model_version, now,
+                )
+            known.update(zip((h for h, _ in missing), fresh, strict=True))
 
-        count = 0
-        for item_id, signal in zip(item_ids, signals):
-            repo.upsert(OpinionSignal(
+        signals = [known[h] for h in hashes]
+        unscored = [item_id for item_id, s in zip(item_ids, signals, strict=True) if s is None]
+        with write_lock():
+            exhausted = set(queue.fail(SENTIMENT, unscored, _MAX_ATTEMPTS))
+        if exhausted:
+            logger.warning(
+                "No sentiment for %d items after %d attempts; scoring them neutral",
+                len(exhausted), _MAX_ATTEMPTS,
+            )
+        # neutral with zero confidence, and not cached: other copies of the text still get a score
+        signals = [
+            OpinionSignal(item_id=item_id, model_version=_FALLBACK_VERSION)
+            if s is None and item_id in exhausted else s
+            for item_id, s in zip(item_ids, signals, strict=True)
+        ]
+        results = [
+            OpinionSignal(
                 item_id=item_id,
                 valence=signal.valence,
                 intensity=signal.intensity,
                 confidence=signal.confidence,
                 label=signal.label,
                 model_version=signal.model_version,
-            ))
-            count += 1
-        return count
+                analyzed_at=now,
+            )
+            for item_id, signal in zip(item_ids, signals, strict=True)
+            if signal is not None
+        ]
+        with write_lock():
+            repo.upsert_many(results)
+            queue.complete(SENTIMENT, [r.item_id for r in results])
+        publish_downstream(NLP_OPINION, [r.item_id for r in results])
+        return len(results)
     finally:
         conn.close()
@@ -0,0 +1,259 @@
+"""Event-driven pipeline mode.
+
+With ``DD_PIPELINE_MODE`` on, each processing stage reacts to the item ids
+its upstream stage published instead of waiting for its next scheduled sweep
+of ``pipeline_queue``::
+
+    hn.content -> normalize -> hn.normalized -> moderate -> hn.moderated
+    hn.moderated -> sentiment -> nlp.opinion ----------\\
+    hn.moderated -> embed + map -> metric.mapping ------> rollups for touched nodes
+
+Moderation runs before the NLP stages so only redacted text leaves the
+process. Every stage is its own consumer group, so each one sees every
+upstream event, and reads block on Redis rather than polling. The scheduler's
+sweeps keep running at a slow cadence to pick up anything published while
+no consumer was listening.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
+from typing import Any
+
+from redis import Redis
+
+from agents.config import AgentConfig
+from libs.events.channels import PIPELINE_DEAD_LETTER, STREAM_MAXLEN
+from libs.events.consumer import EventConsumer
+from libs.events.publisher import EventPublisher
+
+logger = logging.getLogger(__name__)
+
+_GROUP_PREFIX = "pipeline"
+
+
+def event_item_ids(events: list[dict[str, Any]]) -> list[int]:
+    """Collect the distinct ``item_ids`` carried by ``events``, in arrival order."""
+    return list(dict.fromkeys(int(i) for e in events for i in e.get("item_ids") or []))
+
+
+def scope_to_items(column: str, item_ids: list[int] | None) -> tuple[str, list[object]]:
+    """SQL predicate (with params) restricting ``column`` to ``item_ids``.
+
+    Empty when ``item_ids`` is None, i.e. for a full sweep.
+    """
+    if item_ids is None:
+        return "", []
+    return f"AND {column} IN (SELECT UNNEST(?::INTEGER[])) ", [item_ids]
+
+
+def run_limit(batch_size: int, item_ids: list[int] | None) -> int:
+    """Scoped runs take every id they were handed; sweeps take ``batch_size``."""
+    return batch_size if item_ids is None else max(batch_size, len(item_ids))
+
+
+def publish_downstream(channel: str, item_ids: list[int], **fields: Any) -> None:
+    """Announce processed ``item_ids`` on ``channel``; a no-op outside pipeline mode."""
+    config = AgentConfig()
+    if not config.pipeline_mode or not item_ids:
+        return
+    redis = Redis.from_url(config.redis_url)
+    try:
+        EventPublisher(redis).publish(
+            channel, {"item_ids": item_ids, **fields}, maxlen=STREAM_MAXLEN,
+        )
+    finally:
+        redis.close()
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    channel: str
+    run: Callable[[list[dict[str, Any]]], int]
+    locked: bool = True  # False: the stage holds the write lock only around its writes
+
+
+def build_stages() -> list[Stage]:
+    """Wire each agent to the channel that feeds it."""
+    from agents.metric_mapper.tasks import map_items_to_metrics
+    from agents.moderator.tasks import moderate_items
+    from agents.normalizer.tasks import normalize_items
+    from agents.opinion_analyst.tasks import analyze_opinions
+    from agents.rollup_accountant.tasks import compute_rollups
+    from libs.events.channels import (
+        HN_CONTENT,
+        HN_MODERATED,
+        HN_NORMALIZED,
+        METRIC_MAPPING,
+        NLP_OPINION,
+    )
+
+    def node_ids(events: list[dict[str, Any]]) -> list[str]:
+        return list(dict.fromkeys(str(n) for e in events for n in e.get("node_ids") or []))
+
+    return [
+        Stage("normalize", HN_CONTENT,
+              lambda events: normalize_items(item_ids=event_item_ids(events))),
+        Stage("moderate", HN_NORMALIZED,
+              lambda events: moderate_items(item_ids=event_item_ids(events))),
+        Stage("sentiment", HN_MODERATED,
+              lambda events: analyze_opinions(item_ids=event_item_ids(events)), locked=False),
+        Stage("mapping", HN_MODERATED,
+              lambda events: map_items_to_metrics(item_ids=event_item_ids(events)),
+              locked=False),
+        Stage("rollups_mapping", METRIC_MAPPING,
+              lambda events: compute_rollups(node_ids=node_ids(events))),
+        Stage("rollups_opinion", NLP_OPINION,
+              lambda events: compute_rollups(item_ids=event_item_ids(events))),
+    ]
+
+
+class PipelineRunner:
+    """Run each stage on its own thread, blocking on its consumer group.
+
+    ``lock`` is held around each run of a ``locked`` stage, as the scheduler
+    does, so stages and sweeps never overlap on the shared DuckDB writer. An event delivered
+    more than ``max_deliveries`` times is acked and moved to
+    ``pipeline.dead_letter`` rather than retried forever.
+    """
+
+    def __init__(
+        self,
+        redis: Redis[bytes],
+        stages: list[Stage],
+        lock: AbstractContextManager[Any] | None = None,
+        batch_size: int = 100,
+        block_ms: int = 5000,
+        reclaim_idle_ms: int = 60_000,
+        max_deliveries: int = 5,
+    ) -> None:
+        self._redis = redis
+        self._stages = stages
+        self._lock = lock if lock is not None else nullcontext()
+        self._batch_size = batch_size
+        self._block_ms = block_ms
+        self._reclaim_idle_ms = reclaim_idle_ms
+        self._max_deliveries = max_deliveries
+        self._consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def consumer(self, stage: Stage) -> EventConsumer:
+        return EventConsumer(
+            self._redis, stage.channel, f"{_GROUP_PREFIX}.{stage.name}", self._consumer_name,
+        )
+
+    def _lock_for(self, stage: Stage) -> AbstractContextManager[Any]:
+        return self._lock if stage.locked else nullcontext()
+
+    def _dead_letter(
+        self, stage: Stage, consumer: EventConsumer, events: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        """Move events out of retry once delivered too often; return the rest."""
+        counts = consumer.delivery_counts(events)
+        dead = [e for e in events if counts.get(e["id"], 0) > self._max_deliveries]
+        if not dead:
+            return events
+        publisher = EventPublisher(self._redis)
+        for event in dead:
+            publisher.publish(PIPELINE_DEAD_LETTER, {
+                "stage": stage.name,
+                "channel": stage.channel,
+                "deliveries": counts[event["id"]],
+                "event": event,
+            }, maxlen=STREAM_MAXLEN)
+        consumer.ack(dead)
+        logger.error(
+            "Stage %s dead-lettered %d events after %d deliveries",
+            stage.name, len(dead), self._max_deliveries,
+        )
+        dead_ids = {e["id"] for e in dead}
+        return [e for e in events if e["id"] not in dead_ids]
+
+    def _run_singly(
+        self, stage: Stage, consumer: EventConsumer, events: list[dict[str, Any]],
+    ) -> int:
+        """Run and ack events one at a time; re-raise the last failure, if any."""
+        result = 0
+        failure: Exception | None = None
+        for event in events:
+            try:
+                with self._lock_for(stage):
+                    result += stage.run([event])
+            except Exception as exc:
+                failure = exc
+                continue
+            consumer.ack([event])
+        if failure is not None:
+            raise failure
+        return result
+
+    def poll(self, stage: Stage, consumer: EventConsumer, block_ms: int | None = None) -> int:
+        """Run one batch for ``stage`` and ack it. Returns the stage's result.
+
+        Entries a crashed or failed run left pending are retried before new
+        ones are read. A batch is acked only after the stage succeeds; if it
+        fails, its events are retried one at a time so a single bad event
+        does not hold back the rest, and the ones that fail stay pending.
+        """
+        events = consumer.reclaim(self._reclaim_idle_ms, self._batch_size)
+        if events:
+            events = self._dead_letter(stage, consumer, events)
+        else:
+            events = consumer.read(count=self._batch_size, block_ms=block_ms or 0)
+        if not events:
+            return 0
+        try:
+            with self._lock_for(stage):
+                result = stage.run(events)
+        except Exception:
+            if len(events) == 1:
+                raise
+            logger.exception(
+                "Stage %s failed on %d events; retrying them one at a time",
+                stage.name, len(events),
+            )
+            result = self._run_singly(stage, consumer, events)
+        else:
+            consumer.ack(events)
+        logger.info("Stage %s handled %d events: %s", stage.name, len(events), result)
+        return result
+
+    def _run(self, stage: Stage) -> None:
+        consumer: EventConsumer | None = None
+        while not self._stop.is_set():
+            try:
+                if consumer is None:
+                    consumer = self.consumer(stage)
+                self.poll(stage, consumer, self._block_ms)
+            except Exception:
+                logger.exception("Pipeline stage %s failed; retrying", stage.name)
+                consumer = None
+                self._stop.wait(self._block_ms / 1000)
+
+    def start(self) -> None:
+        for stage in self._stages:
+            thread = threading.Thread(
+                target=self._run, args=(stage,), daemon=True, name=f"pipeline-{stage.name}",
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float | None = None) -> bool:
+        """Stop every stage and join their threads, within ``timeout`` seconds in total.
+
+        A stage blocked on Redis notices within ``block_ms``. Returns False if
+        a stage was still running when the timeout ran out.
+        """
+        self._stop.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
@@ -0,0 +1,169 @@
+"""Set-based rollup aggregation.
+
+All active nodes and windows are aggregated by one DuckDB query; only the
+per-row scoring in ``formulas.py`` runs in Python.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from agents.rollup_accountant.formulas import (
+    compute_consensus,
+    compute_heat,
+    compute_momentum,
+    compute_split,
+)
+from libs.schemas.metric_rollup import MetricRollup
+
+if TYPE_CHECKING:
+    import duckdb
+
+WINDOWS = {
+    "hour": 3600,
+    "today": 86400,
+    "week": 604800,
+    "month": 2592000,
+}
+
+MIN_AUTHORS = {"hour": 1, "today": 5, "week": 20, "month": 50}
+INFLUENCE_CAP = 5  # max items per author per node per window
+
+_NODE_FILTER_SQL = "\n        AND e.node_id IN (SELECT UNNEST(?::VARCHAR[]))"
+
+_AGGREGATE_SQL = """
+WITH windows AS (
+    SELECT
+        UNNEST(?::VARCHAR[]) AS window_name,
+        UNNEST(?::BIGINT[]) AS bucket_start,
+        UNNEST(?::INTEGER[]) AS min_authors
+),
+scoped AS (
+    SELECT
+        w.window_name, w.bucket_start, w.min_authors, e.node_id,
+        h.id, h.author_hash, h."type",
+        COALESCE(o.valence, 0.0) AS valence,
+        COALESCE(o.intensity, 0.0) AS intensity,
+        COALESCE(o.confidence, 0.0) * COALESCE(e.weight, 0.0) AS w,
+        COALESCE(e.weight, 0.0) AS edge_weight,
+        COALESCE(o.label, 'neutral') AS label,
+        ROW_NUMBER() OVER (
+            PARTITION BY w.window_name, e.node_id, h.author_hash
+            ORDER BY h."time" DESC, h.id DESC
+        ) AS author_rank,
+        COUNT(*) OVER (PARTITION BY w.window_name, e.node_id) AS total_rows
+    FROM item_metric_edge e
+    JOIN metric_node m ON e.node_id = m.node_id AND m.status = 'active'{node_filter}
+    JOIN hn_item h ON e.item_id = h.id
+    JOIN windows w ON h."time" >= w.bucket_start
+    LEFT JOIN opinion_signal o ON h.id = o.item_id
+),
+latest AS (
+    SELECT node_id, "window", presence
+    FROM metric_rollup
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY node_id, "window" ORDER BY bucket_start DESC) = 1
+)
+SELECT
+    s.node_id, s.window_name, s.bucket_start,
+    COUNT(*) AS capped_rows,
+    MAX(s.total_rows) AS total_rows,
+    COUNT(DISTINCT NULLIF(s.author_hash, '')) AS unique_authors,
+    SUM(s.w) AS total_weight,
+    SUM(CASE WHEN s.label = 'positive' THEN s.w ELSE 0.0 END) AS pos_weight,
+    SUM(CASE WHEN s.label = 'negative' THEN s.w ELSE 0.0 END) AS neg_weight,
+    SUM(CASE WHEN s.label NOT IN ('positive', 'negative') THEN s.w ELSE 0.0 END) AS neu_weight,
+    SUM(s.valence * s.w) AS total_valence,
+    SUM(s.intensity * s.edge_weight) AS total_intensity,
+    COUNT(DISTINCT s.id) FILTER (WHERE s."type" = 'story') AS thread_count,
+    ANY_VALUE(l.presence) AS baseline
+FROM scoped s
+LEFT JOIN latest l ON s.node_id = l.node_id AND s.window_name = l."window"
+WHERE s.author_rank <= ?
+GROUP BY s.node_id, s.window_name, s.bucket_start, s.min_authors
+HAVING COUNT(DISTINCT NULLIF(s.author_hash, '')) >= s.min_authors AND SUM(s.w) <> 0
+"""
+
+# Latest input change: edges written by metric_mapper, signals by opinion_analyst.
+_LATEST_CHANGE_SQL = """
+SELECT GREATEST(
+    (SELECT MAX(created_at) FROM item_metric_edge),
+    (SELECT MAX(analyzed_at) FROM opinion_signal)
+)
+"""
+
+_CHANGED_NODES_SQL = """
+SELECT node_id FROM item_metric_edge WHERE created_at > ?
+UNION
+SELECT e.node_id FROM opinion_signal o
+JOIN item_metric_edge e ON o.item_id = e.item_id
+WHERE o.analyzed_at > ?
+"""
+
+
+def latest_change(conn: duckdb.DuckDBPyConnection) -> int | None:
+    """Return the newest edge/signal timestamp, or None when both tables are empty."""
+    row = conn.execute(_LATEST_CHANGE_SQL).fetchone()
+    return row[0] if row else None
+
+
+def changed_nodes(conn: duckdb.DuckDBPyConnection, since: int) -> list[str]:
+    """Return node ids with an edge or opinion signal written after ``since``."""
+    rows = conn.execute(_CHANGED_NODES_SQL, [since, since]).fetchall()
+    return [r[0] for r in rows]
+
+
+def nodes_for_items(conn: duckdb.DuckDBPyConnection, item_ids: list[int]) -> list[str]:
+    """Return node ids that any of ``item_ids`` maps to."""
+    rows = conn.execute(
+        "SELECT DISTINCT node_id FROM item_metric_edge "
+        "WHERE item_id IN (SELECT UNNEST(?::INTEGER[])) ORDER BY node_id",
+        [item_ids],
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def aggregate_rollups(
+    conn: duckdb.DuckDBPyConnection,
+    now: int,
+    node_ids: list[str] | None = None,
+) -> list[MetricRollup]:
+    """Compute rollups as of ``now`` for all active nodes, or only ``node_ids``."""
+    names = list(WINDOWS)
+    params: list[object] = [
+        names,
+        [now - WINDOWS[name] for name in names],
+        [MIN_AUTHORS.get(name, 1) for name in names],
+    ]
+    if node_ids is not None:
+        params.append(node_ids)
+    params.append(INFLUENCE_CAP)
+    sql = _AGGREGATE_SQL.format(node_filter=_NODE_FILTER_SQL if node_ids is not None else "")
+    rows = conn.execute(sql, params).fetchall()
+
+    rollups: list[MetricRollup] = []
+    for (node_id, window_name, bucket_start, capped_rows, total_rows, unique_authors,
+         total_weight, pos_weight, neg_weight, neu_weight, total_valence,
+         total_intensity, thread_count, baseline) in rows:
+        pos_share = pos_weight / total_weight
+        neg_share = neg_weight / total_weight
+        neu_share = neu_weight / total_weight
+        presence = capped_rows / max(total_rows, 1)
+        cons_pos, cons_neg = compute_consensus(pos_share, neg_share)
+
+        rollups.append(MetricRollup(
+            node_id=node_id,
+            window=window_name,
+            bucket_start=bucket_start,
+            presence=round(presence, 4),
+            sentiment_positive=round(pos_share, 4),
+            sentiment_negative=round(neg_share, 4),
+            sentiment_neutral=round(neu_share, 4),
+            valence_score=round(total_valence / total_weight, 2),
+            split_score=compute_split(pos_share, neg_share),
+            consensus_pos=cons_pos,
+            consensus_neg=cons_neg,
+            heat_score=compute_heat(total_intensity, unique_authors),
+            momentum=compute_momentum(presence, baseline or 0.0),
+            unique_authors=unique_authors,
+            thread_count=thread_count,
+        ))
+    return rollups
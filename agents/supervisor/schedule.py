@@ -11,10 +11,18 @@ BEAT_SCHEDULE: dict[str, dict[str, object]] = {
         "task": "thread_harvester.harvest_threads",
         "schedule": schedule(run_every=20),
     },
+    "ingest-firehose": {
+        "task": "thread_harvester.ingest_firehose",
+        "schedule": schedule(run_every=15),
+    },
     "cleanup-watchlist": {
         "task": "supervisor.cleanup_watchlist",
         "schedule": schedule(run_every=300),
     },
+    "archive-cold-items": {
+        "task": "supervisor.archive_cold_items",
+        "schedule": schedule(run_every=3600),
+    },
     "normalize-items": {
         "task": "normalizer.normalize_items",
         "schedule": schedule(run_every=15),
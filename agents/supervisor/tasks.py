@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import logging
 import time
 
 from agents.celery_app import app, get_worker_conn
+from agents.config import AgentConfig
+from libs.storage.cold_tier import MIN_HOT_DAYS, archive_items, cold_cutoff, cold_tier_dir
 from libs.storage.watchlist_repository import WatchlistRepository
 
+logger = logging.getLogger(__name__)
+
 
 @app.task(name="supervisor.cleanup_watchlist")
 def cleanup_watchlist() -> int:
@@ -15,3 +20,23 @@ def cleanup_watchlist() -> int:
         return repo.remove_expired(int(time.time()))
     finally:
         conn.close()
+
+
+@app.task(name="supervisor.archive_cold_items")
+def archive_cold_items(batch_size: int = 100_000) -> int:
+    """Move items older than ``cold_tier_age_days`` to the Parquet cold tier."""
+    config = AgentConfig()
+    root = cold_tier_dir(config.db_path)
+    if root is None:
+        return 0
+    age_days = config.cold_tier_age_days
+    if age_days < MIN_HOT_DAYS:
+        logger.warning("cold_tier_age_days=%d is inside the rollup window; using %d",
+                       age_days, MIN_HOT_DAYS)
+
+    conn = get_worker_conn()
+    try:
+        now = int(time.time())
+        return archive_items(conn, root, cold_cutoff(now, age_days), now, batch_size)
+    finally:
+        conn.close()
@@ -0,0 +1,114 @@
+"""Site-wide ingestion from Firebase's ``maxitem`` and ``updates`` feeds.
+
+Item ids are assigned sequentially, so every new story and comment is
+reached by walking ids from a persisted cursor (``firehose_cursor`` in
+``backfill_state``) up to ``/maxitem.json``. ``/updates.json`` lists older
+items that changed recently (edits, scores, deletions), which are re-fetched
+too. Each run fetches at most ``DD_FIREHOSE_BATCH_SIZE`` new ids, so the
+request rate stays fixed however busy the site is.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+from redis import Redis
+
+from agents.celery_app import app, get_worker_conn, write_lock
+from agents.config import AgentConfig
+from agents.thread_harvester.items import item_from_raw
+from libs.events.channels import HN_CONTENT, STREAM_MAXLEN
+from libs.events.publisher import EventPublisher
+from libs.hn_clients.firebase import FirebaseHNClient
+from libs.schemas.hn_item import HNItem
+from libs.storage.backfill_state_repository import BackfillStateRepository
+from libs.storage.cold_tier import cold_cutoff
+from libs.storage.hn_item_repository import HNItemRepository
+
+_CURSOR_KEY = "firehose_cursor"
+# Ids this close to maxitem may not be readable yet; a missing one among
+# them holds the cursor back so it is retried on the next run.
+_SETTLE_IDS = 100
+
+
+async def _fetch_items(
+    item_ids: list[int], concurrency: int, client: FirebaseHNClient,
+) -> list[dict[str, Any] | None]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _get(item_id: int) -> dict[str, Any] | None:
+        async with semaphore:
+            return await client.get_item(item_id)
+
+    return await asyncio.gather(*(_get(i) for i in item_ids))
+
+
+async def _poll_feeds(
+    cursor: int | None, batch_size: int, concurrency: int,
+) -> tuple[int, int, list[int], list[dict[str, Any] | None]]:
+    """Read both feeds and fetch the new id range plus the updated items.
+
+    Returns ``(max_item, end, new_ids, raws)``; ``raws`` holds the new ids'
+    items followed by the updated ones'.
+    """
+    client = FirebaseHNClient()
+    try:
+        max_item, updates = await asyncio.gather(client.get_max_item(), client.get_updates())
+        start = max_item - batch_size if cursor is None else cursor
+        end = min(max_item, start + batch_size)
+        new_ids = list(range(start + 1, end + 1))
+        updated_ids = sorted({int(i) for i in updates.get("items") or [] if int(i) <= start})
+        raws = await _fetch_items(new_ids + updated_ids, concurrency, client)
+        return max_item, end, new_ids, raws
+    finally:
+        await client.close()
+
+
+def _next_cursor(end: int, max_item: int, missing: list[int]) -> int:
+    """``end``, unless a new id near ``max_item`` has not appeared yet."""
+    held = [i for i in missing if i > max_item - _SETTLE_IDS]
+    return min(held) - 1 if held else end
+
+
+@app.task(name="thread_harvester.ingest_firehose")
+def ingest_firehose() -> int:
+    """Store every item created or changed since the last run.
+
+    Old items re-fetched from ``updates`` are stored but not queued for the
+    pipeline once they are past the cold-tier age.
+    """
+    config = AgentConfig()
+    conn = get_worker_conn()
+    repo = HNItemRepository(
+        conn, enqueue_since=cold_cutoff(int(time.time()), config.cold_tier_age_days),
+    )
+    state = BackfillStateRepository(conn)
+    redis = Redis.from_url(config.redis_url)
+    publisher = EventPublisher(redis)
+
+    try:
+        saved = state.get(_CURSOR_KEY)
+        max_item, end, new_ids, raws = asyncio.run(_poll_feeds(
+            int(saved) if saved else None,
+            config.firehose_batch_size, config.firehose_concurrency,
+        ))
+
+        missing = [i for i, raw in zip(new_ids, raws[:len(new_ids)], strict=True) if raw is None]
+        items: list[HNItem] = [
+            item_from_raw(raw, config.author_salt) for raw in raws if raw is not None
+        ]
+
+        with write_lock():
+            repo.upsert_many(items)
+            state.set(_CURSOR_KEY, str(_next_cursor(end, max_item, missing)), int(time.time()))
+        if items:
+            publisher.publish(HN_CONTENT, {
+                "source": "firehose",
+                "items_count": len(items),
+                "item_ids": [item.id for item in items],
+            }, maxlen=STREAM_MAXLEN)
+        return len(items)
+    finally:
+        conn.close()
+        redis.close()
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import Any
+
+from libs.schemas.hn_item import HNItem
+from libs.utils.hashing import hash_author
+
+
+def item_from_raw(raw: dict[str, Any], salt: str) -> HNItem:
+    """Convert a Firebase API item into an ``HNItem``, hashing its author with ``salt``."""
+    author = raw.get("by")
+    return HNItem(
+        id=raw["id"],
+        type=raw.get("type"),
+        by=author,
+        author_hash=hash_author(author, salt) if author else None,
+        time=raw.get("time"),
+        text=raw.get("text"),
+        parent=raw.get("parent"),
+        kids=raw.get("kids"),
+        title=raw.get("title"),
+        url=raw.get("url"),
+        score=raw.get("score"),
+        descendants=raw.get("descendants"),
+        deleted=raw.get("deleted"),
+        dead=raw.get("dead"),
+    )
@@ -1,71 +1,254 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import time
 from typing import Any
 
+import httpx
 from redis import Redis
 
-from agents.celery_app import app, get_worker_conn
+from agents.celery_app import app, get_worker_conn, write_lock
 from agents.config import AgentConfig
-from libs.events.channels import HN_CONTENT
+from agents.thread_harvester.items import item_from_raw
+from libs.events.channels import HN_CONTENT, STREAM_MAXLEN
 from libs.events.publisher import EventPublisher
+from libs.hn_clients.algolia import AlgoliaHNClient
 from libs.hn_clients.firebase import FirebaseHNClient
 from libs.schemas.hn_item import HNItem
-from libs.storage.hn_item_repository import HNItemRepository
+from libs.schemas.watchlist import WatchlistEntry
+from libs.storage.hn_item_repository import HNItemRepository, ThreadShape
 from libs.storage.watchlist_repository import WatchlistRepository
 from libs.utils.hashing import hash_author
 
+logger = logging.getLogger(__name__)
+
+# Caps for the Firebase fallback walk, which costs one request per item.
 _MAX_DEPTH = 3
 _MAX_COMMENTS = 200
+_MAX_FANOUT = 50  # kids followed per item
+
+# Watchlist polling: aim to pick up about this many new comments per poll,
+# polling no faster than the harvest tick and no slower than hourly.
+_COMMENTS_PER_POLL = 5
+_MIN_POLL_SECONDS = 20
+_MAX_POLL_SECONDS = 3600
+_RATE_SMOOTHING = 0.5  # weight of the latest observation in comment_rate
+_ACTIVE_TTL_SECONDS = 7200  # threads still gaining comments stay watched this long
+
+
+async def _fetch_tree(
+    client: FirebaseHNClient,
+    item_id: int,
+    salt: str,
+    semaphore: asyncio.Semaphore,
+    root: dict[str, Any] | None = None,
+    stored: ThreadShape | None = None,
+    expect_new: int | None = None,
+) -> list[HNItem]:
+    """Fetch an item and its comment tree one level at a time.
 
+    Each level is requested as a single ``asyncio.gather``; ``semaphore``
+    bounds the number of in-flight requests and may be shared across trees.
+    ``root`` is the item itself when the caller has already fetched it.
 
-def _item_from_raw(raw: dict[str, Any], salt: str) -> HNItem:
-    author = raw.get("by")
+    For a delta walk, ``stored`` is the shape of the stored tree and
+    ``expect_new`` how many comments are missing. Below the root, the walk
+    only descends into items that are new or have kids not stored under
+    them, so unchanged subtrees are never fetched. Unknown kids are visited
+    first, and the walk ends once that many new comments have been found.
+    """
+    known = stored.ids if stored is not None else set()
+    children = stored.children if stored is not None else {}
+
+    async def _get(kid_id: int) -> dict[str, Any] | None:
+        async with semaphore:
+            return await client.get_item(kid_id)
+
+    items: list[HNItem] = []
+    level = [item_id]
+    depth = 0
+    found_new = 0
+    while level and len(items) < _MAX_COMMENTS:
+        if expect_new is not None and found_new >= expect_new:
+            break
+        level = level[:_MAX_COMMENTS - len(items)]
+        if depth == 0 and root is not None:
+            raws: list[dict[str, Any] | None] = [root]
+        else:
+            raws = await asyncio.gather(*(_get(i) for i in level))
+        next_level: list[int] = []
+        for raw in raws:
+            if raw is None:
+                continue
+            items.append(item_from_raw(raw, salt))
+            is_new = raw["id"] not in known
+            if depth > 0 and is_new:
+                found_new += 1
+            kids = raw.get("kids") or []
+            changed = depth == 0 or is_new or not set(kids) <= children.get(raw["id"], set())
+            if depth < _MAX_DEPTH and changed:
+                next_level.extend(sorted(kids, key=lambda k: k in known)[:_MAX_FANOUT])
+        level = sorted(next_level, key=lambda k: k in known)
+        depth += 1
+    return items
+
+
+def _item_from_algolia(node: dict[str, Any], salt: str) -> HNItem:
+    author = node.get("author")
+    children = [c["id"] for c in node.get("children") or []]
     return HNItem(
-        id=raw["id"],
-        type=raw.get("type"),
+        id=node["id"],
+        type=node.get("type"),
         by=author,
         author_hash=hash_author(author, salt) if author else None,
-        time=raw.get("time"),
-        text=raw.get("text"),
-        parent=raw.get("parent"),
-        kids=raw.get("kids"),
-        title=raw.get("title"),
-        url=raw.get("url"),
-        score=raw.get("score"),
-        descendants=raw.get("descendants"),
-        deleted=raw.get("deleted"),
-        dead=raw.get("dead"),
+        time=node.get("created_at_i"),
+        text=node.get("text"),
+        parent=node.get("parent_id"),
+        kids=children or None,
+        title=node.get("title"),
+        url=node.get("url"),
+        score=node.get("points"),
     )
 
 
-async def _fetch_tree(
-    client: FirebaseHNClient,
-    item_id: int,
+def _flatten_tree(tree: dict[str, Any], salt: str) -> list[HNItem]:
+    """Flatten an Algolia ``/items`` tree into items, level by level, uncapped."""
+    items: list[HNItem] = []
+    level = [tree]
+    while level:
+        items.extend(_item_from_algolia(node, salt) for node in level)
+        level = [child for node in level for child in node.get("children") or []]
+    return items
+
+
+def _unchanged(shape: ThreadShape, root: dict[str, Any]) -> bool:
+    """True if the stored thread already holds every comment ``root`` reports.
+
+    ``shape`` is what is actually stored under the story, not what the story
+    last claimed, so comments a lagging index or a capped walk missed are
+    fetched again. ``descendants`` counts replies at any depth; kids are
+    compared as a set because HN reorders them by rank.
+    """
+    return (
+        shape.live_comments >= (root.get("descendants") or 0)
+        and set(root.get("kids") or []) <= shape.kids
+    )
+
+
+def _missing_comments(shape: ThreadShape, root: dict[str, Any]) -> int:
+    """Lower bound on the comments ``root`` has that are not stored yet."""
+    new_kids = set(root.get("kids") or []) - shape.kids
+    return max((root.get("descendants") or 0) - shape.live_comments, len(new_kids), 1)
+
+
+async def _fetch_thread(
+    algolia: AlgoliaHNClient,
+    firebase: FirebaseHNClient,
+    story_id: int,
     salt: str,
-    depth: int = 0,
+    semaphore: asyncio.Semaphore,
+    stored: ThreadShape | None = None,
 ) -> list[HNItem]:
-    """Recursively fetch an item and its comment tree."""
-    raw = await client.get_item(item_id)
-    if raw is None:
-        return []
-
-    items = [_item_from_raw(raw, salt)]
-    if depth >= _MAX_DEPTH or len(items) >= _MAX_COMMENTS:
-        return items
-
-    kid_ids: list[int] = raw.get("kids") or []
-    for kid_id in kid_ids[:50]:  # cap per-level fanout
-        items.extend(await _fetch_tree(client, kid_id, salt, depth + 1))
-        if len(items) >= _MAX_COMMENTS:
-            break
+    """Fetch what changed in a thread, given the ``stored`` shape of its tree.
+
+    The story is read from Firebase first, which is current where Algolia's
+    index trails slightly. If every comment it reports is already stored,
+    only the story is returned. Otherwise the whole tree comes from one Algolia request,
+    falling back to a walk on Firebase if Algolia fails or does not have the
+    story yet. That walk skips subtrees ``stored`` already holds and stops
+    once it has found the comments missing from it.
+    """
+    try:
+        async with semaphore:
+            root = await firebase.get_item(story_id)
+    except httpx.HTTPError:
+        root = None
+    if root is not None and stored is not None and _unchanged(stored, root):
+        return [item_from_raw(root, salt)]
+
+    try:
+        async with semaphore:
+            tree = await algolia.get_item_tree(story_id)
+    except httpx.HTTPError:
+        logger.warning("Algolia thread fetch failed for %d; using Firebase", story_id)
+        tree = None
+    if tree is None:
+        if root is None or stored is None:
+            return await _fetch_tree(firebase, story_id, salt, semaphore, root=root)
+        return await _fetch_tree(
+            firebase, story_id, salt, semaphore, root=root,
+            stored=stored, expect_new=_missing_comments(stored, root),
+        )
+
+    items = _flatten_tree(tree, salt)
+    if root is not None:
+        fresh = item_from_raw(root, salt)
+        items[0] = items[0].model_copy(update=fresh.model_dump(exclude_none=True))
     return items
 
 
+async def _fetch_trees(
+    story_ids: list[int],
+    salt: str,
+    concurrency: int,
+    stored: dict[int, ThreadShape] | None = None,
+) -> list[list[HNItem] | BaseException]:
+    """Fetch several threads concurrently over shared HTTP clients.
+
+    ``stored`` maps story ids to the shape of their stored comment trees. A
+    thread that fails comes back as its exception, so the others still land.
+    """
+    stored = stored or {}
+    algolia = AlgoliaHNClient()
+    firebase = FirebaseHNClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        return await asyncio.gather(*(
+            _fetch_thread(algolia, firebase, story_id, salt, semaphore, stored.get(story_id))
+            for story_id in story_ids
+        ), return_exceptions=True)
+    finally:
+        await algolia.close()
+        await firebase.close()
+
+
+def _poll_schedule(
+    entry: WatchlistEntry, story: HNItem | None, now: int,
+) -> tuple[float, int, int]:
+    """Return ``(comment_rate, next_poll, new_comments)`` after harvesting ``entry``.
+
+    The rate is comments per second: on the first harvest the story's average
+    since it was posted, afterwards a moving average of the arrivals between
+    harvests. A story gaining comments is polled about every
+    ``_COMMENTS_PER_POLL`` arrivals; one that gained none waits twice as long
+    as last time.
+    """
+    descendants = story.descendants if story is not None else None
+    if entry.last_fetched is None or entry.last_descendants is None:
+        age = now - story.time if story is not None and story.time else 0
+        new = descendants or 0
+        rate = new / age if age > 0 else 0.0
+    else:
+        elapsed = max(now - entry.last_fetched, 1)
+        new = max((descendants or entry.last_descendants) - entry.last_descendants, 0)
+        rate = _RATE_SMOOTHING * new / elapsed + (1 - _RATE_SMOOTHING) * entry.comment_rate
+
+    if new and rate > 0:
+        interval = _COMMENTS_PER_POLL / rate
+    else:
+        last_interval = entry.next_poll - (entry.last_fetched or entry.next_poll)
+        interval = 2 * max(last_interval, _MIN_POLL_SECONDS)
+    interval = min(max(interval, _MIN_POLL_SECONDS), _MAX_POLL_SECONDS)
+    return rate, now + int(interval), new
+
+
 @app.task(name="thread_harvester.harvest_threads")
 def harvest_threads(limit: int = 10) -> int:
-    """Fetch watchlist stories + comment trees and store in hn_item."""
+    """Fetch due watchlist stories + comment trees and store in hn_item.
+
+    Each harvest reschedules its story by how fast comments are arriving.
+    """
     config = AgentConfig()
     conn = get_worker_conn()
     repo = HNItemRepository(conn)
@@ -75,21 +258,39 @@ def harvest_threads(limit: int = 10) -> int:
 
     try:
         now = int(time.time())
-        entries = watchlist.get_active(now, limit=limit)
+        entries = watchlist.get_due(now, limit=limit)
         total = 0
 
-        for entry in entries:
-            items = asyncio.run(
-                _fetch_tree(FirebaseHNClient(), entry.story_id, config.author_salt)
-            )
-            for item in items:
-                repo.upsert(item)
-            watchlist.mark_fetched(entry.story_id, now)
-            publisher.publish(
-                HN_CONTENT,
-                {"story_id": entry.story_id, "items_count": len(items)},
-            )
+        # Only stories harvested before have a stored tree to compare against
+        harvested = [e.story_id for e in entries if e.last_fetched is not None]
+        stored = repo.get_thread_shapes(harvested)
+        trees = asyncio.run(_fetch_trees(
+            [e.story_id for e in entries], config.author_salt, config.harvest_concurrency,
+            stored,
+        ))
+
+        events: list[dict[str, Any]] = []
+        for entry, items in zip(entries, trees, strict=True):
+            if isinstance(items, BaseException):
+                # left due, so the next run retries it
+                logger.warning("Thread harvest failed for %d: %s", entry.story_id, items)
+                continue
+            story = next((i for i in items if i.id == entry.story_id), None)
+            rate, next_poll, new = _poll_schedule(entry, story, now)
+            with write_lock():
+                repo.upsert_many(items)
+                watchlist.record_poll(
+                    entry.story_id, now, next_poll, rate,
+                    story.descendants if story is not None else None,
+                    keep_until=now + _ACTIVE_TTL_SECONDS if new else 0,
+                )
+            events.append({
+                "story_id": entry.story_id,
+                "items_count": len(items),
+                "item_ids": [item.id for item in items],
+            })
             total += len(items)
+        publisher.publish_many(HN_CONTENT, events, maxlen=STREAM_MAXLEN)
         return total
     finally:
         conn.close()
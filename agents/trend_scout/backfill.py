@@ -1,65 +1,183 @@
+"""Historical story backfill from Algolia.
+
+History is walked forward from ``backfill_checkpoint`` in fixed windows,
+several at a time. Each window follows Algolia's pagination to the end; a
+window with more hits than one query can return (1000) is split in half
+until every part fits. Progress is saved per window after each page::
+
+    backfill_window:<start> = {"end": <end>, "pending": [[lo, hi, next_page], ...]}
+
+so a crashed run resumes exactly where it stopped, and the checkpoint only
+moves past windows that are complete.
+"""
 from __future__ import annotations
 
 import asyncio
+import json
+import logging
 import time
+from typing import Any
 
-from agents.celery_app import app, get_worker_conn
+from agents.celery_app import app, get_worker_conn, write_lock
+from agents.config import AgentConfig
 from libs.hn_clients.algolia import AlgoliaHNClient
 from libs.schemas.watchlist import WatchlistEntry
 from libs.storage.backfill_state_repository import BackfillStateRepository
 from libs.storage.watchlist_repository import WatchlistRepository
 
-_DAY_SECS = 86400
+logger = logging.getLogger(__name__)
+
 _TTL_SECONDS = 7200
+_DEFAULT_START = 1704067200  # 2024-01-01
+_CHECKPOINT_KEY = "backfill_checkpoint"
+_WINDOW_KEY = "backfill_window:{start}"
+_HITS_PER_PAGE = 200
+_MIN_SPLIT_SECONDS = 60  # narrower windows are taken as-is, even if truncated
+
+
+def _truncated(result: dict[str, Any]) -> bool:
+    """True when the query matched more hits than its pages can return."""
+    per_page = int(result.get("hitsPerPage") or _HITS_PER_PAGE)
+    return int(result.get("nbHits") or 0) > int(result.get("nbPages") or 0) * per_page
+
+
+def _entries(hits: list[dict[str, Any]], now: int) -> list[WatchlistEntry]:
+    entries = []
+    for hit in hits:
+        story_id = int(hit.get("objectID") or 0)
+        if story_id:
+            entries.append(WatchlistEntry(
+                story_id=story_id,
+                priority_score=float(hit.get("points") or 0),
+                ttl_expires=now + _TTL_SECONDS,
+                next_poll=now,
+                lane="backfill",
+            ))
+    return entries
+
+
+def _plan_windows(
+    state: BackfillStateRepository, checkpoint: int, now: int, window: int, count: int,
+) -> list[tuple[int, int]]:
+    """Up to ``count`` consecutive windows from ``checkpoint``.
+
+    A window already started keeps the end it was started with.
+    """
+    windows: list[tuple[int, int]] = []
+    start = checkpoint
+    while start < now and len(windows) < count:
+        saved = state.get(_WINDOW_KEY.format(start=start))
+        end = json.loads(saved)["end"] if saved else min(start + window, now)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+async def _backfill_window(
+    client: AlgoliaHNClient,
+    semaphore: asyncio.Semaphore,
+    state: BackfillStateRepository,
+    watchlist: WatchlistRepository,
+    start: int,
+    end: int,
+    now: int,
+) -> int:
+    """Page through ``[start, end)``, saving progress after every page."""
+    key = _WINDOW_KEY.format(start=start)
+    saved = state.get(key)
+    pending: list[list[int]] = json.loads(saved)["pending"] if saved else [[start, end, 0]]
+    count = 0
+    while pending:
+        lo, hi, page = pending[0]
+        async with semaphore:
+            result = await client.search_by_date_page(
+                tags="story",
+                hits_per_page=_HITS_PER_PAGE,
+                numeric_filters=f"created_at_i>={lo},created_at_i<{hi}",
+                page=page,
+            )
+        if page == 0 and _truncated(result) and hi - lo > _MIN_SPLIT_SECONDS:
+            mid = (lo + hi) // 2
+            pending[:1] = [[lo, mid, 0], [mid, hi, 0]]
+        else:
+            entries = _entries(result.get("hits") or [], now)
+            with write_lock():
+                watchlist.upsert_many(entries)
+            count += len(entries)
+            if page + 1 < int(result.get("nbPages") or 0):
+                pending[0][2] = page + 1
+            else:
+                pending.pop(0)
+        with write_lock():
+            state.set(key, json.dumps({"end": end, "pending": pending}), now)
+    return count
+
+
+async def _backfill_windows(
+    state: BackfillStateRepository,
+    watchlist: WatchlistRepository,
+    windows: list[tuple[int, int]],
+    now: int,
+    concurrency: int,
+) -> int:
+    """Backfill ``windows`` concurrently; a failed window is retried next run."""
+    client = AlgoliaHNClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        results = await asyncio.gather(
+            *(_backfill_window(client, semaphore, state, watchlist, s, e, now)
+              for s, e in windows),
+            return_exceptions=True,
+        )
+    finally:
+        await client.close()
+
+    count = 0
+    for (start, end), result in zip(windows, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.warning("Backfill window %d-%d failed: %s", start, end, result)
+        else:
+            count += result
+    return count
 
 
-async def _search_by_date(
-    client: AlgoliaHNClient, start_ts: int, end_ts: int,
-) -> list[dict[str, object]]:
-    return await client.search_by_date(  # type: ignore[return-value]
-        tags="story",
-        hits_per_page=50,
-        numeric_filters=f"created_at_i>={start_ts},created_at_i<{end_ts}",
-    )
+def _advance_checkpoint(
+    state: BackfillStateRepository, windows: list[tuple[int, int]], now: int,
+) -> None:
+    """Move the checkpoint past the leading run of completed windows."""
+    for start, end in windows:
+        key = _WINDOW_KEY.format(start=start)
+        saved = state.get(key)
+        if saved is None or json.loads(saved)["pending"]:
+            return
+        state.set(_CHECKPOINT_KEY, str(end), now)
+        state.delete(key)
 
 
 @app.task(name="trend_scout.backfill_stories")
 def backfill_stories() -> int:
-    """Backfill historical stories from Algolia in daily chunks."""
+    """Backfill historical stories from Algolia, several windows per run."""
+    config = AgentConfig()
     conn = get_worker_conn()
     state_repo = BackfillStateRepository(conn)
     watchlist = WatchlistRepository(conn)
 
     try:
         now = int(time.time())
-        # default start: Jan 1, 2024
-        checkpoint = state_repo.get("backfill_checkpoint")
-        if checkpoint:
-            start_ts = int(checkpoint)
-        else:
-            start_ts = 1704067200  # 2024-01-01
-
-        end_ts = min(start_ts + _DAY_SECS, now)
-        if start_ts >= now:
+        checkpoint = state_repo.get(_CHECKPOINT_KEY)
+        start_ts = int(checkpoint) if checkpoint else _DEFAULT_START
+        windows = _plan_windows(
+            state_repo, start_ts, now,
+            config.backfill_window_seconds, config.backfill_windows_per_run,
+        )
+        if not windows:
             return 0  # caught up
 
-        hits = asyncio.run(_search_by_date(AlgoliaHNClient(), start_ts, end_ts))
-
-        count = 0
-        for hit in hits:
-            story_id = int(hit.get("objectID") or 0)
-            if not story_id:
-                continue
-            points = int(hit.get("points") or 0)
-            entry = WatchlistEntry(
-                story_id=story_id,
-                priority_score=float(points),
-                ttl_expires=now + _TTL_SECONDS,
-            )
-            watchlist.upsert(entry)
-            count += 1
-
-        state_repo.set("backfill_checkpoint", str(end_ts), now)
+        count = asyncio.run(_backfill_windows(
+            state_repo, watchlist, windows, now, config.backfill_concurrency,
+        ))
+        with write_lock():
+            _advance_checkpoint(state_repo, windows, now)
         return count
     finally:
         conn.close()
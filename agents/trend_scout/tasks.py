@@ -5,9 +5,9 @@ import time
 
 from redis import Redis
 
-from agents.celery_app import app, get_worker_conn
+from agents.celery_app import app, get_worker_conn, write_lock
 from agents.config import AgentConfig
-from libs.events.channels import HN_DISCOVERY
+from libs.events.channels import HN_DISCOVERY, STREAM_MAXLEN
 from libs.events.publisher import EventPublisher
 from libs.hn_clients.algolia import AlgoliaHNClient
 from libs.schemas.watchlist import WatchlistEntry
@@ -38,20 +38,26 @@ def discover_trending() -> int:
     try:
         hits = asyncio.run(_fetch_front_page(AlgoliaHNClient()))
         now = int(time.time())
-        count = 0
-        for hit in hits:
-            story_id = int(hit.get("objectID") or hit.get("story_id") or 0)
-            if not story_id:
-                continue
-            entry = WatchlistEntry(
-                story_id=story_id,
-                priority_score=_compute_priority(hit),
-                ttl_expires=now + _TTL_SECONDS,
-            )
-            repo.upsert(entry)
-            publisher.publish(HN_DISCOVERY, {"story_id": story_id, "action": "discovered"})
-            count += 1
-        return count
+        discovered: list[int] = []
+        with write_lock():
+            for hit in hits:
+                story_id = int(hit.get("objectID") or hit.get("story_id") or 0)
+                if not story_id:
+                    continue
+                entry = WatchlistEntry(
+                    story_id=story_id,
+                    priority_score=_compute_priority(hit),
+                    ttl_expires=now + _TTL_SECONDS,
+                    next_poll=now,
+                )
+                repo.upsert(entry)
+                discovered.append(story_id)
+        publisher.publish_many(
+            HN_DISCOVERY,
+            ({"story_id": story_id, "action": "discovered"} for story_id in discovered),
+            maxlen=STREAM_MAXLEN,
+        )
+        return len(discovered)
     finally:
         conn.close()
         redis.close()
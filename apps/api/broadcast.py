@@ -0,0 +1,119 @@
+"""Shared-snapshot fan-out for server-sent event streams.
+
+Each stream runs a single producer that queries once per tick and serializes
+once; every connected client receives the same payload through its own queue,
+and only when it differs from the previous one.
+
+Queries run on a small shared thread pool so DuckDB never blocks the event
+loop. Client queues hold a single snapshot: a slow consumer skips straight to
+the newest payload instead of buffering stale ones.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+    from concurrent.futures import Executor
+
+logger = logging.getLogger(__name__)
+
+_QUERY_WORKERS = 2
+_CLIENT_BUFFER = 1
+
+_query_pool = ThreadPoolExecutor(max_workers=_QUERY_WORKERS, thread_name_prefix="stream-query")
+
+
+class SnapshotBroadcaster:
+    """Run one query loop per stream and fan the result out to all subscribers.
+
+    The producer starts with the first subscriber and stops after the last one
+    leaves, so an idle stream costs nothing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Any],
+        interval: float = 5.0,
+        executor: Executor | None = None,
+    ) -> None:
+        self._name = name
+        self._fetch = fetch
+        self._interval = interval
+        self._executor = executor or _query_pool
+        self._subscribers: set[asyncio.Queue[str]] = set()
+        self._task: asyncio.Task[None] | None = None
+        self._payload: str | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue[str], payload: str) -> None:
+        """Put ``payload`` on ``queue``, replacing any snapshot not yet consumed."""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+    def _publish(self, payload: str) -> None:
+        if payload == self._payload:
+            return
+        self._payload = payload
+        for queue in self._subscribers:
+            self._offer(queue, payload)
+
+    def _snapshot(self) -> str:
+        return json.dumps(self._fetch())
+
+    async def _produce(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self._subscribers:
+                try:
+                    self._publish(await loop.run_in_executor(self._executor, self._snapshot))
+                except Exception:
+                    logger.exception("Stream %s snapshot failed", self._name)
+                await asyncio.sleep(self._interval)
+        finally:
+            if self._task is asyncio.current_task():
+                self._payload = None
+
+    def _ensure_producer(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._task
+        # A producer cancelled by the last unsubscribe may not have exited yet;
+        # it will not publish again, so a new subscriber needs a fresh one.
+        if task is None or task.done() or task.cancelling() or task.get_loop() is not loop:
+            self._payload = None
+            self._task = loop.create_task(self._produce())
+
+    def subscribe(self) -> asyncio.Queue[str]:
+        """Register a client queue, seeded with the latest payload if there is one."""
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=_CLIENT_BUFFER)
+        if self._payload is not None:
+            queue.put_nowait(self._payload)
+        self._subscribers.add(queue)
+        self._ensure_producer()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[str]) -> None:
+        """Drop a client queue; cancel the producer once nobody is listening."""
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def stream(self) -> AsyncGenerator[str]:
+        """Yield payloads for one client until the client goes away."""
+        queue = self.subscribe()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
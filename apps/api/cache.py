@@ -0,0 +1,163 @@
+"""In-process read-model cache for hot API endpoints.
+
+Responses are cached per route and query parameters with a TTL and LRU bound.
+Each entry is tagged with the event channels that make it stale; a background
+listener tails those Redis streams and drops matching entries as soon as an
+agent publishes, so the TTL only matters when Redis is unavailable.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_DEFAULT_TTL = 30.0
+_DEFAULT_MAXSIZE = 256
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache whose entries can be invalidated by tag."""
+
+    def __init__(self, maxsize: int = _DEFAULT_MAXSIZE, ttl: float = _DEFAULT_TTL) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, frozenset[str], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Return ``(hit, value)``; expired entries count as misses."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, _, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value: Any, tags: frozenset[str],
+            ttl: float | None = None) -> None:
+        expires = time.monotonic() + (self._ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, tags, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry tagged with ``tag``. Returns the number removed."""
+        with self._lock:
+            stale = [k for k, (_, tags, _) in self._entries.items() if tag in tags]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+response_cache = ResponseCache()
+
+
+def cached(*tags: str, ttl: float | None = None) -> Callable[[F], F]:
+    """Cache a route's return value per query parameters.
+
+    The ``conn`` dependency is excluded from the key. ``tags`` are the event
+    channels whose messages invalidate the cached responses.
+    """
+    tag_set = frozenset(tags)
+
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(**kwargs: Any) -> Any:
+            key = (fn.__qualname__, tuple(sorted(
+                (k, v) for k, v in kwargs.items() if k != "conn"
+            )))
+            hit, value = response_cache.get(key)
+            if hit:
+                return value
+            value = fn(**kwargs)
+            response_cache.set(key, value, tag_set, ttl)
+            return value
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class InvalidationListener:
+    """Tail event streams and invalidate cache entries tagged with their channel.
+
+    Uses plain ``XREAD`` rather than a consumer group: every API process must
+    see every event, not share them.
+    """
+
+    def __init__(
+        self,
+        redis: Redis[bytes],
+        channels: list[str],
+        cache: ResponseCache = response_cache,
+        block_ms: int = 5000,
+    ) -> None:
+        self._redis = redis
+        self._channels = channels
+        self._cache = cache
+        self._block_ms = block_ms
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _tail_ids(self) -> dict[str, bytes | str]:
+        ids: dict[str, bytes | str] = {}
+        for channel in self._channels:
+            last = self._redis.xrevrange(channel, count=1)
+            ids[channel] = last[0][0] if last else "0-0"
+        return ids
+
+    def poll(self, last_ids: dict[str, bytes | str], block_ms: int | None = None) -> int:
+        """Read new events once, invalidating their channels. Updates ``last_ids``."""
+        streams: dict[Any, Any] = dict(last_ids)  # key types differ between redis stubs
+        raw = self._redis.xread(streams, block=block_ms)
+        invalidated = 0
+        for stream, messages in raw or []:
+            channel = stream.decode() if isinstance(stream, bytes) else str(stream)
+            last_ids[channel] = messages[-1][0]
+            invalidated += self._cache.invalidate(channel)
+        return invalidated
+
+    def _run(self) -> None:
+        last_ids: dict[str, bytes | str] | None = None
+        while not self._stop.is_set():
+            try:
+                if last_ids is None:
+                    last_ids = self._tail_ids()
+                self.poll(last_ids, self._block_ms)
+            except Exception:
+                logger.warning("Cache invalidation listener lost Redis; retrying", exc_info=True)
+                last_ids = None
+                self._cache.clear()
+                self._stop.wait(self._block_ms / 1000)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True, name="cache-invalidation")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -1,20 +1,20 @@
 """Shared DB access helpers for API routes.
 
 Since DuckDB only supports single-process access, the API and background tasks
-run in the same process.  Routes open short-lived connections per request;
-background tasks do the same.
+run in the same process and share one open database through
+``libs.storage.connection.get_manager``.  Routes read through a long-lived
+per-thread cursor; background tasks write under the manager's write lock.
 
 In tests, ``set_db(conn)`` injects an in-memory connection directly.
 """
 from __future__ import annotations
 
 from collections.abc import Generator
-from typing import TYPE_CHECKING
 
 import duckdb
 
-if TYPE_CHECKING:
-    pass
+from apps.api.cache import response_cache
+from libs.storage.connection import get_manager
 
 _db_conn: duckdb.DuckDBPyConnection | None = None
 _db_path: str | None = None
@@ -24,38 +24,31 @@ def set_db(conn: duckdb.DuckDBPyConnection) -> None:
     """Inject a connection directly (used by tests)."""
     global _db_conn  # noqa: PLW0603
     _db_conn = conn
+    response_cache.clear()
 
 
 def set_db_path(path: str) -> None:
-    """Store the DB path for per-request connections."""
+    """Store the DB path served by the shared connection manager."""
     global _db_path  # noqa: PLW0603
     _db_path = path
+    response_cache.clear()
 
 
 def get_conn() -> duckdb.DuckDBPyConnection:
-    """Return a DuckDB connection.
+    """Return a DuckDB connection for the calling thread.
 
     If a test connection was injected via ``set_db()``, return it.
-    Otherwise open a fresh short-lived connection from the configured path.
+    Otherwise return this thread's reader cursor from the connection manager.
+    The returned connection is shared and must not be closed by the caller.
     """
     if _db_conn is not None:
         return _db_conn
     if _db_path is not None:
-        return duckdb.connect(_db_path)
+        return get_manager(_db_path).reader()
     msg = "Database not configured — call set_db() or set_db_path() first"
     raise RuntimeError(msg)
 
 
-def is_test_conn() -> bool:
-    """Return True if a test connection was injected (skip close in that case)."""
-    return _db_conn is not None
-
-
 def get_db() -> Generator[duckdb.DuckDBPyConnection]:
-    """FastAPI dependency that yields a connection and closes it after the request."""
-    conn = get_conn()
-    try:
-        yield conn
-    finally:
-        if not is_test_conn():
-            conn.close()
+    """FastAPI dependency that yields the calling thread's connection."""
+    yield get_conn()
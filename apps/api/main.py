@@ -4,15 +4,23 @@ import logging
 from contextlib import asynccontextmanager
 from typing import TYPE_CHECKING
 
-import duckdb
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from redis import Redis
 
+from agents.config import AgentConfig
+from agents.pipeline import PipelineRunner, build_stages
 from apps.api import scheduler
+from apps.api.cache import InvalidationListener
 from apps.api.db import set_db_path
 from apps.api.middleware import RequestLoggingMiddleware
 from apps.api.routes import health, metrics, rankings, stories, stream
+from libs.events.channels import HN_CONTENT, METRIC_MAPPING, METRIC_ROLLUPS
+from libs.storage.cold_tier import cold_tier_dir, refresh_view
+from libs.storage.connection import get_manager
+from libs.storage.embedding_repository import migrate_embedding_encoding
 from libs.storage.schema import init_schema
+from libs.storage.vector_index import save_indexes
 
 if TYPE_CHECKING:
     from collections.abc import AsyncGenerator
@@ -20,14 +28,24 @@ if TYPE_CHECKING:
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
 logger = logging.getLogger(__name__)
 
+# How long shutdown waits for pipeline stages and scheduler runs to finish
+# before the database is closed under them.
+_SHUTDOWN_SECONDS = 30.0
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
-    db_path = "divyadrishti.duckdb"
-    # Always init schema (handles dimension migration if needed)
-    tmp = duckdb.connect(db_path)
-    init_schema(tmp)
-    tmp.close()
+    config = AgentConfig()
+    db_path = config.db_path
+    manager = get_manager(db_path)
+    # Always init schema (handles dimension migration if needed), then bring
+    # stored vectors into the configured encoding
+    with manager.writer() as conn:
+        init_schema(conn)
+        refresh_view(conn, cold_tier_dir(db_path))
+        migrated = migrate_embedding_encoding(conn, config.embedding_encoding)
+        if migrated:
+            logger.info("Re-encoded %d embeddings as %s", migrated, config.embedding_encoding)
     set_db_path(db_path)
 
     # Eagerly init the OpenAI client on the main thread to avoid
@@ -41,14 +59,31 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
     except Exception:
         logger.warning("Navigator client not configured — NLP agents will fail")
 
+    # Drop cached responses whenever an agent publishes fresh data
+    redis = Redis.from_url(config.redis_url)
+    listener = InvalidationListener(redis, [HN_CONTENT, METRIC_MAPPING, METRIC_ROLLUPS])
+    listener.start()
+
     # Start background agent tasks in-process
     scheduler.start()
     logger.info("Background scheduler started")
 
+    pipeline: PipelineRunner | None = None
+    if config.pipeline_mode:
+        pipeline = PipelineRunner(redis, build_stages(), lock=manager.write_lock)
+        pipeline.start()
+        logger.info("Event-driven pipeline started")
+
     yield
 
-    scheduler.stop()
+    if pipeline is not None and not pipeline.stop(timeout=_SHUTDOWN_SECONDS):
+        logger.warning("Pipeline stages still running after %ss; not waiting", _SHUTDOWN_SECONDS)
+    scheduler.stop(timeout=_SHUTDOWN_SECONDS)
     logger.info("Background scheduler stopped")
+    listener.stop()
+    redis.close()
+    save_indexes()
+    manager.close()
 
 
 app = FastAPI(title="divyadrishti", lifespan=lifespan)
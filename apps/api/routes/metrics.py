@@ -5,7 +5,9 @@ from datetime import datetime, timezone
 import duckdb
 from fastapi import APIRouter, Depends, HTTPException
 
+from apps.api.cache import cached
 from apps.api.db import get_db
+from libs.events.channels import METRIC_MAPPING, METRIC_ROLLUPS
 from libs.schemas.api_responses import (
     MetricDetailResponse,
     MetricExampleResponse,
@@ -42,6 +44,7 @@ def _rollup_to_metric_node(
 
 
 @router.get("/top", response_model=list[MetricNodeResponse])
+@cached(METRIC_ROLLUPS, METRIC_MAPPING)
 def top_metrics(
     limit: int = 20, conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ) -> list[MetricNodeResponse]:
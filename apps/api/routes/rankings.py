@@ -3,7 +3,9 @@ from __future__ import annotations
 import duckdb
 from fastapi import APIRouter, Depends
 
+from apps.api.cache import cached
 from apps.api.db import get_db
+from libs.events.channels import METRIC_ROLLUPS
 from libs.schemas.api_responses import (
     MetricNodeResponse,
     RankingEntryResponse,
@@ -23,6 +25,7 @@ _LENS_FIELDS = {
 
 
 @router.get("", response_model=list[RankingEntryResponse])
+@cached(METRIC_ROLLUPS)
 def get_rankings(
     window: str = "today",
     lens: str = "top",
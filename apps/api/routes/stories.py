@@ -3,13 +3,16 @@ from __future__ import annotations
 import duckdb
 from fastapi import APIRouter, Depends, HTTPException
 
+from apps.api.cache import cached
 from apps.api.db import get_db
+from libs.events.channels import HN_CONTENT
 from libs.schemas.api_responses import CommentResponse, StoryResponse
 
 router = APIRouter(prefix="/stories", tags=["stories"])
 
 
 @router.get("/trending", response_model=list[StoryResponse])
+@cached(HN_CONTENT)
 def trending(limit: int = 30, conn: duckdb.DuckDBPyConnection = Depends(get_db)) -> list[StoryResponse]:
     rows = conn.execute(
         'SELECT id, title, url, score, "by", "time", descendants, "type" '
@@ -29,7 +32,7 @@ def trending(limit: int = 30, conn: duckdb.DuckDBPyConnection = Depends(get_db))
 def get_story(story_id: int, conn: duckdb.DuckDBPyConnection = Depends(get_db)) -> StoryResponse:
     row = conn.execute(
         'SELECT id, title, url, score, "by", "time", descendants, "type" '
-        "FROM hn_item WHERE id = ?",
+        "FROM hn_item_all WHERE id = ?",
         [story_id],
     ).fetchone()
     if not row:
@@ -45,7 +48,7 @@ def get_comments(
     story_id: int, limit: int = 100, conn: duckdb.DuckDBPyConnection = Depends(get_db),
 ) -> list[CommentResponse]:
     rows = conn.execute(
-        'SELECT id, "by", "text", "time", parent FROM hn_item '
+        'SELECT id, "by", "text", "time", parent FROM hn_item_all '
         'WHERE parent = ? AND "type" = \'comment\' ORDER BY "time" ASC LIMIT ?',
         [story_id, limit],
     ).fetchall()
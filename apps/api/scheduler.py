@@ -1,81 +1,293 @@
 """In-process background scheduler for agent tasks.
 
-DuckDB only supports single-process access, so we run periodic tasks in the
-same process as the API server using background threads.
+DuckDB only supports single-process access, so we run agent tasks in the
+same process as the API server on a small worker pool.
+
+Tasks are dispatched from one priority queue rather than fixed-interval
+loops. Each task returns the number of items it processed, which doubles as
+its backlog signal:
+
+* *drain* tasks (the processing pipeline) are rescheduled immediately while
+  they keep finding work, and back off exponentially from ``interval`` up to
+  ``max_interval`` once idle;
+* *poll* tasks (external fetchers and housekeeping) run every ``interval``.
+
+A task that did work wakes the tasks listed in its ``wakes`` (see
+``Scheduler.notify``), so items it hands downstream don't wait out their idle
+backoff. When more tasks are due than there are workers, the lowest priority value
+wins, with waiting time aging a task forward so nothing starves.
 """
 from __future__ import annotations
 
+import contextlib
 import logging
 import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
 
 logger = logging.getLogger(__name__)
 
-# Schedule: (task_name, callable, interval_seconds)
-_SCHEDULE: list[tuple[str, callable, float]] = []
-_stop_event = threading.Event()
+# Seconds of waiting that are worth one priority level.
+_AGING_SECONDS = 10.0
+# In pipeline mode events drive the per-item stages; their sweeps only catch
+# up on events nobody was listening for, so they idle much longer.
+_PIPELINE_SWEEP_SECONDS = 600.0
 
 
-def _build_schedule() -> list[tuple[str, callable, float]]:
-    """Import and register all agent tasks with their intervals."""
-    tasks: list[tuple[str, callable, float]] = []
+@dataclass
+class ScheduledTask:
+    name: str
+    fn: Callable[[], Any]
+    priority: int
+    interval: float
+    max_interval: float | None = None  # set for drain tasks; None = fixed interval
+    next_run: float = 0.0
+    idle_runs: int = 0
+    running: bool = False
+    woken: bool = False  # notified mid-run; run again as soon as it finishes
+    wakes: tuple[str, ...] = ()  # tasks to notify after a run that did work
+    locked: bool = True  # False: the task holds the write lock only around its writes
 
-    from agents.trend_scout.tasks import discover_trending
-    tasks.append(("discover_trending", discover_trending, 90))
+    @property
+    def drains(self) -> bool:
+        return self.max_interval is not None
 
-    from agents.trend_scout.backfill import backfill_stories
-    tasks.append(("backfill_stories", backfill_stories, 300))
+    def delay_after(self, result: object) -> float:
+        """Seconds until the next run, given the result of the last one."""
+        if self.max_interval is None:
+            return self.interval
+        if _did_work(result):
+            self.idle_runs = 0
+            return 0.0
+        delay = min(self.interval * 2.0 ** self.idle_runs, self.max_interval)
+        self.idle_runs += 1
+        return delay
 
-    from agents.thread_harvester.tasks import harvest_threads
-    tasks.append(("harvest_threads", harvest_threads, 20))
+    def score(self, now: float) -> float:
+        """Effective priority: lower runs first, improving the longer it waits."""
+        return self.priority - max(0.0, now - self.next_run) / _AGING_SECONDS
 
-    from agents.normalizer.tasks import normalize_items
-    tasks.append(("normalize_items", normalize_items, 15))
 
-    from agents.author_integrity.tasks import update_author_profiles
-    tasks.append(("update_author_profiles", update_author_profiles, 60))
+def _did_work(result: object) -> bool:
+    return isinstance(result, int) and not isinstance(result, bool) and result > 0
 
-    from agents.opinion_analyst.tasks import analyze_opinions
-    tasks.append(("analyze_opinions", analyze_opinions, 20))
+
+class Scheduler:
+    """Dispatch ``ScheduledTask``s onto at most ``workers`` threads.
+
+    ``lock`` is held around each run of a ``locked`` task; pass the DuckDB
+    manager's write lock so tasks never overlap on the shared writer. Tasks
+    that spend their runs on network calls are registered unlocked and take
+    the same lock around their writes (``agents.celery_app.write_lock``), so
+    with several workers they overlap with the rest.
+    """
+
+    def __init__(
+        self,
+        tasks: list[ScheduledTask],
+        workers: int = 1,
+        lock: contextlib.AbstractContextManager[Any] | None = None,
+    ) -> None:
+        self._tasks = {t.name: t for t in tasks}
+        self._workers = max(1, workers)
+        self._lock = lock if lock is not None else contextlib.nullcontext()
+        self._cond = threading.Condition()
+        self._busy = 0
+        self._stopped = False
+        self._pool: ThreadPoolExecutor | None = None
+        self._dispatcher: threading.Thread | None = None
+
+    @property
+    def tasks(self) -> dict[str, ScheduledTask]:
+        return self._tasks
+
+    def start(self) -> None:
+        self._pool = ThreadPoolExecutor(self._workers, thread_name_prefix="agent-task")
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name="agent-scheduler", daemon=True,
+        )
+        self._dispatcher.start()
+
+    def stop(self, wait: bool = False, timeout: float | None = None) -> bool:
+        """Stop dispatching; with ``wait``, let in-flight runs finish.
+
+        Waits at most ``timeout`` seconds in total. Returns False if runs were
+        still going when it gave up.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._pool is not None:
+            # nothing new is submitted once stopped, so only in-flight runs remain
+            self._pool.shutdown(wait=False)
+        if not wait:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._busy == 0,
+                None if deadline is None else max(0.0, deadline - time.monotonic()),
+            )
+
+    def notify(self, name: str) -> None:
+        """Make ``name`` due now and reset its idle backoff."""
+        with self._cond:
+            task = self._tasks.get(name)
+            if task is None:
+                return
+            task.next_run = min(task.next_run, time.monotonic())
+            task.idle_runs = 0
+            task.woken = task.running
+            self._cond.notify_all()
+
+    def next_task(self, now: float) -> ScheduledTask | None:
+        """The due, idle task with the best score, if any."""
+        due = [t for t in self._tasks.values() if not t.running and t.next_run <= now]
+        return min(due, key=lambda t: t.score(now)) if due else None
+
+    def _wait_timeout(self, now: float) -> float | None:
+        if self._busy >= self._workers:
+            return None  # a finishing task will wake us
+        pending = [t.next_run for t in self._tasks.values() if not t.running]
+        return max(0.0, min(pending) - now) if pending else None
+
+    def _dispatch_loop(self) -> None:
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                task = self.next_task(now) if self._busy < self._workers else None
+                if task is None:
+                    self._cond.wait(self._wait_timeout(now))
+                    continue
+                task.running = True
+                self._busy += 1
+                assert self._pool is not None
+                self._pool.submit(self._run, task)
+
+    def _run(self, task: ScheduledTask) -> None:
+        result: object = None
+        try:
+            with self._lock if task.locked else contextlib.nullcontext():
+                result = task.fn()
+            logger.info("Task %s completed: %s", task.name, result)
+        except Exception:
+            logger.exception("Task %s failed", task.name)
+        finally:
+            with self._cond:
+                task.running = False
+                self._busy -= 1
+                delay = task.delay_after(result)
+                if task.woken:
+                    task.woken, task.idle_runs, delay = False, 0, 0.0
+                task.next_run = time.monotonic() + delay
+                if _did_work(result):
+                    for name in task.wakes:
+                        self.notify(name)
+                self._cond.notify_all()
+
+
+_scheduler: Scheduler | None = None
+
+
+def _build_schedule(pipeline_mode: bool = False) -> list[ScheduledTask]:
+    """Import and register all agent tasks with their priority and cadence."""
+    tasks: list[ScheduledTask] = []
+
+    def sweep(idle_max: float) -> float:
+        return _PIPELINE_SWEEP_SECONDS if pipeline_mode else idle_max
+
+    # Pipeline stages: drain while there is work, back off when idle.
+    from agents.normalizer.tasks import normalize_items
+    tasks.append(ScheduledTask(
+        "normalize_items", normalize_items, 0, 1, sweep(60), wakes=("moderate_items",),
+    ))
 
     from agents.moderator.tasks import moderate_items
-    tasks.append(("moderate_items", moderate_items, 30))
+    tasks.append(ScheduledTask(
+        "moderate_items", moderate_items, 1, 1, sweep(120),
+        wakes=("analyze_opinions", "map_items_to_metrics"),
+    ))
 
-    from agents.metric_mapper.tasks import map_items_to_metrics
-    tasks.append(("map_items_to_metrics", map_items_to_metrics, 20))
+    from agents.opinion_analyst.tasks import analyze_opinions
+    tasks.append(ScheduledTask(
+        "analyze_opinions", analyze_opinions, 2, 1, sweep(60), locked=False,
+    ))
 
-    from agents.metric_gardener.tasks import garden_metrics
-    tasks.append(("garden_metrics", garden_metrics, 120))
+    from agents.metric_mapper.tasks import map_items_to_metrics
+    tasks.append(ScheduledTask(
+        "map_items_to_metrics", map_items_to_metrics, 2, 1, sweep(60), locked=False,
+    ))
 
+    # Pollers, aggregates and housekeeping: fixed cadence. Rollups and author
+    # profiles report how much they recomputed, not what is left to do, so
+    # their results are no backlog signal. Fetchers run unlocked (see
+    # ``Scheduler``) and wake the stage their items feed.
     from agents.rollup_accountant.tasks import compute_rollups
-    tasks.append(("compute_rollups", compute_rollups, 45))
+    tasks.append(ScheduledTask("compute_rollups", compute_rollups, 3, 45))
+
+    from agents.author_integrity.tasks import update_author_profiles
+    tasks.append(ScheduledTask("update_author_profiles", update_author_profiles, 5, 60))
+
+    from agents.thread_harvester.tasks import harvest_threads
+    tasks.append(ScheduledTask(
+        "harvest_threads", harvest_threads, 4, 20, wakes=("normalize_items",), locked=False,
+    ))
+
+    from agents.thread_harvester.firehose import ingest_firehose
+    tasks.append(ScheduledTask(
+        "ingest_firehose", ingest_firehose, 4, 15, wakes=("normalize_items",), locked=False,
+    ))
+
+    from agents.trend_scout.tasks import discover_trending
+    tasks.append(ScheduledTask(
+        "discover_trending", discover_trending, 4, 90, wakes=("harvest_threads",), locked=False,
+    ))
+
+    from agents.metric_gardener.tasks import garden_metrics
+    tasks.append(ScheduledTask("garden_metrics", garden_metrics, 7, 120, locked=False))
 
     from agents.supervisor.tasks import cleanup_watchlist
-    tasks.append(("cleanup_watchlist", cleanup_watchlist, 300))
+    tasks.append(ScheduledTask("cleanup_watchlist", cleanup_watchlist, 8, 300))
 
-    return tasks
+    # Batch jobs that drain a backlog: keep going while there is any left.
+    from agents.trend_scout.backfill import backfill_stories
+    tasks.append(ScheduledTask("backfill_stories", backfill_stories, 6, 1, 300, locked=False))
 
+    from agents.supervisor.tasks import archive_cold_items
+    tasks.append(ScheduledTask("archive_cold_items", archive_cold_items, 9, 300, 3600))
 
-def _run_task_loop(name: str, fn: callable, interval: float) -> None:
-    """Run a single task in a loop with the given interval."""
-    while not _stop_event.is_set():
-        try:
-            result = fn()
-            logger.info("Task %s completed: %s", name, result)
-        except Exception:
-            logger.exception("Task %s failed", name)
-        _stop_event.wait(interval)
+    return tasks
 
 
 def start() -> None:
-    """Start all background task threads."""
-    schedule = _build_schedule()
-    for name, fn, interval in schedule:
-        t = threading.Thread(target=_run_task_loop, args=(name, fn, interval), daemon=True)
-        t.start()
-        logger.info("Started background task: %s (every %ds)", name, interval)
+    """Start the background scheduler."""
+    global _scheduler  # noqa: PLW0603
+    from agents.celery_app import config
+    from libs.storage.connection import get_manager
+
+    _scheduler = Scheduler(
+        _build_schedule(config.pipeline_mode),
+        workers=config.scheduler_workers,
+        lock=get_manager(config.db_path).write_lock,
+    )
+    _scheduler.start()
+    for task in _scheduler.tasks.values():
+        cadence = (
+            f"drain, idle backoff {task.interval:g}-{task.max_interval:g}s"
+            if task.drains else f"every {task.interval:g}s"
+        )
+        logger.info("Scheduled task: %s (priority %d, %s)", task.name, task.priority, cadence)
 
 
-def stop() -> None:
-    """Signal all task threads to stop."""
-    _stop_event.set()
+def stop(timeout: float | None = None) -> None:
+    """Stop dispatching and wait up to ``timeout`` seconds for in-flight runs."""
+    global _scheduler  # noqa: PLW0603
+    if _scheduler is not None:
+        if not _scheduler.stop(wait=True, timeout=timeout):
+            logger.warning("Scheduler tasks still running after %ss; not waiting", timeout)
+        _scheduler = None
@@ -1,8 +1,16 @@
 HN_DISCOVERY = "hn.discovery"
 HN_CONTENT = "hn.content"
+HN_NORMALIZED = "hn.normalized"
+HN_MODERATED = "hn.moderated"
 NLP_OPINION = "nlp.opinion"
 NLP_EMBEDDING = "nlp.embedding"
 METRIC_MAPPING = "metric.mapping"
 METRIC_GARDENING = "metric.gardening"
 METRIC_ROLLUPS = "metric.rollups"
 MODERATION_UI = "moderation.ui"
+PIPELINE_DEAD_LETTER = "pipeline.dead_letter"
+
+# Streams are tailed, not replayed: publishers trim to about this many entries.
+# Anything trimmed before a consumer reached it is still in pipeline_queue,
+# where the scheduled sweeps pick it up.
+STREAM_MAXLEN = 10_000
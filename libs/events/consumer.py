@@ -7,6 +7,13 @@ from redis import Redis
 
 
 class EventConsumer:
+    """Read a stream through a consumer group, acknowledging after processing.
+
+    ``read`` leaves messages pending until they are passed to ``ack``, so a
+    worker that dies mid-batch loses nothing: ``reclaim`` takes over entries
+    that have sat unacknowledged for longer than ``min_idle_ms``.
+    """
+
     def __init__(
         self,
         redis: Redis[bytes],
@@ -18,6 +25,7 @@ class EventConsumer:
         self._channel = channel
         self._group = group
         self._name = name
+        self._claim_cursor = "0-0"
         self._ensure_group()
 
     def _ensure_group(self) -> None:
@@ -26,8 +34,20 @@ class EventConsumer:
         except Exception:  # noqa: BLE001
             pass  # group already exists
 
+    @staticmethod
+    def _to_events(messages: list[Any]) -> list[dict[str, Any]]:
+        events: list[dict[str, Any]] = []
+        for msg_id, fields in messages:
+            if fields is None:
+                continue  # entry was trimmed from the stream while pending
+            mid = msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id)
+            data_raw = fields.get(b"data", b"{}")
+            data_str = data_raw.decode() if isinstance(data_raw, bytes) else str(data_raw)
+            events.append({"id": mid, **json.loads(data_str)})
+        return events
+
     def read(self, count: int = 10, block_ms: int = 0) -> list[dict[str, Any]]:
-        """Read pending messages from the consumer group."""
+        """Read new messages from the consumer group. They stay pending until acked."""
         raw = self._redis.xreadgroup(
             self._group,
             self._name,
@@ -37,14 +57,40 @@ class EventConsumer:
         )
         if not raw:
             return []
+        return [event for _stream, messages in raw for event in self._to_events(messages)]
 
-        events: list[dict[str, Any]] = []
-        for _stream, messages in raw:
-            for msg_id, fields in messages:
-                mid = msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id)
-                data_raw = fields.get(b"data", b"{}")
-                data_str = data_raw.decode() if isinstance(data_raw, bytes) else str(data_raw)
-                event: dict[str, Any] = {"id": mid, **json.loads(data_str)}
-                events.append(event)
-                self._redis.xack(self._channel, self._group, msg_id)
-        return events
+    def ack(self, events: list[dict[str, Any]]) -> int:
+        """Acknowledge processed events with a single XACK. Returns the number acked."""
+        if not events:
+            return 0
+        return int(self._redis.xack(self._channel, self._group, *(e["id"] for e in events)))
+
+    def delivery_counts(self, events: list[dict[str, Any]]) -> dict[str, int]:
+        """Return how many times each pending event has been delivered (XPENDING)."""
+        if not events:
+            return {}
+        pipe = self._redis.pipeline(transaction=False)
+        for event in events:
+            pipe.xpending_range(
+                self._channel, self._group, min=event["id"], max=event["id"], count=1,
+            )
+        counts: dict[str, int] = {}
+        for entries in pipe.execute():
+            for entry in entries:
+                mid = entry["message_id"]
+                mid = mid.decode() if isinstance(mid, bytes) else str(mid)
+                counts[mid] = int(entry["times_delivered"])
+        return counts
+
+    def reclaim(self, min_idle_ms: int = 60_000, count: int = 10) -> list[dict[str, Any]]:
+        """Claim up to ``count`` messages left pending by a stalled consumer (XAUTOCLAIM).
+
+        Successive calls walk the pending list from where the last one stopped.
+        """
+        raw = self._redis.xautoclaim(
+            self._channel, self._group, self._name,
+            min_idle_time=min_idle_ms, start_id=self._claim_cursor, count=count,
+        )
+        next_id, messages = raw[0], raw[1]
+        self._claim_cursor = next_id.decode() if isinstance(next_id, bytes) else str(next_id)
+        return self._to_events(messages)
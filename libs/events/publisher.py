@@ -1,16 +1,38 @@
 from __future__ import annotations
 
 import json
+from collections.abc import Iterable
 from typing import Any
 
 from redis import Redis
 
 
+def _decode_id(msg_id: object) -> str:
+    return msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id)
+
+
 class EventPublisher:
     def __init__(self, redis: Redis[bytes]) -> None:
         self._redis = redis
 
-    def publish(self, channel: str, data: dict[str, Any]) -> str:
-        """Publish an event to a Redis Stream via XADD. Returns the message ID."""
-        msg_id: bytes = self._redis.xadd(channel, {"data": json.dumps(data)})  # type: ignore[assignment]
-        return msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id)
+    def publish(self, channel: str, data: dict[str, Any], maxlen: int | None = None) -> str:
+        """Publish an event to a Redis Stream via XADD. Returns the message ID.
+
+        ``maxlen`` trims the stream to roughly that many entries (``MAXLEN ~``).
+        """
+        msg_id = self._redis.xadd(
+            channel, {"data": json.dumps(data)}, maxlen=maxlen, approximate=True,
+        )
+        return _decode_id(msg_id)
+
+    def publish_many(
+        self,
+        channel: str,
+        events: Iterable[dict[str, Any]],
+        maxlen: int | None = None,
+    ) -> list[str]:
+        """Publish several events in one pipelined round trip. Returns their IDs in order."""
+        pipe = self._redis.pipeline(transaction=False)
+        for data in events:
+            pipe.xadd(channel, {"data": json.dumps(data)}, maxlen=maxlen, approximate=True)
+        return [_decode_id(msg_id) for msg_id in pipe.execute()]
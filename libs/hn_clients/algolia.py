@@ -24,6 +24,18 @@ class AlgoliaHNClient:
         if not self._external:
             await self._client.aclose()
 
+    async def get_item_tree(self, item_id: int) -> dict[str, Any] | None:
+        """Fetch an item with its whole nested ``children`` tree in one request.
+
+        Returns None if Algolia does not know the item (yet).
+        """
+        resp = await self._client.get(f"{_BASE_URL}/items/{item_id}")
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        data = resp.json()
+        return data if isinstance(data, dict) else None
+
     async def search_front_page(self, hits_per_page: int = 30) -> list[dict[str, Any]]:
         """Fetch current front page stories."""
         resp = await self._client.get(
@@ -40,15 +52,33 @@ class AlgoliaHNClient:
         numeric_filters: str | None = None,
     ) -> list[dict[str, Any]]:
         """Search items sorted by date."""
+        result = await self.search_by_date_page(
+            tags=tags, hits_per_page=hits_per_page, numeric_filters=numeric_filters,
+        )
+        return result["hits"]  # type: ignore[no-any-return]
+
+    async def search_by_date_page(
+        self,
+        tags: str = "story",
+        hits_per_page: int = 30,
+        numeric_filters: str | None = None,
+        page: int = 0,
+    ) -> dict[str, Any]:
+        """Fetch one page of a date-sorted search, with ``nbPages``/``nbHits``.
+
+        Algolia serves at most 1000 hits per query however it is paged, so a
+        result with ``nbHits`` beyond ``nbPages * hitsPerPage`` is truncated.
+        """
         params: dict[str, str | int] = {
             "tags": tags,
             "hitsPerPage": hits_per_page,
+            "page": page,
         }
         if numeric_filters:
             params["numericFilters"] = numeric_filters
         resp = await self._client.get(f"{_BASE_URL}/search_by_date", params=params)
         resp.raise_for_status()
-        return resp.json()["hits"]  # type: ignore[no-any-return]
+        return resp.json()  # type: ignore[no-any-return]
 
     async def search_query(
         self, query: str, tags: str = "story", hits_per_page: int = 30
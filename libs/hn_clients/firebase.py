@@ -31,6 +31,19 @@ class FirebaseHNClient:
         data = resp.json()
         return data if isinstance(data, dict) else None
 
+    async def get_max_item(self) -> int:
+        """The largest item id assigned so far."""
+        resp = await self._client.get(f"{_BASE_URL}/maxitem.json")
+        resp.raise_for_status()
+        return int(resp.json())
+
+    async def get_updates(self) -> dict[str, list[Any]]:
+        """Recently changed item ids and usernames (``items``/``profiles``)."""
+        resp = await self._client.get(f"{_BASE_URL}/updates.json")
+        resp.raise_for_status()
+        data = resp.json()
+        return data if isinstance(data, dict) else {"items": [], "profiles": []}
+
     async def get_top_stories(self) -> list[int]:
         resp = await self._client.get(f"{_BASE_URL}/topstories.json")
         resp.raise_for_status()
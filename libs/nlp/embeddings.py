@@ -1,17 +1,62 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+from typing import TYPE_CHECKING, Any
+
 import numpy as np
 
-from libs.nlp.navigator import get_client, get_embedding_model
+from libs.nlp.navigator import (
+    acall_with_retry,
+    call_with_retry,
+    get_client,
+    get_embedding_model,
+    new_async_client,
+)
 from libs.storage.schema import EMBEDDING_DIM
 
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike
+
 _model: EmbeddingModel | None = None
 
+# Per-request limits, kept well under the provider's so estimates have slack.
+_MAX_CHUNK_TOKENS = 32_000
+_MAX_CHUNK_INPUTS = 64
+_DEFAULT_CONCURRENCY = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English BPE)."""
+    return len(text) // 4 + 1
+
+
+def chunk_by_tokens(
+    texts: list[str],
+    max_tokens: int = _MAX_CHUNK_TOKENS,
+    max_inputs: int = _MAX_CHUNK_INPUTS,
+) -> list[tuple[int, int]]:
+    """Split ``texts`` into contiguous ``(start, end)`` spans within both budgets.
+
+    A single text over ``max_tokens`` gets a span of its own.
+    """
+    spans: list[tuple[int, int]] = []
+    start, tokens = 0, 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if i > start and (tokens + cost > max_tokens or i - start >= max_inputs):
+            spans.append((start, i))
+            start, tokens = i, 0
+        tokens += cost
+    if start < len(texts):
+        spans.append((start, len(texts)))
+    return spans
 
-def cosine_similarity(a: list[float], b: list[float]) -> float:
+
+def cosine_similarity(a: ArrayLike, b: ArrayLike) -> float:
     """Compute cosine similarity between two vectors."""
-    va = np.array(a, dtype=np.float32)
-    vb = np.array(b, dtype=np.float32)
+    va = np.asarray(a, dtype=np.float32)
+    vb = np.asarray(b, dtype=np.float32)
     dot = float(np.dot(va, vb))
     norm_a = float(np.linalg.norm(va))
     norm_b = float(np.linalg.norm(vb))
@@ -20,6 +65,17 @@ def cosine_similarity(a: list[float], b: list[float]) -> float:
     return dot / (norm_a * norm_b)
 
 
+def cosine_similarity_matrix(a: ArrayLike, b: ArrayLike) -> np.ndarray:
+    """Pairwise cosine similarity between the rows of ``a`` and ``b``.
+
+    Returns an ``(len(a) x len(b))`` float32 matrix; zero rows score 0.
+    """
+    ma = normalize_rows(np.atleast_2d(np.asarray(a, dtype=np.float32)))
+    mb = normalize_rows(np.atleast_2d(np.asarray(b, dtype=np.float32)))
+    similarity: np.ndarray = ma @ mb.T
+    return similarity
+
+
 def softmax_weights(similarities: list[float], temperature: float = 1.0) -> list[float]:
     """Apply softmax to similarity scores."""
     arr = np.array(similarities, dtype=np.float64) / temperature
@@ -31,22 +87,101 @@ def softmax_weights(similarities: list[float], temperature: float = 1.0) -> list
     return (exp / total).tolist()  # type: ignore[return-value]
 
 
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a 2-D array. All-zero rows stay zero."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized: np.ndarray = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    return normalized
+
+
+def softmax_rows(scores: np.ndarray, temperature: float = 1.0) -> np.ndarray:
+    """Row-wise ``softmax_weights`` over a 2-D array of similarity scores."""
+    arr = scores.astype(np.float64) / temperature
+    arr -= arr.max(axis=1, keepdims=True)  # numerical stability
+    exp = np.exp(arr)
+    weights: np.ndarray = exp / exp.sum(axis=1, keepdims=True)
+    return weights
+
+
+def _decode_response(response: Any) -> np.ndarray:
+    """Stack an embeddings response into an ``(n x dim)`` float32 matrix in input order.
+
+    Vectors are requested base64-encoded and decoded straight into one buffer,
+    skipping per-float Python objects. Plain float lists (from providers that
+    ignore ``encoding_format``) are accepted too.
+    """
+    data = sorted(response.data, key=lambda d: d.index)
+    if data and isinstance(data[0].embedding, str):
+        raw = b"".join(base64.b64decode(item.embedding) for item in data)
+        return np.frombuffer(raw, dtype=np.float32).reshape(len(data), -1)
+    return np.asarray([item.embedding for item in data], dtype=np.float32).reshape(len(data), -1)
+
+
+def _stack(chunks: list[np.ndarray]) -> np.ndarray:
+    if not chunks:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.concatenate(chunks)
+
+
 class EmbeddingModel:
     def __init__(self) -> None:
         self._client = get_client()
 
-    def encode(self, text: str) -> list[float]:
-        """Encode a single text to a 1024-dim vector."""
-        return self.encode_batch([text])[0]
-
-    def encode_batch(self, texts: list[str]) -> list[list[float]]:
-        """Encode a batch of texts."""
-        response = self._client.embeddings.create(
-            model=get_embedding_model(),
-            input=texts,
-            dimensions=EMBEDDING_DIM,
-        )
-        return [item.embedding for item in response.data]
+    def encode(self, text: str) -> np.ndarray:
+        """Encode a single text to a 1024-dim float32 vector."""
+        vector: np.ndarray = self.encode_batch([text])[0]
+        return vector
+
+    def encode_batch(self, texts: list[str]) -> np.ndarray:
+        """Encode a batch of texts into an ``(n x dim)`` float32 matrix.
+
+        Sends one provider-sized chunk at a time.
+        """
+        chunks: list[np.ndarray] = []
+        for start, end in chunk_by_tokens(texts):
+            chunk = texts[start:end]
+            response = call_with_retry(lambda: self._client.embeddings.create(
+                model=get_embedding_model(),
+                input=chunk,  # noqa: B023 -- called before the loop advances
+                dimensions=EMBEDDING_DIM,
+                encoding_format="base64",
+            ))
+            chunks.append(_decode_response(response))
+        return _stack(chunks)
+
+    async def aencode_batch(
+        self,
+        texts: list[str],
+        concurrency: int = _DEFAULT_CONCURRENCY,
+    ) -> np.ndarray:
+        """Encode a batch of texts with concurrent requests.
+
+        Inputs are split into chunks by estimated tokens and sent over one
+        async client, at most ``concurrency`` at a time. Each chunk retries
+        on its own, and results come back in input order as one
+        ``(n x dim)`` float32 matrix.
+        """
+        spans = chunk_by_tokens(texts)
+        if not spans:
+            return _stack([])
+        semaphore = asyncio.Semaphore(concurrency)
+        client = new_async_client()
+
+        async def encode(chunk: list[str]) -> np.ndarray:
+            async with semaphore:
+                response = await acall_with_retry(lambda: client.embeddings.create(
+                    model=get_embedding_model(),
+                    input=chunk,
+                    dimensions=EMBEDDING_DIM,
+                    encoding_format="base64",
+                ))
+            return _decode_response(response)
+
+        try:
+            chunks = await asyncio.gather(*(encode(texts[s:e]) for s, e in spans))
+        finally:
+            await client.close()
+        return _stack(list(chunks))
 
 
 def get_model() -> EmbeddingModel:
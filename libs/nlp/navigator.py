@@ -1,10 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
+import random
 import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_RETRYABLE = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
 
 _client: OpenAI | None = None
 _lock = threading.Lock()
@@ -33,6 +53,20 @@ def get_labeling_model() -> str:
     return os.getenv("DD_LABELING_MODEL", "llama-3.3-70b-instruct")
 
 
+def _client_kwargs() -> dict[str, object]:
+    """Resolve OpenAI client settings from the environment."""
+    _ensure_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    base_url = os.getenv("OPENAI_BASE_URL")
+    if not api_key or not base_url:
+        raise RuntimeError("Need OPENAI_API_KEY and OPENAI_BASE_URL in .env")
+
+    hdr_name = os.getenv("PROXY_AUTH_HEADER")
+    if hdr_name:
+        return {"api_key": "DUMMY", "base_url": base_url, "default_headers": {hdr_name: api_key}}
+    return {"api_key": api_key, "base_url": base_url}
+
+
 def get_client() -> OpenAI:
     """Lazy singleton for the Navigator OpenAI client."""
     global _client  # noqa: PLW0603
@@ -42,20 +76,77 @@ def get_client() -> OpenAI:
     with _lock:
         if _client is not None:
             return _client
-
-        _ensure_dotenv()
-        api_key = os.getenv("OPENAI_API_KEY")
-        base_url = os.getenv("OPENAI_BASE_URL")
-        if not api_key or not base_url:
-            raise RuntimeError("Need OPENAI_API_KEY and OPENAI_BASE_URL in .env")
-
-        extra_headers = {}
-        hdr_name = os.getenv("PROXY_AUTH_HEADER")
-        if hdr_name:
-            extra_headers[hdr_name] = api_key
-            _client = OpenAI(
-                api_key="DUMMY", base_url=base_url, default_headers=extra_headers,
-            )
-        else:
-            _client = OpenAI(api_key=api_key, base_url=base_url)
+        _client = OpenAI(**_client_kwargs())  # type: ignore[arg-type]
     return _client
+
+
+def new_async_client() -> AsyncOpenAI:
+    """Create an async Navigator client. Caller must ``await client.close()``.
+
+    Not a singleton: an async client's connection pool is bound to the event
+    loop it was first used on, and agents start a fresh loop per run.
+    """
+    return AsyncOpenAI(**_client_kwargs())  # type: ignore[arg-type]
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Return the server's ``Retry-After`` delay in seconds, if it sent one."""
+    if not isinstance(exc, APIStatusError):
+        return None
+    value = exc.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_delay(exc: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    """Seconds to wait before retry ``attempt`` (0-based) after ``exc``.
+
+    Honors ``Retry-After`` when present; otherwise exponential backoff with
+    full jitter so concurrent callers do not retry in lockstep.
+    """
+    hinted = _retry_after(exc)
+    if hinted is not None:
+        return min(hinted, max_delay)
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    attempts: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+) -> T:
+    """Call ``fn``, retrying rate limits and transient API errors with backoff."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except _RETRYABLE as exc:
+            if attempt == attempts - 1:
+                raise
+            delay = retry_delay(exc, attempt, base_delay, max_delay)
+            logger.warning("API call failed (%s); retry %d in %.1fs",
+                           type(exc).__name__, attempt + 1, delay)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+async def acall_with_retry(
+    fn: Callable[[], Awaitable[T]],
+    attempts: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+) -> T:
+    """Async ``call_with_retry``: backs off with ``asyncio.sleep``."""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except _RETRYABLE as exc:
+            if attempt == attempts - 1:
+                raise
+            delay = retry_delay(exc, attempt, base_delay, max_delay)
+            logger.warning("API call failed (%s); retry %d in %.1fs",
+                           type(exc).__name__, attempt + 1, delay)
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
@@ -2,11 +2,9 @@ from __future__ import annotations
 
 import json
 
-from libs.nlp.navigator import get_client, get_opinion_model
+from libs.nlp.navigator import call_with_retry, get_client, get_opinion_model
 from libs.schemas.opinion_signal import OpinionSignal
 
-_MODEL_VERSION = "navigator-llama-3.3-70b"
-
 _SYSTEM_PROMPT = """\
 You are a sentiment analysis model calibrated for Hacker News tech discourse.
 For each text, output a JSON object with these fields:
@@ -31,20 +29,31 @@ class SentimentModel:
         self._client = get_client()
 
     def predict(self, text: str) -> OpinionSignal:
-        """Predict sentiment for a single text."""
-        return self.predict_batch([text])[0]
-
-    def predict_batch(self, texts: list[str]) -> list[OpinionSignal]:
-        """Predict sentiment for a batch of texts."""
+        """Predict sentiment for a single text (neutral if the model skips it)."""
+        signal = self.predict_batch([text])[0]
+        if signal is None:
+            signal = OpinionSignal(
+                item_id=0, label="neutral", confidence=0.5, model_version=get_opinion_model(),
+            )
+        return signal
+
+    def predict_batch(self, texts: list[str]) -> list[OpinionSignal | None]:
+        """Predict sentiment for a batch of texts.
+
+        Rate limits and transient API errors are retried with backoff. Texts
+        the model returned no entry for come back as ``None``. Signals carry
+        the resolved model name as their ``model_version``.
+        """
+        model = get_opinion_model()
         numbered = "\n".join(f"[{i}] {t[:500]}" for i, t in enumerate(texts))
-        response = self._client.chat.completions.create(
-            model=get_opinion_model(),
+        response = call_with_retry(lambda: self._client.chat.completions.create(
+            model=model,
             messages=[
                 {"role": "system", "content": _SYSTEM_PROMPT},
                 {"role": "user", "content": numbered},
             ],
             temperature=0.1,
-        )
+        ))
         raw = response.choices[0].message.content or "[]"
         parsed = json.loads(raw)
 
@@ -57,20 +66,19 @@ class SentimentModel:
             else:
                 parsed = list(parsed.values())[0] if parsed else []
 
-        signals: list[OpinionSignal] = []
-        for i, text in enumerate(texts):
-            if i < len(parsed):
-                entry = parsed[i]
-            else:
-                entry = {"label": "neutral", "valence": 0.0, "intensity": 0.0, "confidence": 0.5}
-
+        signals: list[OpinionSignal | None] = []
+        for i in range(len(texts)):
+            if i >= len(parsed):
+                signals.append(None)
+                continue
+            entry = parsed[i]
             signals.append(OpinionSignal(
                 item_id=0,
                 valence=round(float(entry.get("valence", 0.0)), 2),
                 intensity=round(float(entry.get("intensity", 0.0)), 4),
                 confidence=round(float(entry.get("confidence", 0.5)), 4),
                 label=entry.get("label", "neutral"),
-                model_version=_MODEL_VERSION,
+                model_version=model,
             ))
 
         return signals
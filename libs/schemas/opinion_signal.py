@@ -8,3 +8,4 @@ class OpinionSignal(BaseModel):
     confidence: float = 0.0  # 0..1
     label: str = "neutral"  # positive | negative | neutral
     model_version: str = ""
+    analyzed_at: int = 0  # unix timestamp
@@ -6,3 +6,7 @@ class WatchlistEntry(BaseModel):
     priority_score: float = 0.0
     ttl_expires: int = 0
     last_fetched: int | None = None
+    next_poll: int = 0
+    comment_rate: float = 0.0  # comments per second, smoothed across harvests
+    last_descendants: int | None = None
+    lane: str = "live"  # live | backfill
@@ -27,3 +27,6 @@ class BackfillStateRepository:
 
     def set(self, key: str, value: str, updated_at: int) -> None:
         self._conn.execute(_UPSERT_SQL, [key, value, updated_at])
+
+    def delete(self, key: str) -> None:
+        self._conn.execute('DELETE FROM backfill_state WHERE "key" = ?', [key])
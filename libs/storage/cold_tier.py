@@ -0,0 +1,139 @@
+"""Parquet cold tier for ``hn_item``.
+
+Items older than the configured age move out of the hot table into
+Hive-style day partitions next to the database file::
+
+    divyadrishti.duckdb.cold/hn_item/day=2024-01-31/part-<run>-0.parquet
+
+Agents only ever touch the last month, so they keep reading the small hot
+table. ``hn_item_all`` unions hot and cold rows for historical reads; an item
+that was re-harvested after archiving is served from the hot table, and one
+archived twice from its newest copy.
+"""
+from __future__ import annotations
+
+import glob
+import logging
+import os
+import uuid
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import duckdb
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_VIEW = "hn_item_all"
+
+# Rollups and the opinion analyst read the last month; never archive inside it.
+MIN_HOT_DAYS = 31
+
+_COLUMNS = (
+    'id, "type", "by", author_hash, "time", "text", text_clean, '
+    "parent, kids, title, url, score, descendants, deleted, dead"
+)
+
+_HOT_VIEW_SQL = f"CREATE OR REPLACE VIEW {ARCHIVE_VIEW} AS SELECT {_COLUMNS} FROM hn_item"
+
+_TIERED_VIEW_SQL = """
+CREATE OR REPLACE VIEW {view} AS
+SELECT {columns} FROM hn_item
+UNION ALL
+SELECT {columns} FROM (
+    SELECT * FROM read_parquet('{files}', hive_partitioning = true, union_by_name = true) c
+    WHERE c.id NOT IN (SELECT id FROM hn_item)
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY c.id ORDER BY c.archived_at DESC) = 1
+)
+"""
+
+_SELECT_BATCH_SQL = """
+SELECT id FROM hn_item WHERE "time" < ? ORDER BY "time" LIMIT ?
+"""
+
+_COPY_SQL = """
+COPY (
+    SELECT {columns},
+        strftime(make_timestamp(h."time"::BIGINT * 1000000), '%Y-%m-%d') AS day,
+        {archived_at}::BIGINT AS archived_at
+    FROM hn_item h
+    JOIN _archive_ids a ON h.id = a.id
+) TO '{root}' (
+    FORMAT PARQUET, PARTITION_BY (day), OVERWRITE_OR_IGNORE,
+    FILENAME_PATTERN 'part-{run}-{{i}}'
+)
+"""
+
+
+def cold_tier_dir(db_path: str) -> str | None:
+    """Directory holding ``hn_item`` partitions for ``db_path``; None for in-memory DBs."""
+    if db_path == ":memory:":
+        return None
+    return f"{db_path}.cold/hn_item"
+
+
+def _glob(root: str) -> str:
+    return os.path.join(root, "*", "*.parquet")
+
+
+def _quote(path: str) -> str:
+    return os.path.abspath(path).replace("'", "''")
+
+
+def refresh_view(conn: duckdb.DuckDBPyConnection, root: str | None) -> None:
+    """Point ``hn_item_all`` at the hot table plus whatever partitions exist."""
+    if root is None or not glob.glob(_glob(root)):
+        conn.execute(_HOT_VIEW_SQL)
+        return
+    conn.execute(_TIERED_VIEW_SQL.format(
+        view=ARCHIVE_VIEW, columns=_COLUMNS, files=_quote(_glob(root)),
+    ))
+
+
+def cold_cutoff(now: int, age_days: int) -> int:
+    """Return the timestamp before which items belong in the cold tier."""
+    return now - max(age_days, MIN_HOT_DAYS) * 86400
+
+
+def archive_items(
+    conn: duckdb.DuckDBPyConnection,
+    root: str,
+    cutoff: int,
+    now: int,
+    batch_size: int = 100_000,
+) -> int:
+    """Move up to ``batch_size`` items older than ``cutoff`` to Parquet.
+
+    Returns the number of items moved. The oldest go first, so repeated calls
+    drain the backlog. Rows leave the hot table only after their partition
+    files are written, and the files are removed again if the delete fails.
+    """
+    ids = conn.execute(_SELECT_BATCH_SQL, [cutoff, batch_size]).fetchnumpy()["id"]
+    if not len(ids):
+        return 0
+
+    run = uuid.uuid4().hex
+    os.makedirs(root, exist_ok=True)
+    conn.register("_archive_ids", {"id": ids})
+    try:
+        conn.execute(_COPY_SQL.format(
+            columns=", ".join(f"h.{c.strip()}" for c in _COLUMNS.split(",")),
+            archived_at=int(now), root=_quote(root), run=run,
+        ))
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute("DELETE FROM hn_item WHERE id IN (SELECT id FROM _archive_ids)")
+            conn.execute(
+                "DELETE FROM pipeline_queue WHERE item_id IN (SELECT id FROM _archive_ids)",
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            for path in glob.glob(os.path.join(root, "*", f"part-{run}-*.parquet")):
+                os.remove(path)
+            raise
+    finally:
+        conn.unregister("_archive_ids")
+
+    refresh_view(conn, root)
+    logger.info("Archived %d items older than %d to %s", len(ids), cutoff, root)
+    return len(ids)
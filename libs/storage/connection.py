@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from contextlib import contextmanager
 from typing import TYPE_CHECKING
 
@@ -34,3 +35,65 @@ class DuckDBConnection:
             yield cur
         finally:
             cur.close()
+
+
+class ConnectionManager:
+    """Process-wide owner of one open DuckDB database.
+
+    Readers get a long-lived cursor per thread; writers take ``write_lock`` so
+    agents never run write transactions against each other.
+    """
+
+    def __init__(self, db_path: str | None = None) -> None:
+        self._db = DuckDBConnection(db_path)
+        self._connect_lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self.write_lock = threading.RLock()
+
+    def _root(self) -> duckdb.DuckDBPyConnection:
+        with self._connect_lock:
+            return self._db.connect()
+
+    def open_cursor(self) -> duckdb.DuckDBPyConnection:
+        """Return a new cursor. Caller must close it when done."""
+        return self._root().cursor()
+
+    def reader(self) -> duckdb.DuckDBPyConnection:
+        """Return this thread's cursor, created on first use. Do not close it."""
+        cur: duckdb.DuckDBPyConnection | None = getattr(self._local, "cursor", None)
+        if cur is None or getattr(self._local, "generation", None) != self._generation:
+            cur = self.open_cursor()
+            self._local.cursor = cur
+            self._local.generation = self._generation
+        return cur
+
+    @contextmanager
+    def writer(self) -> Generator[duckdb.DuckDBPyConnection]:
+        """Yield a cursor while holding the process-wide write lock."""
+        with self.write_lock:
+            cur = self.open_cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    def close(self) -> None:
+        """Close the database; thread-local readers are reopened on next use."""
+        with self._connect_lock:
+            self._generation += 1
+            self._db.close()
+
+
+_managers: dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_path: str) -> ConnectionManager:
+    """Return the process-wide manager for ``db_path``, creating it on first use."""
+    with _managers_lock:
+        manager = _managers.get(db_path)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _managers[db_path] = manager
+        return manager
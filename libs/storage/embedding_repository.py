@@ -2,37 +2,166 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 from libs.schemas.embedding import Embedding
+from libs.storage.quantization import check_encoding, dequantize, quantize
+from libs.storage.schema import EMBEDDING_DIM
 
 if TYPE_CHECKING:
     import duckdb
 
-_UPSERT_SQL = """
-INSERT INTO embedding (item_id, embedding, model_version)
-VALUES (?, ?, ?)
+    from libs.storage.vector_index import VectorIndex
+
+_ON_CONFLICT_SQL = """
 ON CONFLICT (item_id) DO UPDATE SET
     embedding = excluded.embedding,
+    quantized = excluded.quantized,
+    scale = excluded.scale,
+    "encoding" = excluded."encoding",
     model_version = excluded.model_version
 """
 
-_COLUMNS = "item_id, embedding, model_version"
+_UPSERT_SQL = """
+INSERT INTO embedding (item_id, embedding, quantized, scale, "encoding", model_version)
+VALUES (?, ?, NULL, NULL, 'float32', ?)
+""" + _ON_CONFLICT_SQL
+
+# Vectors are staged in long form (one row per component) from NumPy arrays,
+# which DuckDB scans natively, then folded back into fixed-size arrays.
+_UPSERT_STAGED_SQL = f"""
+INSERT INTO embedding (item_id, embedding, quantized, scale, "encoding", model_version)
+SELECT
+    s.item_id, list(s.v ORDER BY s.pos)::FLOAT[{EMBEDDING_DIM}], NULL, NULL, 'float32',
+    m.model_version
+FROM _embedding_staging s
+JOIN _embedding_versions m ON s.item_id = m.item_id
+GROUP BY s.item_id, m.model_version
+""" + _ON_CONFLICT_SQL
+
+_UPSERT_QUANTIZED_SQL = """
+INSERT INTO embedding (item_id, embedding, quantized, scale, "encoding", model_version)
+SELECT UNNEST(?::INTEGER[]), NULL, UNNEST(?::BLOB[]), UNNEST(?::FLOAT[]), ?, UNNEST(?::VARCHAR[])
+""" + _ON_CONFLICT_SQL
+
+_GET_FLOAT_VECTORS_SQL = """
+SELECT e.item_id, generate_subscripts(e.embedding, 1) AS pos, UNNEST(e.embedding) AS v
+FROM embedding e
+JOIN _embedding_lookup l ON e.item_id = l.item_id
+WHERE e.embedding IS NOT NULL
+ORDER BY e.item_id, pos
+"""
+
+_GET_QUANTIZED_VECTORS_SQL = """
+SELECT e.item_id, e."encoding", e.quantized, e.scale
+FROM embedding e
+JOIN _embedding_lookup l ON e.item_id = l.item_id
+WHERE e.quantized IS NOT NULL
+"""
+
+_COLUMNS = 'item_id, embedding, model_version, quantized, scale, "encoding"'
 
 
 def _row_to_embedding(row: tuple[object, ...]) -> Embedding:
+    vector: list[float] = []
+    if row[1]:
+        vector = list(row[1])  # type: ignore[call-overload]
+    elif row[3] is not None:
+        blob, scale, encoding = row[3], row[4], row[5]
+        vector = dequantize(
+            [blob], [scale], encoding, EMBEDDING_DIM,  # type: ignore[list-item, arg-type]
+        )[0].tolist()
     return Embedding(
         item_id=row[0],  # type: ignore[arg-type]
-        embedding=list(row[1]) if row[1] else [],  # type: ignore[arg-type]
+        embedding=vector,
         model_version=row[2],  # type: ignore[arg-type]
     )
 
 
 class EmbeddingRepository:
-    def __init__(self, conn: duckdb.DuckDBPyConnection) -> None:
+    """Embedding storage; when given a ``VectorIndex``, upserts keep it current.
+
+    ``encoding`` selects how new vectors are written (see
+    ``libs.storage.quantization``). Reads decode any stored encoding, so rows
+    written under different modes can coexist.
+    """
+
+    def __init__(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        index: VectorIndex | None = None,
+        encoding: str = "float32",
+    ) -> None:
         self._conn = conn
+        self._index = index
+        self._encoding = check_encoding(encoding)
 
     def upsert(self, emb: Embedding) -> None:
+        if emb.embedding and self._encoding != "float32":
+            self.upsert_many([emb])
+            return
         embedding = emb.embedding if emb.embedding else None
         self._conn.execute(_UPSERT_SQL, [emb.item_id, embedding, emb.model_version])
+        if self._index is not None:
+            if embedding:
+                self._index.add([emb.item_id], np.asarray([embedding], dtype=np.float32))
+            else:
+                self._index.remove([emb.item_id])
+
+    def upsert_many(self, embs: list[Embedding]) -> None:
+        """Upsert a batch of embeddings with one set-based statement."""
+        latest = {e.item_id: e for e in embs}
+        vectors = [e for e in latest.values() if e.embedding]
+        for emb in latest.values():
+            if not emb.embedding:
+                self.upsert(emb)
+        if not vectors:
+            return
+
+        item_ids = np.array([e.item_id for e in vectors], dtype=np.int64)
+        matrix = np.asarray([e.embedding for e in vectors], dtype=np.float32)
+        self.upsert_vectors(item_ids, matrix, [e.model_version for e in vectors])
+
+    def upsert_vectors(
+        self,
+        item_ids: np.ndarray,
+        matrix: np.ndarray,
+        model_versions: list[str],
+    ) -> None:
+        """Upsert a ``(n x dim)`` float matrix in the repository's encoding."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self._encoding == "float32":
+            self._upsert_float(item_ids, matrix, model_versions)
+        else:
+            blobs, scales = quantize(matrix, self._encoding)
+            self._conn.execute(_UPSERT_QUANTIZED_SQL, [
+                item_ids.tolist(), blobs, scales.tolist(), self._encoding, model_versions,
+            ])
+        if self._index is not None:
+            self._index.add(item_ids.tolist(), matrix)
+
+    def _upsert_float(
+        self,
+        item_ids: np.ndarray,
+        matrix: np.ndarray,
+        model_versions: list[str],
+    ) -> None:
+        n, dim = matrix.shape
+        self._conn.register("_embedding_staging", {
+            "item_id": np.repeat(item_ids, dim),
+            "pos": np.tile(np.arange(dim, dtype=np.int32), n),
+            "v": matrix.ravel(),
+        })
+        self._conn.register("_embedding_versions", {
+            "item_id": item_ids,
+            "model_version": np.array(model_versions, dtype=object),
+        })
+        try:
+            self._conn.execute(_UPSERT_STAGED_SQL)
+        finally:
+            self._conn.unregister("_embedding_staging")
+            self._conn.unregister("_embedding_versions")
 
     def get_by_item_id(self, item_id: int) -> Embedding | None:
         row = self._conn.execute(
@@ -41,6 +170,13 @@ class EmbeddingRepository:
         ).fetchone()
         return _row_to_embedding(row) if row else None
 
+    def search(self, vector: list[float] | np.ndarray, k: int = 10) -> list[tuple[int, float]]:
+        """Return the ``k`` most similar ``(item_id, cosine)`` pairs via the index."""
+        if self._index is None:
+            msg = "EmbeddingRepository was created without a vector index"
+            raise RuntimeError(msg)
+        return self._index.search(vector, k)
+
     def get_by_item_ids(self, item_ids: list[int]) -> list[Embedding]:
         if not item_ids:
             return []
@@ -50,3 +186,57 @@ class EmbeddingRepository:
             item_ids,
         ).fetchall()
         return [_row_to_embedding(r) for r in rows]
+
+    def get_vectors(self, item_ids: list[int] | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(item_ids, float32 matrix)`` for the ids that have a vector.
+
+        Decodes every stored encoding in bulk, without per-float Python objects.
+        Rows come back ordered by item id.
+        """
+        lookup = np.unique(np.asarray(item_ids, dtype=np.int64))
+        self._conn.register("_embedding_lookup", {"item_id": lookup})
+        try:
+            floats = self._conn.execute(_GET_FLOAT_VECTORS_SQL).fetchnumpy()
+            packed = self._conn.execute(_GET_QUANTIZED_VECTORS_SQL).fetchnumpy()
+        finally:
+            self._conn.unregister("_embedding_lookup")
+
+        ids = [np.asarray(floats["item_id"][::EMBEDDING_DIM], dtype=np.int64)]
+        parts = [np.asarray(floats["v"], dtype=np.float32).reshape(-1, EMBEDDING_DIM)]
+        encodings = np.asarray(packed["encoding"])
+        for encoding in np.unique(encodings):
+            rows = encodings == encoding
+            ids.append(np.asarray(packed["item_id"][rows], dtype=np.int64))
+            parts.append(dequantize(
+                packed["quantized"][rows], packed["scale"][rows], str(encoding), EMBEDDING_DIM,
+            ))
+        all_ids = np.concatenate(ids)
+        order = np.argsort(all_ids)
+        return all_ids[order], np.concatenate(parts)[order]
+
+
+def migrate_embedding_encoding(
+    conn: duckdb.DuckDBPyConnection,
+    encoding: str,
+    batch_size: int = 10000,
+) -> int:
+    """Re-encode stored vectors into ``encoding``. Returns the number of rows rewritten.
+
+    Runs in batches and is safe to resume: only rows still in another
+    encoding are touched.
+    """
+    repo = EmbeddingRepository(conn, encoding=encoding)
+    rewritten = 0
+    while True:
+        rows = conn.execute(
+            "SELECT item_id, model_version FROM embedding "
+            "WHERE COALESCE(\"encoding\", 'float32') <> ? "
+            "AND (embedding IS NOT NULL OR quantized IS NOT NULL) ORDER BY item_id LIMIT ?",
+            [encoding, batch_size],
+        ).fetchall()
+        if not rows:
+            return rewritten
+        versions = dict(rows)
+        ids, matrix = repo.get_vectors(list(versions))
+        repo.upsert_vectors(ids, matrix, [versions[int(i)] for i in ids])
+        rewritten += len(ids)
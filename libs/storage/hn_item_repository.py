@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple
 
 from libs.schemas.hn_item import HNItem
+from libs.storage.pipeline_queue_repository import (
+    NEXT_STAGES,
+    NORMALIZE,
+    PipelineQueueRepository,
+)
 
 if TYPE_CHECKING:
     import duckdb
 
-_UPSERT_SQL = """
-INSERT INTO hn_item (
-    id, "type", "by", author_hash, "time", "text", text_clean,
-    parent, kids, title, url, score, descendants, deleted, dead
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+_ON_CONFLICT_SQL = """
 ON CONFLICT (id) DO UPDATE SET
     "type" = COALESCE(excluded."type", hn_item."type"),
     "by" = COALESCE(excluded."by", hn_item."by"),
@@ -29,12 +30,67 @@ ON CONFLICT (id) DO UPDATE SET
     dead = COALESCE(excluded.dead, hn_item.dead)
 """
 
+# Upserts report which rows still need cleaning (and how old they are), so
+# they can be queued without a second lookup.
+_RETURNING_SQL = """
+RETURNING id, "text" IS NOT NULL AND text_clean IS NULL AS needs_clean, "time"
+"""
+
+_UPSERT_SQL = """
+INSERT INTO hn_item (
+    id, "type", "by", author_hash, "time", "text", text_clean,
+    parent, kids, title, url, score, descendants, deleted, dead
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+""" + _ON_CONFLICT_SQL + _RETURNING_SQL
+
+# Columnar variant: each parameter is a whole column, zipped back into rows by UNNEST.
+_UPSERT_MANY_SQL = """
+INSERT INTO hn_item (
+    id, "type", "by", author_hash, "time", "text", text_clean,
+    parent, kids, title, url, score, descendants, deleted, dead
+)
+SELECT
+    UNNEST(?::INTEGER[]), UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]),
+    UNNEST(?::VARCHAR[]), UNNEST(?::INTEGER[]), UNNEST(?::VARCHAR[]),
+    UNNEST(?::VARCHAR[]), UNNEST(?::INTEGER[]), UNNEST(?::INTEGER[][]),
+    UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]), UNNEST(?::INTEGER[]),
+    UNNEST(?::INTEGER[]), UNNEST(?::BOOLEAN[]), UNNEST(?::BOOLEAN[])
+""" + _ON_CONFLICT_SQL + _RETURNING_SQL
+
+# Each story's stored comment tree, summarised as a ThreadShape.
+_THREAD_SHAPE_SQL = """
+WITH RECURSIVE thread(story_id, id, parent, live) AS (
+    SELECT id, id, NULL::INTEGER, TRUE FROM hn_item
+    WHERE id IN (SELECT UNNEST(?::INTEGER[]))
+    UNION  -- not ALL: a malformed parent cycle still terminates
+    SELECT t.story_id, h.id, h.parent,
+        h."by" IS NOT NULL AND NOT COALESCE(h.deleted, FALSE) AND NOT COALESCE(h.dead, FALSE)
+    FROM thread t JOIN hn_item h ON h.parent = t.id
+)
+SELECT story_id,
+    COUNT(*) FILTER (WHERE parent IS NOT NULL AND live),
+    LIST(id) FILTER (WHERE parent = story_id),
+    LIST(id),
+    LIST([parent, id]) FILTER (WHERE parent IS NOT NULL)
+FROM thread
+GROUP BY story_id
+"""
+
 _COLUMNS = (
     'id, "type", "by", author_hash, "time", "text", text_clean, '
     "parent, kids, title, url, score, descendants, deleted, dead"
 )
 
 
+class ThreadShape(NamedTuple):
+    """What is stored of one story's comment tree."""
+
+    live_comments: int  # not deleted or dead, at any depth
+    kids: set[int]  # stored direct replies
+    ids: set[int]  # every stored item in the thread, the story included
+    children: dict[int, set[int]]  # stored direct replies of each stored item
+
+
 def _row_to_item(row: tuple[object, ...]) -> HNItem:
     return HNItem(
         id=row[0],  # type: ignore[arg-type]
@@ -56,11 +112,40 @@ def _row_to_item(row: tuple[object, ...]) -> HNItem:
 
 
 class HNItemRepository:
-    def __init__(self, conn: duckdb.DuckDBPyConnection) -> None:
+    """Item storage; upserts queue the items' next pipeline stages.
+
+    Raw text waiting to be cleaned goes to the normalizer; a supplied
+    ``text_clean`` goes straight to moderation. Items posted
+    before ``enqueue_since`` are stored but not queued: they are past every
+    stage's window, and an old item re-fetched for an edit would otherwise
+    be normalized, moderated and mapped all over again.
+    """
+
+    def __init__(
+        self, conn: duckdb.DuckDBPyConnection, enqueue_since: int | None = None,
+    ) -> None:
         self._conn = conn
+        self._queue = PipelineQueueRepository(conn)
+        self._enqueue_since = enqueue_since
+
+    def _is_recent(self, posted: int | None) -> bool:
+        since = self._enqueue_since
+        return since is None or posted is None or posted >= since
+
+    def _enqueue(
+        self, returned: list[tuple[int, bool, int | None]], items: list[HNItem],
+    ) -> None:
+        needs_clean = [
+            item_id for item_id, dirty, posted in returned if dirty and self._is_recent(posted)
+        ]
+        self._queue.enqueue([NORMALIZE], needs_clean)
+        self._queue.enqueue(
+            NEXT_STAGES[NORMALIZE],
+            [i.id for i in items if i.text_clean and self._is_recent(i.time)],
+        )
 
     def upsert(self, item: HNItem) -> None:
-        self._conn.execute(
+        returned = self._conn.execute(
             _UPSERT_SQL,
             [
                 item.id, item.type, item.by, item.author_hash, item.time,
@@ -68,7 +153,37 @@ class HNItemRepository:
                 item.title, item.url, item.score, item.descendants,
                 item.deleted, item.dead,
             ],
-        )
+        ).fetchall()
+        self._enqueue(returned, [item])
+
+    def upsert_many(self, items: list[HNItem]) -> None:
+        """Upsert a batch of items with one set-based statement.
+
+        Repeated ids are merged first (later non-null fields win), matching
+        what a sequence of ``upsert`` calls would leave behind.
+        """
+        merged: dict[int, HNItem] = {}
+        for item in items:
+            prev = merged.get(item.id)
+            merged[item.id] = (
+                prev.model_copy(update=item.model_dump(exclude_none=True)) if prev else item
+            )
+        if not merged:
+            return
+        rows = list(merged.values())
+        returned = self._conn.execute(
+            _UPSERT_MANY_SQL,
+            [
+                [i.id for i in rows], [i.type for i in rows], [i.by for i in rows],
+                [i.author_hash for i in rows], [i.time for i in rows],
+                [i.text for i in rows], [i.text_clean for i in rows],
+                [i.parent for i in rows], [i.kids for i in rows],
+                [i.title for i in rows], [i.url for i in rows], [i.score for i in rows],
+                [i.descendants for i in rows], [i.deleted for i in rows],
+                [i.dead for i in rows],
+            ],
+        ).fetchall()
+        self._enqueue(returned, rows)
 
     def get_by_id(self, item_id: int) -> HNItem | None:
         row = self._conn.execute(
@@ -86,6 +201,19 @@ class HNItemRepository:
         ).fetchall()
         return [_row_to_item(r) for r in rows]
 
+    def get_thread_shapes(self, story_ids: list[int]) -> dict[int, ThreadShape]:
+        """Summarise the stored comment tree of each stored story in ``story_ids``."""
+        if not story_ids:
+            return {}
+        rows = self._conn.execute(_THREAD_SHAPE_SQL, [story_ids]).fetchall()
+        shapes: dict[int, ThreadShape] = {}
+        for story_id, live, kids, ids, edges in rows:
+            children: dict[int, set[int]] = {}
+            for parent, child in edges or []:
+                children.setdefault(parent, set()).add(child)
+            shapes[story_id] = ThreadShape(live, set(kids or []), set(ids), children)
+        return shapes
+
     def get_recent(self, limit: int = 50, type_filter: str | None = None) -> list[HNItem]:
         if type_filter:
             rows = self._conn.execute(
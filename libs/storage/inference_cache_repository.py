@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from libs.schemas.opinion_signal import OpinionSignal
+from libs.storage.quantization import check_encoding, dequantize, quantize
+from libs.storage.schema import EMBEDDING_DIM
+
+if TYPE_CHECKING:
+    import duckdb
+
+_GET_FLOAT_EMBEDDINGS_SQL = """
+SELECT content_hash, generate_subscripts(embedding, 1) AS pos, UNNEST(embedding) AS v
+FROM embedding_cache
+WHERE model_version = ? AND content_hash IN (SELECT UNNEST(?::VARCHAR[]))
+    AND embedding IS NOT NULL
+ORDER BY content_hash, pos
+"""
+
+_GET_QUANTIZED_EMBEDDINGS_SQL = """
+SELECT content_hash, "encoding", quantized, scale
+FROM embedding_cache
+WHERE model_version = ? AND content_hash IN (SELECT UNNEST(?::VARCHAR[]))
+    AND quantized IS NOT NULL
+"""
+
+_ON_CONFLICT_SQL = """
+ON CONFLICT (content_hash, model_version) DO UPDATE SET
+    embedding = excluded.embedding,
+    quantized = excluded.quantized,
+    scale = excluded.scale,
+    "encoding" = excluded."encoding",
+    created_at = excluded.created_at
+"""
+
+# Staged like EmbeddingRepository.upsert_vectors: vectors in long form keyed
+# by a row number, hashes in a small side table.
+_PUT_FLOAT_EMBEDDINGS_SQL = f"""
+INSERT INTO embedding_cache (
+    content_hash, model_version, embedding, quantized, scale, "encoding", created_at
+)
+SELECT
+    k.content_hash, ?, list(s.v ORDER BY s.pos)::FLOAT[{EMBEDDING_DIM}], NULL, NULL,
+    'float32', ?
+FROM _embedding_cache_staging s
+JOIN _embedding_cache_keys k ON s.k = k.k
+GROUP BY k.content_hash
+""" + _ON_CONFLICT_SQL
+
+_PUT_QUANTIZED_EMBEDDINGS_SQL = """
+INSERT INTO embedding_cache (
+    content_hash, model_version, embedding, quantized, scale, "encoding", created_at
+)
+SELECT UNNEST(?::VARCHAR[]), ?, NULL, UNNEST(?::BLOB[]), UNNEST(?::FLOAT[]), ?, ?
+""" + _ON_CONFLICT_SQL
+
+_GET_SENTIMENTS_SQL = """
+SELECT content_hash, valence, intensity, confidence, label, model_version
+FROM sentiment_cache
+WHERE model_version = ? AND content_hash IN (SELECT UNNEST(?::VARCHAR[]))
+"""
+
+_PUT_SENTIMENTS_SQL = """
+INSERT INTO sentiment_cache (
+    content_hash, model_version, valence, intensity, confidence, label, created_at
+)
+SELECT
+    UNNEST(?::VARCHAR[]), ?, UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]),
+    UNNEST(?::DOUBLE[]), UNNEST(?::VARCHAR[]), ?
+ON CONFLICT (content_hash, model_version) DO UPDATE SET
+    valence = excluded.valence,
+    intensity = excluded.intensity,
+    confidence = excluded.confidence,
+    label = excluded.label,
+    created_at = excluded.created_at
+"""
+
+
+class InferenceCacheRepository:
+    """Embedding and sentiment results keyed by (content hash, model version).
+
+    ``encoding`` selects how new embeddings are cached, as for
+    ``EmbeddingRepository``; reads decode any stored encoding.
+    """
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection, encoding: str = "float32") -> None:
+        self._conn = conn
+        self._encoding = check_encoding(encoding)
+
+    def get_embeddings(self, hashes: list[str], model_version: str) -> dict[str, np.ndarray]:
+        """Return cached float32 vectors for whichever ``hashes`` are present."""
+        if not hashes:
+            return {}
+        params = [model_version, list(set(hashes))]
+        floats = self._conn.execute(_GET_FLOAT_EMBEDDINGS_SQL, params).fetchnumpy()
+        packed = self._conn.execute(_GET_QUANTIZED_EMBEDDINGS_SQL, params).fetchnumpy()
+
+        matrix = np.asarray(floats["v"], dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        found = dict(zip(
+            (str(h) for h in floats["content_hash"][::EMBEDDING_DIM]), matrix, strict=True,
+        ))
+        encodings = np.asarray(packed["encoding"])
+        for encoding in np.unique(encodings):
+            rows = encodings == encoding
+            decoded = dequantize(
+                packed["quantized"][rows], packed["scale"][rows], str(encoding), EMBEDDING_DIM,
+            )
+            found.update(zip(
+                (str(h) for h in packed["content_hash"][rows]), decoded, strict=True,
+            ))
+        return found
+
+    def put_embeddings(
+        self,
+        hashes: list[str],
+        vectors: np.ndarray,
+        model_version: str,
+        created_at: int,
+    ) -> None:
+        latest = {h: row for row, h in enumerate(hashes)}
+        if not latest:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)[list(latest.values())]
+        if self._encoding != "float32":
+            blobs, scales = quantize(matrix, self._encoding)
+            self._conn.execute(_PUT_QUANTIZED_EMBEDDINGS_SQL, [
+                list(latest), model_version, blobs, scales.tolist(), self._encoding, created_at,
+            ])
+            return
+        n, dim = matrix.shape
+        self._conn.register("_embedding_cache_staging", {
+            "k": np.repeat(np.arange(n, dtype=np.int32), dim),
+            "pos": np.tile(np.arange(dim, dtype=np.int32), n),
+            "v": matrix.ravel(),
+        })
+        self._conn.register("_embedding_cache_keys", {
+            "k": np.arange(n, dtype=np.int32),
+            "content_hash": np.array(list(latest), dtype=object),
+        })
+        try:
+            self._conn.execute(_PUT_FLOAT_EMBEDDINGS_SQL, [model_version, created_at])
+        finally:
+            self._conn.unregister("_embedding_cache_staging")
+            self._conn.unregister("_embedding_cache_keys")
+
+    def get_sentiments(self, hashes: list[str], model_version: str) -> dict[str, OpinionSignal]:
+        """Return cached signals (with ``item_id=0``) for whichever ``hashes`` are present."""
+        if not hashes:
+            return {}
+        rows = self._conn.execute(
+            _GET_SENTIMENTS_SQL, [model_version, list(set(hashes))],
+        ).fetchall()
+        return {
+            r[0]: OpinionSignal(
+                item_id=0,
+                valence=r[1],
+                intensity=r[2],
+                confidence=r[3],
+                label=r[4],
+                model_version=r[5],
+            )
+            for r in rows
+        }
+
+    def put_sentiments(
+        self,
+        hashes: list[str],
+        signals: list[OpinionSignal],
+        model_version: str,
+        created_at: int,
+    ) -> None:
+        latest = {h: s for h, s in zip(hashes, signals, strict=True)}
+        if not latest:
+            return
+        rows = list(latest.values())
+        self._conn.execute(
+            _PUT_SENTIMENTS_SQL,
+            [
+                list(latest), model_version,
+                [s.valence for s in rows], [s.intensity for s in rows],
+                [s.confidence for s in rows], [s.label for s in rows],
+                created_at,
+            ],
+        )
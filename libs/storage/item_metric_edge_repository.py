@@ -15,6 +15,14 @@ ON CONFLICT (item_id, node_id) DO UPDATE SET
     created_at = excluded.created_at
 """
 
+_UPSERT_MANY_SQL = """
+INSERT INTO item_metric_edge (item_id, node_id, weight, created_at)
+SELECT UNNEST(?::INTEGER[]), UNNEST(?::VARCHAR[]), UNNEST(?::DOUBLE[]), UNNEST(?::BIGINT[])
+ON CONFLICT (item_id, node_id) DO UPDATE SET
+    weight = excluded.weight,
+    created_at = excluded.created_at
+"""
+
 _COLUMNS = "item_id, node_id, weight, created_at"
 
 
@@ -37,6 +45,19 @@ class ItemMetricEdgeRepository:
             [edge.item_id, edge.node_id, edge.weight, edge.created_at],
         )
 
+    def upsert_many(self, edges: list[ItemMetricEdge]) -> None:
+        """Upsert a batch of edges with one set-based statement."""
+        rows = list({(e.item_id, e.node_id): e for e in edges}.values())
+        if not rows:
+            return
+        self._conn.execute(
+            _UPSERT_MANY_SQL,
+            [
+                [e.item_id for e in rows], [e.node_id for e in rows],
+                [e.weight for e in rows], [e.created_at for e in rows],
+            ],
+        )
+
     def get_edges_for_item(self, item_id: int) -> list[ItemMetricEdge]:
         rows = self._conn.execute(
             f"SELECT {_COLUMNS} FROM item_metric_edge WHERE item_id = ?",
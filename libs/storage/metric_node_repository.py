@@ -2,7 +2,10 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 from libs.schemas.metric_node import MetricNode
+from libs.storage.schema import EMBEDDING_DIM
 
 if TYPE_CHECKING:
     import duckdb
@@ -21,6 +24,14 @@ ON CONFLICT (node_id) DO UPDATE SET
     health_stats = excluded.health_stats
 """
 
+# Centroids are read in long form so they land in one NumPy buffer.
+_ACTIVE_CENTROIDS_SQL = """
+SELECT node_id, generate_subscripts(centroid, 1) AS pos, UNNEST(centroid) AS v
+FROM metric_node
+WHERE status = 'active' AND centroid IS NOT NULL
+ORDER BY node_id, pos
+"""
+
 _COLUMNS = "node_id, label, definition, centroid, parent_id, status, version, health_stats"
 
 
@@ -62,9 +73,17 @@ class MetricNodeRepository:
         ).fetchall()
         return [_row_to_node(r) for r in rows]
 
-    def get_all_centroids(self) -> list[tuple[str, list[float]]]:
-        """Return (node_id, centroid) for all active nodes."""
-        rows = self._conn.execute(
-            "SELECT node_id, centroid FROM metric_node WHERE status = 'active'"
-        ).fetchall()
-        return [(r[0], list(r[1]) if r[1] else []) for r in rows]
+    def get_centroid_matrix(self) -> tuple[list[str], np.ndarray]:
+        """Return active node ids and their centroids as an ``(n x dim)`` float32 matrix.
+
+        Nodes without a centroid are skipped.
+        """
+        data = self._conn.execute(_ACTIVE_CENTROIDS_SQL).fetchnumpy()
+        node_ids = [str(n) for n in data["node_id"][::EMBEDDING_DIM]]
+        matrix = np.asarray(data["v"], dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        return node_ids, matrix
+
+    def get_all_centroids(self) -> list[tuple[str, np.ndarray]]:
+        """Return (node_id, centroid) for all active nodes that have a centroid."""
+        node_ids, matrix = self.get_centroid_matrix()
+        return list(zip(node_ids, matrix, strict=True))
@@ -29,6 +29,33 @@ ON CONFLICT (node_id, "window", bucket_start) DO UPDATE SET
     thread_count = excluded.thread_count
 """
 
+_UPSERT_MANY_SQL = """
+INSERT INTO metric_rollup (
+    node_id, "window", bucket_start, presence,
+    sentiment_positive, sentiment_negative, sentiment_neutral,
+    valence_score, split_score, consensus_pos, consensus_neg,
+    heat_score, momentum, unique_authors, thread_count
+)
+SELECT
+    UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]), UNNEST(?::BIGINT[]), UNNEST(?::DOUBLE[]),
+    UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]),
+    UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]),
+    UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]), UNNEST(?::INTEGER[]), UNNEST(?::INTEGER[])
+ON CONFLICT (node_id, "window", bucket_start) DO UPDATE SET
+    presence = excluded.presence,
+    sentiment_positive = excluded.sentiment_positive,
+    sentiment_negative = excluded.sentiment_negative,
+    sentiment_neutral = excluded.sentiment_neutral,
+    valence_score = excluded.valence_score,
+    split_score = excluded.split_score,
+    consensus_pos = excluded.consensus_pos,
+    consensus_neg = excluded.consensus_neg,
+    heat_score = excluded.heat_score,
+    momentum = excluded.momentum,
+    unique_authors = excluded.unique_authors,
+    thread_count = excluded.thread_count
+"""
+
 _COLUMNS = (
     'node_id, "window", bucket_start, presence, '
     "sentiment_positive, sentiment_negative, sentiment_neutral, "
@@ -73,6 +100,25 @@ class MetricRollupRepository:
             ],
         )
 
+    def upsert_many(self, rollups: list[MetricRollup]) -> None:
+        """Upsert a batch of rollups with one set-based statement."""
+        rows = list({(r.node_id, r.window, r.bucket_start): r for r in rollups}.values())
+        if not rows:
+            return
+        self._conn.execute(
+            _UPSERT_MANY_SQL,
+            [
+                [r.node_id for r in rows], [r.window for r in rows],
+                [r.bucket_start for r in rows], [r.presence for r in rows],
+                [r.sentiment_positive for r in rows], [r.sentiment_negative for r in rows],
+                [r.sentiment_neutral for r in rows], [r.valence_score for r in rows],
+                [r.split_score for r in rows], [r.consensus_pos for r in rows],
+                [r.consensus_neg for r in rows], [r.heat_score for r in rows],
+                [r.momentum for r in rows], [r.unique_authors for r in rows],
+                [r.thread_count for r in rows],
+            ],
+        )
+
     def get_latest(self, node_id: str, window: str) -> MetricRollup | None:
         row = self._conn.execute(
             f'SELECT {_COLUMNS} FROM metric_rollup '
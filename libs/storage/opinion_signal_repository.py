@@ -8,17 +8,35 @@ if TYPE_CHECKING:
     import duckdb
 
 _UPSERT_SQL = """
-INSERT INTO opinion_signal (item_id, valence, intensity, confidence, label, model_version)
-VALUES (?, ?, ?, ?, ?, ?)
+INSERT INTO opinion_signal (
+    item_id, valence, intensity, confidence, label, model_version, analyzed_at
+) VALUES (?, ?, ?, ?, ?, ?, ?)
 ON CONFLICT (item_id) DO UPDATE SET
     valence = excluded.valence,
     intensity = excluded.intensity,
     confidence = excluded.confidence,
     label = excluded.label,
-    model_version = excluded.model_version
+    model_version = excluded.model_version,
+    analyzed_at = excluded.analyzed_at
 """
 
-_COLUMNS = "item_id, valence, intensity, confidence, label, model_version"
+_UPSERT_MANY_SQL = """
+INSERT INTO opinion_signal (
+    item_id, valence, intensity, confidence, label, model_version, analyzed_at
+)
+SELECT
+    UNNEST(?::INTEGER[]), UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]), UNNEST(?::DOUBLE[]),
+    UNNEST(?::VARCHAR[]), UNNEST(?::VARCHAR[]), UNNEST(?::BIGINT[])
+ON CONFLICT (item_id) DO UPDATE SET
+    valence = excluded.valence,
+    intensity = excluded.intensity,
+    confidence = excluded.confidence,
+    label = excluded.label,
+    model_version = excluded.model_version,
+    analyzed_at = excluded.analyzed_at
+"""
+
+_COLUMNS = "item_id, valence, intensity, confidence, label, model_version, analyzed_at"
 
 
 def _row_to_signal(row: tuple[object, ...]) -> OpinionSignal:
@@ -29,6 +47,7 @@ def _row_to_signal(row: tuple[object, ...]) -> OpinionSignal:
         confidence=row[3],  # type: ignore[arg-type]
         label=row[4],  # type: ignore[arg-type]
         model_version=row[5],  # type: ignore[arg-type]
+        analyzed_at=row[6],  # type: ignore[arg-type]
     )
 
 
@@ -40,7 +59,22 @@ class OpinionSignalRepository:
         self._conn.execute(
             _UPSERT_SQL,
             [signal.item_id, signal.valence, signal.intensity,
-             signal.confidence, signal.label, signal.model_version],
+             signal.confidence, signal.label, signal.model_version, signal.analyzed_at],
+        )
+
+    def upsert_many(self, signals: list[OpinionSignal]) -> None:
+        """Upsert a batch of signals with one set-based statement."""
+        rows = list({s.item_id: s for s in signals}.values())
+        if not rows:
+            return
+        self._conn.execute(
+            _UPSERT_MANY_SQL,
+            [
+                [s.item_id for s in rows], [s.valence for s in rows],
+                [s.intensity for s in rows], [s.confidence for s in rows],
+                [s.label for s in rows], [s.model_version for s in rows],
+                [s.analyzed_at for s in rows],
+            ],
         )
 
     def get_by_item_id(self, item_id: int) -> OpinionSignal | None:
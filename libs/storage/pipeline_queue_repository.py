@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import duckdb
+
+NORMALIZE = "normalize"
+MODERATE = "moderate"
+SENTIMENT = "sentiment"
+MAPPING = "mapping"
+
+# Each stage queues the ones after it for the items it passes on. The NLP
+# stages send text to outside models, so they come after moderation and only
+# ever see redacted text from items it did not block.
+NEXT_STAGES: dict[str, tuple[str, ...]] = {
+    NORMALIZE: (MODERATE,),
+    MODERATE: (SENTIMENT, MAPPING),
+}
+
+_ENQUEUE_SQL = """
+INSERT INTO pipeline_queue (stage, item_id, enqueued_at)
+SELECT s.stage, i.item_id, ?
+FROM (SELECT UNNEST(?::VARCHAR[]) AS stage) s
+CROSS JOIN (SELECT UNNEST(?::INTEGER[]) AS item_id) i
+ON CONFLICT DO NOTHING
+"""
+
+
+class PipelineQueueRepository:
+    """Pending per-item work, one row per (stage, item) until the stage completes it.
+
+    Stages select their batch by joining from this table to ``hn_item``, so
+    the cost follows the backlog rather than the size of the item history.
+    """
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection) -> None:
+        self._conn = conn
+
+    def enqueue(self, stages: tuple[str, ...] | list[str], item_ids: list[int],
+                enqueued_at: int = 0) -> None:
+        if not stages or not item_ids:
+            return
+        self._conn.execute(_ENQUEUE_SQL, [enqueued_at, list(stages), list(item_ids)])
+
+    def complete(self, stage: str, item_ids: list[int]) -> None:
+        """Drop finished items from ``stage`` with one statement."""
+        if not item_ids:
+            return
+        self._conn.execute(
+            "DELETE FROM pipeline_queue "
+            "WHERE stage = ? AND item_id IN (SELECT UNNEST(?::INTEGER[]))",
+            [stage, list(item_ids)],
+        )
+
+    def advance(self, stage: str, item_ids: list[int], passed: list[int] | None = None,
+                enqueued_at: int = 0) -> None:
+        """Complete ``item_ids`` in ``stage`` and queue ``passed`` for the stages after it.
+
+        ``passed`` defaults to every completed item; a stage that filters
+        items (moderation blocking them) passes only the survivors on.
+        """
+        self.complete(stage, item_ids)
+        self.enqueue(NEXT_STAGES.get(stage, ()), item_ids if passed is None else passed,
+                     enqueued_at)
+
+    def fail(self, stage: str, item_ids: list[int], max_attempts: int) -> list[int]:
+        """Count a failed attempt for each of ``item_ids`` in ``stage``.
+
+        Returns the items that have now failed ``max_attempts`` times; the
+        stage decides what to do with them instead of retrying again.
+        """
+        if not item_ids:
+            return []
+        rows = self._conn.execute(
+            "UPDATE pipeline_queue SET attempts = attempts + 1 "
+            "WHERE stage = ? AND item_id IN (SELECT UNNEST(?::INTEGER[])) "
+            "RETURNING item_id, attempts",
+            [stage, list(item_ids)],
+        ).fetchall()
+        return sorted(r[0] for r in rows if r[1] >= max_attempts)
+
+    def pending(self, stage: str) -> int:
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM pipeline_queue WHERE stage = ?", [stage],
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def peek(self, stage: str, limit: int = 100) -> list[int]:
+        rows = self._conn.execute(
+            "SELECT item_id FROM pipeline_queue WHERE stage = ? ORDER BY item_id LIMIT ?",
+            [stage, limit],
+        ).fetchall()
+        return [r[0] for r in rows]
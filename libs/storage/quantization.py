@@ -0,0 +1,60 @@
+"""Compact encodings for stored embedding vectors.
+
+``float32`` keeps the native ``FLOAT[]`` column. ``float16`` halves it, and
+``int8`` quarters it using one scale per vector (max-abs / 127). Both compact
+forms are stored as BLOBs and decoded back to float32 matrices in bulk.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+
+ENCODINGS = ("float32", "float16", "int8")
+
+_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+
+def check_encoding(encoding: str) -> str:
+    if encoding not in ENCODINGS:
+        msg = f"Unknown embedding encoding {encoding!r}; expected one of {ENCODINGS}"
+        raise ValueError(msg)
+    return encoding
+
+
+def int8_codes(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Quantize each row to int8 with its own max-abs scale. Returns ``(codes, scales)``."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    peaks = np.abs(matrix).max(axis=1) if matrix.size else np.empty(0, dtype=np.float32)
+    scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+    return np.rint(matrix / scales[:, None]).astype(np.int8), scales
+
+
+def quantize(matrix: np.ndarray, encoding: str) -> tuple[list[bytes], np.ndarray]:
+    """Encode each row of ``matrix`` as bytes. Returns ``(blobs, scales)``."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if check_encoding(encoding) == "float16":
+        encoded = matrix.astype(np.float16)
+        scales = np.ones(len(matrix), dtype=np.float32)
+    elif encoding == "int8":
+        encoded, scales = int8_codes(matrix)
+    else:
+        msg = "float32 vectors are stored natively, not as BLOBs"
+        raise ValueError(msg)
+    return [row.tobytes() for row in encoded], scales
+
+
+def dequantize(
+    blobs: Sequence[bytes | bytearray],
+    scales: Sequence[float] | np.ndarray,
+    encoding: str,
+    dim: int,
+) -> np.ndarray:
+    """Decode BLOBs written by ``quantize`` into a float32 ``(n x dim)`` matrix."""
+    if not len(blobs):
+        return np.empty((0, dim), dtype=np.float32)
+    raw = np.frombuffer(b"".join(blobs), dtype=_DTYPES[check_encoding(encoding)])
+    matrix = raw.reshape(-1, dim).astype(np.float32)
+    if encoding == "int8":
+        matrix *= np.asarray(scales, dtype=np.float32)[:, None]
+    return matrix
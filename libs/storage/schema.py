@@ -24,6 +24,9 @@ CREATE TABLE IF NOT EXISTS hn_item (
 CREATE INDEX IF NOT EXISTS idx_hn_item_type_time ON hn_item ("type", "time");
 CREATE INDEX IF NOT EXISTS idx_hn_item_parent ON hn_item (parent);
 CREATE INDEX IF NOT EXISTS idx_hn_item_time ON hn_item ("time");
+
+-- hot rows only until libs.storage.cold_tier archives some; then hot + Parquet
+CREATE VIEW IF NOT EXISTS hn_item_all AS SELECT * FROM hn_item;
 """
 
 _WATCHLIST_DDL = """
@@ -31,9 +34,19 @@ CREATE TABLE IF NOT EXISTS watchlist (
     story_id INTEGER PRIMARY KEY,
     priority_score DOUBLE DEFAULT 0.0,
     ttl_expires BIGINT DEFAULT 0,
-    last_fetched BIGINT
+    last_fetched BIGINT,
+    next_poll BIGINT DEFAULT 0,
+    comment_rate DOUBLE DEFAULT 0.0,
+    last_descendants INTEGER,
+    lane VARCHAR DEFAULT 'live'
 );
 
+-- polling schedule, added after the initial release; no-op on fresh databases
+ALTER TABLE watchlist ADD COLUMN IF NOT EXISTS next_poll BIGINT DEFAULT 0;
+ALTER TABLE watchlist ADD COLUMN IF NOT EXISTS comment_rate DOUBLE DEFAULT 0.0;
+ALTER TABLE watchlist ADD COLUMN IF NOT EXISTS last_descendants INTEGER;
+ALTER TABLE watchlist ADD COLUMN IF NOT EXISTS lane VARCHAR DEFAULT 'live';
+
 CREATE INDEX IF NOT EXISTS idx_watchlist_ttl_priority
     ON watchlist (ttl_expires, priority_score DESC);
 """
@@ -69,8 +82,14 @@ CREATE TABLE IF NOT EXISTS opinion_signal (
     intensity DOUBLE DEFAULT 0.0,
     confidence DOUBLE DEFAULT 0.0,
     label VARCHAR DEFAULT 'neutral',
-    model_version VARCHAR DEFAULT ''
+    model_version VARCHAR DEFAULT '',
+    analyzed_at BIGINT DEFAULT 0
 );
+
+-- added after the initial release; no-op on fresh databases
+ALTER TABLE opinion_signal ADD COLUMN IF NOT EXISTS analyzed_at BIGINT DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_opinion_signal_analyzed ON opinion_signal (analyzed_at);
 """
 
 
@@ -78,8 +97,16 @@ _EMBEDDING_DDL = f"""
 CREATE TABLE IF NOT EXISTS embedding (
     item_id INTEGER PRIMARY KEY,
     embedding FLOAT[{EMBEDDING_DIM}],
-    model_version VARCHAR DEFAULT ''
+    model_version VARCHAR DEFAULT '',
+    quantized BLOB,
+    scale FLOAT,
+    "encoding" VARCHAR DEFAULT 'float32'
 );
+
+-- compact storage columns, added after the initial release; no-op on fresh databases
+ALTER TABLE embedding ADD COLUMN IF NOT EXISTS quantized BLOB;
+ALTER TABLE embedding ADD COLUMN IF NOT EXISTS scale FLOAT;
+ALTER TABLE embedding ADD COLUMN IF NOT EXISTS "encoding" VARCHAR DEFAULT 'float32';
 """
 
 _METRIC_NODE_DDL = f"""
@@ -107,6 +134,7 @@ CREATE TABLE IF NOT EXISTS item_metric_edge (
 );
 
 CREATE INDEX IF NOT EXISTS idx_item_metric_edge_node ON item_metric_edge (node_id);
+CREATE INDEX IF NOT EXISTS idx_item_metric_edge_created ON item_metric_edge (created_at);
 """
 
 
@@ -135,6 +163,40 @@ CREATE INDEX IF NOT EXISTS idx_metric_rollup_node_window
 """
 
 
+# Model outputs keyed by (content hash, model version), so identical text is
+# embedded and scored once no matter how many items carry it. Cached vectors
+# use the same storage encodings as the embedding table.
+_EMBEDDING_CACHE_DDL = f"""
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    content_hash VARCHAR,
+    model_version VARCHAR,
+    embedding FLOAT[{EMBEDDING_DIM}],
+    quantized BLOB,
+    scale FLOAT,
+    "encoding" VARCHAR DEFAULT 'float32',
+    created_at BIGINT DEFAULT 0,
+    PRIMARY KEY (content_hash, model_version)
+);
+
+ALTER TABLE embedding_cache ADD COLUMN IF NOT EXISTS quantized BLOB;
+ALTER TABLE embedding_cache ADD COLUMN IF NOT EXISTS scale FLOAT;
+ALTER TABLE embedding_cache ADD COLUMN IF NOT EXISTS "encoding" VARCHAR DEFAULT 'float32';
+"""
+
+_SENTIMENT_CACHE_DDL = """
+CREATE TABLE IF NOT EXISTS sentiment_cache (
+    content_hash VARCHAR,
+    model_version VARCHAR,
+    valence DOUBLE DEFAULT 0.0,
+    intensity DOUBLE DEFAULT 0.0,
+    confidence DOUBLE DEFAULT 0.0,
+    label VARCHAR DEFAULT 'neutral',
+    created_at BIGINT DEFAULT 0,
+    PRIMARY KEY (content_hash, model_version)
+);
+"""
+
+
 _BACKFILL_STATE_DDL = """
 CREATE TABLE IF NOT EXISTS backfill_state (
     "key" VARCHAR PRIMARY KEY,
@@ -144,7 +206,50 @@ CREATE TABLE IF NOT EXISTS backfill_state (
 """
 
 
-_VECTOR_TABLES = ["embedding", "metric_node", "item_metric_edge", "metric_rollup"]
+# Items waiting on each per-item stage. Rows exist only while work is pending,
+# so stages find their next batch without scanning all of hn_item.
+_PIPELINE_QUEUE_DDL = """
+CREATE TABLE IF NOT EXISTS pipeline_queue (
+    stage VARCHAR,
+    item_id INTEGER,
+    enqueued_at BIGINT DEFAULT 0,
+    attempts INTEGER DEFAULT 0,
+    PRIMARY KEY (stage, item_id)
+);
+ALTER TABLE pipeline_queue ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0;
+"""
+
+# One-off seed for databases that predate the queue: the anti-joins the
+# stages used to run on every poll.
+_PIPELINE_QUEUE_SEED_SQL = """
+INSERT INTO pipeline_queue (stage, item_id, enqueued_at)
+SELECT 'normalize', id, 0 FROM hn_item WHERE "text" IS NOT NULL AND text_clean IS NULL
+UNION ALL
+SELECT 'moderate', h.id, 0 FROM hn_item h
+    ANTI JOIN moderation_flag m ON h.id = m.item_id WHERE h.text_clean IS NOT NULL
+UNION ALL
+SELECT 'sentiment', h.id, 0 FROM hn_item h
+    JOIN moderation_flag m ON h.id = m.item_id AND m.status <> 'blocked'
+    ANTI JOIN opinion_signal o ON h.id = o.item_id WHERE h.text_clean IS NOT NULL
+UNION ALL
+SELECT 'mapping', h.id, 0 FROM hn_item h
+    JOIN moderation_flag m ON h.id = m.item_id AND m.status <> 'blocked'
+    ANTI JOIN embedding e ON h.id = e.item_id WHERE h.text_clean IS NOT NULL
+ON CONFLICT DO NOTHING
+"""
+
+# Queues written before moderation gated the NLP stages may hold sentiment or
+# mapping rows for items moderation has not seen; it re-queues them once passed.
+_PIPELINE_QUEUE_UNGATED_SQL = """
+DELETE FROM pipeline_queue
+WHERE stage IN ('sentiment', 'mapping')
+    AND item_id IN (SELECT item_id FROM pipeline_queue WHERE stage = 'moderate')
+"""
+
+
+_VECTOR_TABLES = [
+    "embedding", "metric_node", "item_metric_edge", "metric_rollup", "embedding_cache",
+]
 
 
 def migrate_embedding_dimension(conn: duckdb.DuckDBPyConnection) -> None:
@@ -155,6 +260,7 @@ def migrate_embedding_dimension(conn: duckdb.DuckDBPyConnection) -> None:
     conn.execute(_METRIC_NODE_DDL)
     conn.execute(_ITEM_METRIC_EDGE_DDL)
     conn.execute(_METRIC_ROLLUP_DDL)
+    conn.execute(_EMBEDDING_CACHE_DDL)
 
 
 def _get_embedding_dim(conn: duckdb.DuckDBPyConnection) -> int | None:
@@ -175,6 +281,13 @@ def _get_embedding_dim(conn: duckdb.DuckDBPyConnection) -> int | None:
         return None
 
 
+def _table_exists(conn: duckdb.DuckDBPyConnection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [table],
+    ).fetchone()
+    return bool(row and row[0])
+
+
 def init_schema(conn: duckdb.DuckDBPyConnection) -> None:
     """Create all tables and indexes if they don't exist."""
     conn.execute(_HN_ITEM_DDL)
@@ -192,5 +305,13 @@ def init_schema(conn: duckdb.DuckDBPyConnection) -> None:
         conn.execute(_METRIC_NODE_DDL)
         conn.execute(_ITEM_METRIC_EDGE_DDL)
         conn.execute(_METRIC_ROLLUP_DDL)
+        conn.execute(_EMBEDDING_CACHE_DDL)
 
+    conn.execute(_SENTIMENT_CACHE_DDL)
     conn.execute(_BACKFILL_STATE_DDL)
+
+    seed_queue = not _table_exists(conn, "pipeline_queue")
+    conn.execute(_PIPELINE_QUEUE_DDL)
+    if seed_queue:
+        conn.execute(_PIPELINE_QUEUE_SEED_SQL)
+    conn.execute(_PIPELINE_QUEUE_UNGATED_SQL)
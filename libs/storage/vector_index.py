@@ -0,0 +1,408 @@
+"""Approximate nearest-neighbour index over item embeddings.
+
+An inverted-file (IVF) index built in NumPy. Vectors are L2-normalized and
+bucketed by their nearest k-means centroid. A search scores only the buckets
+closest to the query. Until the index is large enough to train, searches scan
+every vector exactly.
+
+Only int8 codes are held in memory (one byte per component, plus the inverse
+norm of each code so scores stay true cosines), never a float32 copy. Training
+and retraining run on a background thread; writes keep going against the old
+centroids until the new ones are swapped in.
+
+The index is persisted next to the DuckDB file as a snapshot plus an
+append-only log of the rows changed since, so a periodic save writes only
+what changed. The snapshot is rewritten when the log outgrows it or after a
+retrain. ``EmbeddingRepository`` keeps the index current as rows land.
+Because ``sync`` reconciles the index with the ``embedding`` table on load, a
+stale or missing file only costs a catch-up read.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from libs.nlp.embeddings import normalize_rows
+from libs.storage.quantization import int8_codes
+from libs.storage.schema import EMBEDDING_DIM
+
+if TYPE_CHECKING:
+    import duckdb
+
+_MIN_TRAIN_SIZE = 4096  # below this an exact scan is fast enough
+_RETRAIN_GROWTH = 4  # retrain once the index has grown this much since training
+_TRAIN_SAMPLE = 32768
+_KMEANS_ITERS = 10
+_ASSIGN_CHUNK = 65536
+_SYNC_BATCH = 10000
+_DEFAULT_PROBES = 8
+
+
+def index_path(db_path: str) -> str | None:
+    """Return where the index for ``db_path`` is persisted, or None for in-memory DBs."""
+    if db_path == ":memory:":
+        return None
+    return f"{db_path}.vectors.npz"
+
+
+def _log_path(path: str, generation: int) -> str:
+    return f"{path}.{generation}.log"
+
+
+def _inverse_norms(codes: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(codes.astype(np.float32), axis=1)
+    inverse: np.ndarray = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return inverse
+
+
+class VectorIndex:
+    """Thread-safe IVF index mapping item ids to int8-coded normalized vectors."""
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        path: str | None = None,
+        n_probe: int = _DEFAULT_PROBES,
+    ) -> None:
+        self._dim = dim
+        self._path = path
+        self._n_probe = n_probe
+        self._ids = np.empty(0, dtype=np.int64)
+        self._codes = np.empty((0, dim), dtype=np.int8)
+        self._inv_norms = np.empty(0, dtype=np.float32)
+        self._lists = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._rows: dict[int, int] = {}
+        self._centroids: np.ndarray | None = None
+        self._trained_size = 0
+        self._lock = threading.RLock()
+        self._train_lock = threading.Lock()
+        self._trainer: threading.Thread | None = None
+        self._touched: set[int] | None = None  # ids written while a training runs
+        # persistence: ids changed since the last save, and the on-disk log
+        self._unsaved: set[int] = set()
+        self._snapshot_due = False
+        self._generation = 0
+        self._log_rows = 0
+        self._saved_at = time.monotonic()
+        self._record = np.dtype([
+            ("id", "<i8"), ("list", "<i4"), ("inv_norm", "<f4"), ("codes", "i1", (dim,)),
+        ])
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= len(self._ids):
+            return
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        ids = np.empty(capacity, dtype=np.int64)
+        codes = np.empty((capacity, self._dim), dtype=np.int8)
+        inv_norms = np.empty(capacity, dtype=np.float32)
+        lists = np.empty(capacity, dtype=np.int32)
+        ids[:self._size] = self._ids[:self._size]
+        codes[:self._size] = self._codes[:self._size]
+        inv_norms[:self._size] = self._inv_norms[:self._size]
+        lists[:self._size] = self._lists[:self._size]
+        self._ids, self._codes, self._inv_norms, self._lists = ids, codes, inv_norms, lists
+
+    @staticmethod
+    def _nearest(codes: np.ndarray, centroids: np.ndarray | None) -> np.ndarray:
+        """Nearest centroid per code row (code scales are positive, so they drop out)."""
+        if centroids is None:
+            return np.zeros(len(codes), dtype=np.int32)
+        out = np.empty(len(codes), dtype=np.int32)
+        for start in range(0, len(codes), _ASSIGN_CHUNK):
+            chunk = codes[start:start + _ASSIGN_CHUNK].astype(np.float32)
+            out[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        return out
+
+    def _put(
+        self, ids: list[int], codes: np.ndarray, inv_norms: np.ndarray, lists: np.ndarray,
+    ) -> None:
+        """Insert or overwrite rows; the caller holds the lock."""
+        new = [item_id for item_id in ids if item_id not in self._rows]
+        self._reserve(len(new))
+        for item_id in new:
+            self._rows[item_id] = self._size
+            self._ids[self._size] = item_id
+            self._size += 1
+        rows = np.fromiter((self._rows[i] for i in ids), dtype=np.int64, count=len(ids))
+        self._codes[rows] = codes
+        self._inv_norms[rows] = inv_norms
+        self._lists[rows] = lists
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Insert or replace vectors by item id. Later duplicates win."""
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, self._dim)
+        latest = {int(item_id): row for row, item_id in enumerate(ids)}
+        if not latest:
+            return
+        codes, _ = int8_codes(normalize_rows(matrix[list(latest.values())]))
+        inv_norms = _inverse_norms(codes)
+        with self._lock:
+            self._put(list(latest), codes, inv_norms, self._nearest(codes, self._centroids))
+            self._unsaved.update(latest)
+            if self._touched is not None:
+                self._touched.update(latest)
+            due = self._size >= _MIN_TRAIN_SIZE and (
+                self._centroids is None or self._size >= self._trained_size * _RETRAIN_GROWTH
+            )
+        if due:
+            self._train_in_background()
+
+    def remove(self, ids: Sequence[int]) -> None:
+        """Drop vectors by item id; unknown ids are ignored."""
+        with self._lock:
+            for item_id in ids:
+                row = self._rows.pop(int(item_id), None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    moved = int(self._ids[last])
+                    self._ids[row] = moved
+                    self._codes[row] = self._codes[last]
+                    self._inv_norms[row] = self._inv_norms[last]
+                    self._lists[row] = self._lists[last]
+                    self._rows[moved] = row
+                self._size = last
+                self._unsaved.add(int(item_id))
+
+    def _train_in_background(self) -> None:
+        if self._trainer is not None and self._trainer.is_alive():
+            return
+        self._trainer = threading.Thread(target=self.train, name="vector-index-train", daemon=True)
+        self._trainer.start()
+
+    def train(self, seed: int = 0) -> None:
+        """Cluster the current vectors with spherical k-means and rebuild the lists.
+
+        Clustering and assignment run on a copy, outside the index lock; rows
+        written meanwhile are reassigned when the new centroids are swapped in.
+        """
+        with self._train_lock:
+            with self._lock:
+                n = self._size
+                if n == 0:
+                    return
+                ids = self._ids[:n].copy()
+                codes = self._codes[:n].copy()
+                self._touched = set()
+
+            n_lists = max(1, int(np.sqrt(n)))
+            rng = np.random.default_rng(seed)
+            picked = rng.choice(n, min(n, max(_TRAIN_SAMPLE, n_lists)), replace=False)
+            sample = normalize_rows(codes[picked].astype(np.float32))
+            centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+            for _ in range(_KMEANS_ITERS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                counts = np.bincount(labels, minlength=n_lists)
+                order = np.argsort(labels, kind="stable")
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                filled = counts > 0
+                sums = centroids.copy()  # empty clusters keep their old centroid
+                sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+                centroids = normalize_rows(sums)
+            assigned = self._nearest(codes, centroids)
+
+            with self._lock:
+                touched, self._touched = self._touched or set(), None
+                current = self._ids[:self._size]
+                order = np.argsort(ids)
+                pos = np.searchsorted(ids, current, sorter=order).clip(max=n - 1)
+                known = ids[order[pos]] == current
+                if touched:
+                    known &= ~np.isin(current, np.fromiter(touched, dtype=np.int64))
+                self._centroids = centroids
+                lists = self._lists[:self._size]
+                lists[known] = assigned[order[pos[known]]]
+                stale = np.flatnonzero(~known)
+                lists[stale] = self._nearest(self._codes[stale], centroids)
+                self._trained_size = n
+                self._snapshot_due = True  # every assignment may have changed
+
+    def search(self, vector: Sequence[float] | np.ndarray, k: int = 10) -> list[tuple[int, float]]:
+        """Return up to ``k`` ``(item_id, cosine similarity)`` pairs, most similar first."""
+        query = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            n = self._size
+            if n == 0 or k <= 0:
+                return []
+            if self._centroids is None:
+                rows = np.arange(n)
+            else:
+                probes = np.argsort(-(self._centroids @ query))[:self._n_probe]
+                rows = np.flatnonzero(np.isin(self._lists[:n], probes))
+            sims = (self._codes[rows].astype(np.float32) @ query) * self._inv_norms[rows]
+            ids = self._ids[rows]
+        k = min(k, len(rows))
+        if k == 0:
+            return []
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(int(ids[t]), float(sims[t])) for t in top]
+
+    def sync(self, conn: duckdb.DuckDBPyConnection) -> int:
+        """Reconcile with the ``embedding`` table. Returns the number of ids added or removed."""
+        from libs.storage.embedding_repository import EmbeddingRepository
+
+        stored = conn.execute(
+            "SELECT item_id FROM embedding WHERE embedding IS NOT NULL OR quantized IS NOT NULL"
+        ).fetchnumpy()["item_id"].astype(np.int64)
+        with self._lock:
+            indexed = self._ids[:self._size].copy()
+        missing = np.setdiff1d(stored, indexed)
+        stale = np.setdiff1d(indexed, stored)
+        self.remove(stale.tolist())
+        repo = EmbeddingRepository(conn)
+        for start in range(0, len(missing), _SYNC_BATCH):
+            ids, matrix = repo.get_vectors(missing[start:start + _SYNC_BATCH])
+            self.add(ids.tolist(), matrix)
+        return len(missing) + len(stale)
+
+    def _write_snapshot(self, path: str) -> None:
+        n = self._size
+        centroids = self._centroids
+        if centroids is None:
+            centroids = np.empty((0, self._dim), dtype=np.float32)
+        generation = self._generation + 1
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                ids=self._ids[:n],
+                codes=self._codes[:n],
+                inv_norms=self._inv_norms[:n],
+                lists=self._lists[:n],
+                centroids=centroids.astype(np.float32),
+                trained_size=np.int64(self._trained_size),
+                generation=np.int64(generation),
+            )
+        os.replace(tmp, path)
+        stale_log = _log_path(path, self._generation)
+        if os.path.exists(stale_log):
+            os.remove(stale_log)
+        self._generation = generation
+        self._log_rows = 0
+        self._snapshot_due = False
+
+    def _append_log(self, path: str) -> None:
+        ids = np.fromiter(self._unsaved, dtype=np.int64, count=len(self._unsaved))
+        rows = np.fromiter((self._rows.get(int(i), -1) for i in ids), dtype=np.int64)
+        present = rows >= 0
+        records = np.zeros(len(ids), dtype=self._record)
+        records["id"] = ids
+        records["list"] = np.where(present, self._lists[rows], -1)  # -1 marks a removal
+        records["inv_norm"][present] = self._inv_norms[rows[present]]
+        records["codes"][present] = self._codes[rows[present]]
+        with open(_log_path(path, self._generation), "ab") as f:
+            f.write(records.tobytes())
+        self._log_rows += len(records)
+
+    def save(self, path: str | None = None) -> None:
+        """Persist unsaved changes to ``path`` (default: the path it was opened with).
+
+        Appends the changed rows to the log, or rewrites the snapshot when the
+        log has grown past half the index, after a retrain, or for a new path.
+        """
+        path = path or self._path
+        if path is None:
+            return
+        with self._lock:
+            if path != self._path:
+                self._write_snapshot(path)
+                return
+            if (
+                self._snapshot_due
+                or not os.path.exists(path)
+                or self._log_rows + len(self._unsaved) > self._size // 2
+            ):
+                self._write_snapshot(path)
+            elif self._unsaved:
+                self._append_log(path)
+            self._unsaved.clear()
+            self._saved_at = time.monotonic()
+
+    def maybe_save(self, interval: float = 300.0) -> bool:
+        """Save if there are unsaved changes older than ``interval`` seconds."""
+        if not (self._unsaved or self._snapshot_due):
+            return False
+        if time.monotonic() - self._saved_at < interval:
+            return False
+        self.save()
+        return True
+
+    def _replay(self, log: str) -> None:
+        """Apply a change log on top of the loaded snapshot; a torn tail is dropped."""
+        with open(log, "rb") as f:
+            raw = f.read()
+        count = len(raw) // self._record.itemsize
+        records = np.frombuffer(raw, dtype=self._record, count=count)
+        # the last record per id wins
+        _, last = np.unique(records["id"][::-1], return_index=True)
+        latest = records[count - 1 - last]
+        removed = latest["list"] < 0
+        self.remove(latest["id"][removed].tolist())
+        kept = latest[~removed]
+        self._put(kept["id"].tolist(), kept["codes"], kept["inv_norm"], kept["list"])
+        self._unsaved.clear()
+        self._log_rows = count
+
+    @classmethod
+    def load(cls, path: str, dim: int = EMBEDDING_DIM) -> VectorIndex:
+        """Load a persisted index, or return an empty one bound to ``path``."""
+        index = cls(dim, path)
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            if "codes" not in data or data["codes"].shape[1:] != (dim,):
+                return index  # older format or dimension changed; rebuild via sync
+            index._ids = data["ids"].astype(np.int64)
+            index._codes = data["codes"].astype(np.int8)
+            index._inv_norms = data["inv_norms"].astype(np.float32)
+            index._lists = data["lists"].astype(np.int32)
+            index._size = len(index._ids)
+            index._rows = {int(i): row for row, i in enumerate(index._ids)}
+            if len(data["centroids"]):
+                index._centroids = data["centroids"].astype(np.float32)
+            index._trained_size = int(data["trained_size"])
+            index._generation = int(data["generation"])
+        log = _log_path(path, index._generation)
+        if os.path.exists(log):
+            index._replay(log)
+        return index
+
+
+_indexes: dict[str, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(conn: duckdb.DuckDBPyConnection, db_path: str) -> VectorIndex:
+    """Return the process-wide index for ``db_path``, loading and syncing it on first use."""
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            path = index_path(db_path)
+            index = VectorIndex.load(path) if path else VectorIndex()
+            index.sync(conn)
+            _indexes[db_path] = index
+        return index
+
+
+def save_indexes() -> None:
+    """Persist every loaded index (called on shutdown)."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.save()
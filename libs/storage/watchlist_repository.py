@@ -7,16 +7,41 @@ from libs.schemas.watchlist import WatchlistEntry
 if TYPE_CHECKING:
     import duckdb
 
-_UPSERT_SQL = """
-INSERT INTO watchlist (story_id, priority_score, ttl_expires, last_fetched)
-VALUES (?, ?, ?, ?)
+# The polling schedule is only seeded on insert; re-discovering a story keeps
+# its schedule. A story seen live is never demoted back to the backfill lane.
+_ON_CONFLICT_SQL = """
 ON CONFLICT (story_id) DO UPDATE SET
     priority_score = COALESCE(excluded.priority_score, watchlist.priority_score),
     ttl_expires = COALESCE(excluded.ttl_expires, watchlist.ttl_expires),
-    last_fetched = COALESCE(excluded.last_fetched, watchlist.last_fetched)
+    last_fetched = COALESCE(excluded.last_fetched, watchlist.last_fetched),
+    lane = CASE WHEN excluded.lane = 'live' THEN 'live' ELSE watchlist.lane END
+"""
+
+_UPSERT_SQL = """
+INSERT INTO watchlist (story_id, priority_score, ttl_expires, last_fetched, next_poll, lane)
+VALUES (?, ?, ?, ?, ?, ?)
+""" + _ON_CONFLICT_SQL
+
+_UPSERT_MANY_SQL = """
+INSERT INTO watchlist (story_id, priority_score, ttl_expires, last_fetched, next_poll, lane)
+SELECT
+    UNNEST(?::INTEGER[]), UNNEST(?::DOUBLE[]), UNNEST(?::BIGINT[]), UNNEST(?::BIGINT[]),
+    UNNEST(?::BIGINT[]), UNNEST(?::VARCHAR[])
+""" + _ON_CONFLICT_SQL
+
+# Live stories first; within a lane, the most overdue relative to priority.
+_DUE_SQL = """
+SELECT {columns} FROM watchlist
+WHERE ttl_expires > ? AND next_poll <= ?
+ORDER BY lane = 'backfill', (? - next_poll) * LN(2 + GREATEST(priority_score, 0)) DESC,
+    priority_score DESC
+LIMIT ?
 """
 
-_COLUMNS = "story_id, priority_score, ttl_expires, last_fetched"
+_COLUMNS = (
+    "story_id, priority_score, ttl_expires, last_fetched, "
+    "next_poll, comment_rate, last_descendants, lane"
+)
 
 
 def _row_to_entry(row: tuple[object, ...]) -> WatchlistEntry:
@@ -25,17 +50,46 @@ def _row_to_entry(row: tuple[object, ...]) -> WatchlistEntry:
         priority_score=row[1],  # type: ignore[arg-type]
         ttl_expires=row[2],  # type: ignore[arg-type]
         last_fetched=row[3],  # type: ignore[arg-type]
+        next_poll=row[4],  # type: ignore[arg-type]
+        comment_rate=row[5],  # type: ignore[arg-type]
+        last_descendants=row[6],  # type: ignore[arg-type]
+        lane=row[7],  # type: ignore[arg-type]
     )
 
 
 class WatchlistRepository:
+    """Stories to harvest.
+
+    Upserts only touch discovery fields once a story is known; the polling
+    schedule (``next_poll``, ``comment_rate``, ``last_descendants``) is owned
+    by ``record_poll``.
+    """
+
     def __init__(self, conn: duckdb.DuckDBPyConnection) -> None:
         self._conn = conn
 
     def upsert(self, entry: WatchlistEntry) -> None:
         self._conn.execute(
             _UPSERT_SQL,
-            [entry.story_id, entry.priority_score, entry.ttl_expires, entry.last_fetched],
+            [
+                entry.story_id, entry.priority_score, entry.ttl_expires, entry.last_fetched,
+                entry.next_poll, entry.lane,
+            ],
+        )
+
+    def upsert_many(self, entries: list[WatchlistEntry]) -> None:
+        """Upsert a batch of entries with one statement; later duplicates win."""
+        merged = {e.story_id: e for e in entries}
+        if not merged:
+            return
+        rows = list(merged.values())
+        self._conn.execute(
+            _UPSERT_MANY_SQL,
+            [
+                [e.story_id for e in rows], [e.priority_score for e in rows],
+                [e.ttl_expires for e in rows], [e.last_fetched for e in rows],
+                [e.next_poll for e in rows], [e.lane for e in rows],
+            ],
         )
 
     def get_active(self, now_ts: int, limit: int = 50) -> list[WatchlistEntry]:
@@ -47,6 +101,37 @@ class WatchlistRepository:
         ).fetchall()
         return [_row_to_entry(r) for r in rows]
 
+    def get_due(self, now_ts: int, limit: int = 50) -> list[WatchlistEntry]:
+        """Unexpired entries whose next poll is due.
+
+        Backfilled stories only fill what is left after the live lane.
+        """
+        rows = self._conn.execute(
+            _DUE_SQL.format(columns=_COLUMNS), [now_ts, now_ts, now_ts, limit],
+        ).fetchall()
+        return [_row_to_entry(r) for r in rows]
+
+    def record_poll(
+        self,
+        story_id: int,
+        now_ts: int,
+        next_poll: int,
+        comment_rate: float,
+        descendants: int | None,
+        keep_until: int = 0,
+    ) -> None:
+        """Store a harvest's outcome and when to poll the story next.
+
+        ``keep_until`` extends ``ttl_expires`` for threads that are still active.
+        """
+        self._conn.execute(
+            "UPDATE watchlist SET last_fetched = ?, next_poll = ?, comment_rate = ?, "
+            "last_descendants = COALESCE(?, last_descendants), "
+            "ttl_expires = GREATEST(ttl_expires, ?) "
+            "WHERE story_id = ?",
+            [now_ts, next_poll, comment_rate, descendants, keep_until, story_id],
+        )
+
     def mark_fetched(self, story_id: int, now_ts: int) -> None:
         self._conn.execute(
             "UPDATE watchlist SET last_fetched = ? WHERE story_id = ?",
@@ -1,7 +1,11 @@
+import json
+import time
 from unittest.mock import AsyncMock, patch
 
 import duckdb
+import httpx
 
+from agents.config import AgentConfig
 from agents.trend_scout.backfill import backfill_stories
 from libs.storage.backfill_state_repository import BackfillStateRepository
 from libs.storage.schema import init_schema
@@ -9,34 +13,49 @@ from libs.storage.watchlist_repository import WatchlistRepository
 from tests.agents.test_normalizer import _ConnWrapper
 
 
-def test_backfill_stories():
-    conn = duckdb.connect(":memory:")
-    init_schema(conn)
+def _page(hits, page=0, nb_pages=1, nb_hits=None, per_page=200):
+    return {
+        "hits": hits, "page": page, "nbPages": nb_pages, "hitsPerPage": per_page,
+        "nbHits": len(hits) if nb_hits is None else nb_hits,
+    }
 
-    mock_hits = [
-        {"objectID": "100", "points": 50},
-        {"objectID": "200", "points": 100},
-    ]
 
+def _run(conn, search):
     wrapper = _ConnWrapper(conn)
     with (
         patch("agents.trend_scout.backfill.get_worker_conn", return_value=wrapper),
         patch("agents.trend_scout.backfill.AlgoliaHNClient") as mock_algolia_cls,
     ):
         mock_client = AsyncMock()
-        mock_client.search_by_date.return_value = mock_hits
+        mock_client.search_by_date_page = AsyncMock(side_effect=search)
         mock_client.close = AsyncMock()
         mock_algolia_cls.return_value = mock_client
 
         count = backfill_stories()
+    return count, mock_client.search_by_date_page
 
-    assert count == 2
 
-    # verify checkpoint was set
+def test_backfill_stories():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+
+    mock_hits = [
+        {"objectID": "100", "points": 50},
+        {"objectID": "200", "points": 100},
+    ]
+
+    async def search(**kwargs):
+        return _page(mock_hits) if kwargs["page"] == 0 else _page([])
+
+    count, _ = _run(conn, search)
+
+    # every window of the run returns the same two stories
+    assert count == 2 * 8
+
+    # verify checkpoint was advanced past all windows
     state = BackfillStateRepository(conn)
     checkpoint = state.get("backfill_checkpoint")
-    assert checkpoint is not None
-    assert int(checkpoint) > 0
+    assert int(checkpoint) == 1704067200 + 8 * 21600
 
     # verify watchlist entries
     watchlist = WatchlistRepository(conn)
@@ -50,21 +69,89 @@ def test_backfill_stories_resumes():
     init_schema(conn)
 
     # set checkpoint to recent past
-    import time
     state = BackfillStateRepository(conn)
     state.set("backfill_checkpoint", str(int(time.time()) - 100), int(time.time()))
 
-    wrapper = _ConnWrapper(conn)
-    with (
-        patch("agents.trend_scout.backfill.get_worker_conn", return_value=wrapper),
-        patch("agents.trend_scout.backfill.AlgoliaHNClient") as mock_algolia_cls,
-    ):
-        mock_client = AsyncMock()
-        mock_client.search_by_date.return_value = [{"objectID": "300", "points": 10}]
-        mock_client.close = AsyncMock()
-        mock_algolia_cls.return_value = mock_client
+    async def search(**kwargs):
+        return _page([{"objectID": "300", "points": 10}])
 
-        count = backfill_stories()
+    count, search_mock = _run(conn, search)
 
     assert count == 1
+    assert search_mock.await_count == 1  # the only window is the last 100s
+    conn.close()
+
+
+def test_backfill_follows_pagination():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    state = BackfillStateRepository(conn)
+    state.set("backfill_checkpoint", str(int(time.time()) - 100), int(time.time()))
+
+    async def search(**kwargs):
+        page = kwargs["page"]
+        return _page([{"objectID": str(1000 + page), "points": 1}], page=page, nb_pages=3)
+
+    count, search_mock = _run(conn, search)
+
+    assert count == 3
+    assert [c.kwargs["page"] for c in search_mock.await_args_list] == [0, 1, 2]
+    conn.close()
+
+
+def test_backfill_splits_truncated_windows():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    state = BackfillStateRepository(conn)
+    state.set("backfill_checkpoint", str(int(time.time()) - 1000), int(time.time()))
+    seen = []
+
+    async def search(**kwargs):
+        seen.append(kwargs["numeric_filters"])
+        if len(seen) == 1:
+            return _page([], nb_pages=5, nb_hits=2000)  # over Algolia's 1000-hit limit
+        return _page([{"objectID": str(len(seen)), "points": 1}])
+
+    count, _ = _run(conn, search)
+
+    assert count == 2
+    assert len(seen) == 3
+    lo, hi = (int(f.split("=")[-1]) for f in seen[0].replace("<", "=").split(","))
+    mid = (lo + hi) // 2
+    assert seen[1:] == [
+        f"created_at_i>={lo},created_at_i<{mid}",
+        f"created_at_i>={mid},created_at_i<{hi}",
+    ]
+    conn.close()
+
+
+def test_backfill_checkpoints_failed_window():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    start = 1704067200
+    window = AgentConfig().backfill_window_seconds
+
+    async def search(**kwargs):
+        lo = int(kwargs["numeric_filters"].split(",")[0].split("=")[1])
+        if lo == start + window and kwargs["page"] == 1:
+            raise httpx.ConnectError("down")
+        return _page([{"objectID": str(lo), "points": 1}], page=kwargs["page"], nb_pages=2)
+
+    _run(conn, search)
+
+    state = BackfillStateRepository(conn)
+    # the first window completed; the second stopped after its first page
+    assert int(state.get("backfill_checkpoint")) == start + window
+    saved = json.loads(state.get(f"backfill_window:{start + window}"))
+    assert saved["pending"] == [[start + window, start + 2 * window, 1]]
+
+    # the next run resumes the failed window at page 1
+    async def search_ok(**kwargs):
+        return _page([], page=kwargs["page"], nb_pages=2)
+
+    _, search_mock = _run(conn, search_ok)
+    first = search_mock.await_args_list[0].kwargs
+    assert first["page"] == 1
+    assert first["numeric_filters"].startswith(f"created_at_i>={start + window},")
+    assert int(state.get("backfill_checkpoint")) == start + 9 * window
     conn.close()
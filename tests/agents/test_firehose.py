@@ -0,0 +1,108 @@
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import duckdb
+import fakeredis
+
+from agents.thread_harvester.firehose import _next_cursor, ingest_firehose
+from libs.storage.backfill_state_repository import BackfillStateRepository
+from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.pipeline_queue_repository import NORMALIZE, PipelineQueueRepository
+from libs.storage.schema import init_schema
+from tests.agents.test_normalizer import _ConnWrapper
+
+
+def _run(conn, redis, max_item, items, updates=()):
+    async def get_item(item_id):
+        return items.get(item_id)
+
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.thread_harvester.firehose.get_worker_conn", return_value=wrapper),
+        patch("agents.thread_harvester.firehose.Redis") as mock_redis_cls,
+        patch("agents.thread_harvester.firehose.FirebaseHNClient") as mock_fb_cls,
+    ):
+        mock_redis_cls.from_url.return_value = redis
+        mock_client = AsyncMock()
+        mock_client.get_max_item = AsyncMock(return_value=max_item)
+        mock_client.get_updates = AsyncMock(return_value={"items": list(updates)})
+        mock_client.get_item = AsyncMock(side_effect=get_item)
+        mock_fb_cls.return_value = mock_client
+
+        count = ingest_firehose()
+    return count, mock_client.get_item
+
+
+def test_ingest_firehose_walks_new_ids():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    BackfillStateRepository(conn).set("firehose_cursor", "100", 0)
+    redis = fakeredis.FakeRedis()
+    items = {i: {"id": i, "type": "comment", "by": "pg", "parent": 1} for i in range(101, 106)}
+    items[50] = {"id": 50, "type": "story", "score": 99}
+
+    count, get_item = _run(conn, redis, 105, items, updates=[50, 104])
+
+    assert count == 6
+    # 104 is in the new range, so it is fetched once
+    assert sorted(c.args[0] for c in get_item.await_args_list) == [50, *range(101, 106)]
+    assert BackfillStateRepository(conn).get("firehose_cursor") == "105"
+    assert HNItemRepository(conn).get_by_id(50).score == 99
+    assert HNItemRepository(conn).get_by_id(103).author_hash is not None
+
+    data = json.loads(redis.xrange("hn.content")[0][1][b"data"])
+    assert data["source"] == "firehose"
+    assert sorted(data["item_ids"]) == [50, *range(101, 106)]
+    conn.close()
+
+
+def test_ingest_firehose_caps_batch(monkeypatch):
+    monkeypatch.setenv("DD_FIREHOSE_BATCH_SIZE", "10")
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    BackfillStateRepository(conn).set("firehose_cursor", "1000", 0)
+    items = {i: {"id": i, "type": "comment"} for i in range(1001, 5001)}
+
+    count, _ = _run(conn, fakeredis.FakeRedis(), 5000, items)
+
+    assert count == 10
+    assert BackfillStateRepository(conn).get("firehose_cursor") == "1010"
+    conn.close()
+
+
+def test_ingest_firehose_bootstraps_from_maxitem(monkeypatch):
+    monkeypatch.setenv("DD_FIREHOSE_BATCH_SIZE", "5")
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    items = {i: {"id": i, "type": "comment"} for i in range(1, 1001)}
+
+    count, get_item = _run(conn, fakeredis.FakeRedis(), 1000, items)
+
+    assert count == 5
+    assert sorted(c.args[0] for c in get_item.await_args_list) == list(range(996, 1001))
+    assert BackfillStateRepository(conn).get("firehose_cursor") == "1000"
+    conn.close()
+
+
+def test_ingest_firehose_does_not_queue_old_updates():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    BackfillStateRepository(conn).set("firehose_cursor", "100", 0)
+    now = int(time.time())
+    items = {101: {"id": 101, "type": "comment", "text": "new", "time": now}}
+    items[50] = {"id": 50, "type": "comment", "text": "edited", "time": now - 400 * 86400}
+
+    count, _ = _run(conn, fakeredis.FakeRedis(), 101, items, updates=[50])
+
+    assert count == 2
+    assert HNItemRepository(conn).get_by_id(50).text == "edited"
+    assert PipelineQueueRepository(conn).peek(NORMALIZE) == [101]
+    conn.close()
+
+
+def test_next_cursor_holds_back_for_unsettled_ids():
+    assert _next_cursor(1000, 1000, []) == 1000
+    assert _next_cursor(1000, 1000, [995, 998]) == 994
+    # long-missing ids are skipped rather than blocking the feed
+    assert _next_cursor(1000, 5000, [995]) == 1000
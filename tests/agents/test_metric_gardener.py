@@ -106,3 +106,18 @@ def test_garden_metrics_too_few_items():
 
     assert count == 0
     conn.close()
+
+
+def test_reconcile_accepts_arrays_and_picks_best_match():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(3, EMBEDDING_DIM)).astype(np.float32)
+    existing = [("n0", "Zero", base[0]), ("n1", "One", base[1]), ("n2", "Empty", [])]
+    new_topics = [
+        {"label": "Near one", "centroid": base[1] + 0.01},
+        {"label": "Novel", "centroid": base[2]},
+        {"label": "No vector", "centroid": None},
+    ]
+    to_create, to_update, to_retire = reconcile_topics(new_topics, existing)
+    assert [u["node_id"] for u in to_update] == ["n1"]
+    assert [t["label"] for t in to_create] == ["Novel"]
+    assert to_retire == ["n0", "n2"]
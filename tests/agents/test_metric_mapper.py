@@ -1,8 +1,17 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import duckdb
+import fakeredis
+import numpy as np
 
-from agents.metric_mapper.tasks import map_items_to_metrics
+from agents.metric_mapper.tasks import (
+    _MIN_WEIGHT,
+    _TOP_K,
+    _centroid_matrix,
+    _top_k_edges,
+    map_items_to_metrics,
+)
+from libs.nlp.embeddings import cosine_similarity, softmax_weights
 from libs.schemas.hn_item import HNItem
 from libs.schemas.metric_node import MetricNode
 from libs.storage.embedding_repository import EmbeddingRepository
@@ -10,7 +19,8 @@ from libs.storage.hn_item_repository import HNItemRepository
 from libs.storage.item_metric_edge_repository import ItemMetricEdgeRepository
 from libs.storage.metric_node_repository import MetricNodeRepository
 from libs.storage.schema import EMBEDDING_DIM, init_schema
-from tests.agents.test_normalizer import _ConnWrapper
+from libs.storage.vector_index import VectorIndex
+from tests.agents.test_normalizer import _ConnWrapper, _pass_moderation
 
 
 def test_map_items_to_metrics():
@@ -19,6 +29,7 @@ def test_map_items_to_metrics():
     repo = HNItemRepository(conn)
     repo.upsert(HNItem(id=1, type="comment", text_clean="AI safety is important"))
     repo.upsert(HNItem(id=2, type="comment", text_clean="Python programming rocks"))
+    _pass_moderation(conn, [1, 2])
 
     # add metric nodes with centroids
     node_repo = MetricNodeRepository(conn)
@@ -26,24 +37,31 @@ def test_map_items_to_metrics():
     node_repo.upsert(MetricNode(node_id="n2", label="Programming", centroid=[0.3] * EMBEDDING_DIM))
 
     mock_model = MagicMock()
-    mock_model.encode_batch.return_value = [
+    mock_model.aencode_batch = AsyncMock(return_value=[
         [0.5] * EMBEDDING_DIM,  # similar to n1
         [0.3] * EMBEDDING_DIM,  # similar to n2
-    ]
+    ])
 
+    redis = fakeredis.FakeRedis()
     wrapper = _ConnWrapper(conn)
+    index = VectorIndex()
     with (
         patch("agents.metric_mapper.tasks.get_worker_conn", return_value=wrapper),
         patch("agents.metric_mapper.tasks.get_model", return_value=mock_model),
+        patch("agents.metric_mapper.tasks.get_index", return_value=index),
+        patch("agents.metric_mapper.tasks.Redis") as mock_redis_cls,
     ):
+        mock_redis_cls.from_url.return_value = redis
         count = map_items_to_metrics()
 
     assert count == 2
+    assert len(redis.xrange("metric.mapping")) == 1
 
     # verify embeddings stored
     emb_repo = EmbeddingRepository(conn)
     assert emb_repo.get_by_item_id(1) is not None
     assert emb_repo.get_by_item_id(2) is not None
+    assert len(index) == 2
 
     # verify edges created
     edge_repo = ItemMetricEdgeRepository(conn)
@@ -57,15 +75,20 @@ def test_map_items_no_centroids():
     init_schema(conn)
     repo = HNItemRepository(conn)
     repo.upsert(HNItem(id=1, type="comment", text_clean="hello world"))
+    _pass_moderation(conn, [1])
 
     mock_model = MagicMock()
-    mock_model.encode_batch.return_value = [[0.1] * EMBEDDING_DIM]
+    mock_model.aencode_batch = AsyncMock(return_value=[[0.1] * EMBEDDING_DIM])
 
     wrapper = _ConnWrapper(conn)
+    index = VectorIndex()
     with (
         patch("agents.metric_mapper.tasks.get_worker_conn", return_value=wrapper),
         patch("agents.metric_mapper.tasks.get_model", return_value=mock_model),
+        patch("agents.metric_mapper.tasks.get_index", return_value=index),
+        patch("agents.metric_mapper.tasks.Redis") as mock_redis_cls,
     ):
+        mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
         count = map_items_to_metrics()
 
     assert count == 1
@@ -73,3 +96,67 @@ def test_map_items_no_centroids():
     emb_repo = EmbeddingRepository(conn)
     assert emb_repo.get_by_item_id(1) is not None
     conn.close()
+
+
+def test_top_k_edges_matches_pairwise_mapping():
+    rng = np.random.default_rng(0)
+    centroids = [(f"n{i}", rng.normal(size=16).tolist()) for i in range(12)]
+    vectors = rng.normal(size=(4, 16)).astype(np.float32)
+
+    node_ids, matrix = _centroid_matrix(centroids)
+    edges = _top_k_edges([10, 11, 12, 13], vectors, node_ids, matrix, created_at=5)
+
+    # reference: pairwise cosine + full sort, as the mapper used to do
+    expected = set()
+    for item_id, vec in zip([10, 11, 12, 13], vectors.tolist(), strict=True):
+        sims = [cosine_similarity(vec, c) for _, c in centroids]
+        top = sorted(enumerate(sims), key=lambda x: x[1], reverse=True)[:_TOP_K]
+        weights = softmax_weights([s for _, s in top])
+        for (idx, _), w in zip(top, weights, strict=True):
+            if w >= _MIN_WEIGHT:
+                expected.add((item_id, centroids[idx][0], round(w, 4)))
+
+    assert {(e.item_id, e.node_id, e.weight) for e in edges} == expected
+    assert all(e.created_at == 5 for e in edges)
+
+
+def test_top_k_edges_fewer_nodes_than_k():
+    node_ids, matrix = _centroid_matrix([("a", [1.0, 0.0]), ("b", [0.0, 1.0]), ("c", [])])
+    assert node_ids == ["a", "b"]
+    edges = _top_k_edges([1], np.array([[1.0, 0.2]], dtype=np.float32), node_ids, matrix, 0)
+    assert {e.node_id for e in edges} == {"a", "b"}
+
+
+def test_map_items_reuses_cached_embeddings():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="comment", text_clean="same text"))
+    repo.upsert(HNItem(id=2, type="comment", text_clean="same text"))
+    _pass_moderation(conn, [1, 2])
+
+    mock_model = MagicMock()
+    mock_model.aencode_batch = AsyncMock(
+        side_effect=lambda texts, concurrency: [[0.2] * EMBEDDING_DIM for _ in texts],
+    )
+
+    def run() -> int:
+        with (
+            patch("agents.metric_mapper.tasks.get_worker_conn", return_value=_ConnWrapper(conn)),
+            patch("agents.metric_mapper.tasks.get_model", return_value=mock_model),
+            patch("agents.metric_mapper.tasks.get_index", return_value=VectorIndex()),
+            patch("agents.metric_mapper.tasks.Redis") as mock_redis_cls,
+        ):
+            mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+            return map_items_to_metrics()
+
+    assert run() == 2
+    mock_model.aencode_batch.assert_awaited_once_with(["same text"], 4)
+
+    # a re-posted copy of the same text is served from the cache
+    repo.upsert(HNItem(id=3, type="comment", text_clean="same text"))
+    _pass_moderation(conn, [3])
+    assert run() == 1
+    assert mock_model.aencode_batch.await_count == 1
+    assert EmbeddingRepository(conn).get_by_item_id(3) is not None
+    conn.close()
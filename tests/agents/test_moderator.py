@@ -1,12 +1,20 @@
-from unittest.mock import patch
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import duckdb
+import fakeredis
 
+from agents.metric_mapper.tasks import map_items_to_metrics
 from agents.moderator.tasks import moderate_items
+from agents.normalizer.tasks import normalize_items
+from agents.opinion_analyst.tasks import analyze_opinions
 from libs.schemas.hn_item import HNItem
+from libs.schemas.opinion_signal import OpinionSignal
 from libs.storage.hn_item_repository import HNItemRepository
 from libs.storage.moderation_flag_repository import ModerationFlagRepository
-from libs.storage.schema import init_schema
+from libs.storage.pipeline_queue_repository import MAPPING, SENTIMENT, PipelineQueueRepository
+from libs.storage.schema import EMBEDDING_DIM, init_schema
+from libs.storage.vector_index import VectorIndex
 from tests.agents.test_normalizer import _ConnWrapper
 
 
@@ -41,4 +49,57 @@ def test_moderate_items():
     f3 = flag_repo.get_by_item_id(3)
     assert f3 is not None
     assert f3.status == "blocked"
+
+    queue = PipelineQueueRepository(conn)
+    assert queue.peek(SENTIMENT) == queue.peek(MAPPING) == [1, 2]
+    conn.close()
+
+
+def test_nlp_stages_only_see_moderated_text():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    HNItemRepository(conn).upsert_many([
+        HNItem(id=1, type="comment", text="email me at foo@bar.com", time=now),
+        HNItem(id=2, type="comment", text="kys lol", time=now),
+    ])
+
+    sentiment = MagicMock()
+    sentiment.predict_batch.side_effect = lambda texts: [
+        OpinionSignal(item_id=0, label="neutral") for _ in texts
+    ]
+    embedder = MagicMock()
+    embedder.aencode_batch = AsyncMock(
+        side_effect=lambda texts, concurrency: [[0.1] * EMBEDDING_DIM for _ in texts],
+    )
+
+    def run_nlp_stages() -> None:
+        with (
+            patch("agents.opinion_analyst.tasks.get_worker_conn", return_value=wrapper),
+            patch("agents.opinion_analyst.tasks.get_model", return_value=sentiment),
+            patch("agents.metric_mapper.tasks.get_worker_conn", return_value=wrapper),
+            patch("agents.metric_mapper.tasks.get_model", return_value=embedder),
+            patch("agents.metric_mapper.tasks.get_index", return_value=VectorIndex()),
+            patch("agents.metric_mapper.tasks.Redis") as mock_redis_cls,
+        ):
+            mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+            analyze_opinions()
+            map_items_to_metrics()
+
+    wrapper = _ConnWrapper(conn)
+    with patch("agents.normalizer.tasks.get_worker_conn", return_value=wrapper):
+        assert normalize_items() == 2
+
+    # nothing reaches the outside models before moderation has run
+    run_nlp_stages()
+    sentiment.predict_batch.assert_not_called()
+    embedder.aencode_batch.assert_not_awaited()
+
+    with patch("agents.moderator.tasks.get_worker_conn", return_value=wrapper):
+        assert moderate_items() == 2
+    run_nlp_stages()
+
+    sent = [text for call in sentiment.predict_batch.call_args_list for text in call.args[0]]
+    embedded = [text for call in embedder.aencode_batch.await_args_list for text in call.args[0]]
+    assert sent == embedded == ["email me at [EMAIL]"]
     conn.close()
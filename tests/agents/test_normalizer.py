@@ -5,6 +5,13 @@ import duckdb
 from agents.normalizer.tasks import normalize_items
 from libs.schemas.hn_item import HNItem
 from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.pipeline_queue_repository import (
+    MAPPING,
+    MODERATE,
+    NEXT_STAGES,
+    NORMALIZE,
+    PipelineQueueRepository,
+)
 from libs.storage.schema import init_schema
 
 
@@ -17,10 +24,21 @@ class _ConnWrapper:
     def execute(self, *args, **kwargs):
         return self._conn.execute(*args, **kwargs)
 
+    def register(self, *args, **kwargs):
+        return self._conn.register(*args, **kwargs)
+
+    def unregister(self, *args, **kwargs):
+        return self._conn.unregister(*args, **kwargs)
+
     def close(self) -> None:
         pass  # no-op so tests can verify after
 
 
+def _pass_moderation(conn: duckdb.DuckDBPyConnection, item_ids: list[int]) -> None:
+    """Queue items for the NLP stages, as moderation does for items it passes."""
+    PipelineQueueRepository(conn).enqueue(NEXT_STAGES[MODERATE], item_ids)
+
+
 def test_normalize_items():
     conn = duckdb.connect(":memory:")
     init_schema(conn)
@@ -56,3 +74,22 @@ def test_normalize_items_skips_empty():
 
     assert count == 0
     conn.close()
+
+
+def test_normalize_items_drains_queue_and_feeds_downstream():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="comment", text="<i>hi</i>"))
+    repo.upsert(HNItem(id=2, type="comment", text=""))
+    queue = PipelineQueueRepository(conn)
+
+    wrapper = _ConnWrapper(conn)
+    with patch("agents.normalizer.tasks.get_worker_conn", return_value=wrapper):
+        assert normalize_items() == 1
+        assert normalize_items() == 0
+
+    assert queue.pending(NORMALIZE) == 0  # empty text is dropped, not retried forever
+    assert queue.peek(MODERATE) == [1]
+    assert queue.pending(MAPPING) == 0  # only moderation may queue the NLP stages
+    conn.close()
@@ -2,13 +2,14 @@ from unittest.mock import MagicMock, patch
 
 import duckdb
 
-from agents.opinion_analyst.tasks import analyze_opinions
+from agents.opinion_analyst.tasks import _MAX_ATTEMPTS, analyze_opinions
 from libs.schemas.hn_item import HNItem
 from libs.schemas.opinion_signal import OpinionSignal
 from libs.storage.hn_item_repository import HNItemRepository
 from libs.storage.opinion_signal_repository import OpinionSignalRepository
+from libs.storage.pipeline_queue_repository import SENTIMENT, PipelineQueueRepository
 from libs.storage.schema import init_schema
-from tests.agents.test_normalizer import _ConnWrapper
+from tests.agents.test_normalizer import _ConnWrapper, _pass_moderation
 
 
 def test_analyze_opinions():
@@ -18,6 +19,7 @@ def test_analyze_opinions():
     repo.upsert(HNItem(id=1, type="comment", text_clean="This is great"))
     repo.upsert(HNItem(id=2, type="comment", text_clean="This is terrible"))
     repo.upsert(HNItem(id=3, type="comment"))  # no text_clean
+    _pass_moderation(conn, [1, 2])
 
     mock_model = MagicMock()
     mock_model.predict_batch.return_value = [
@@ -62,3 +64,193 @@ def test_analyze_opinions_skips_already_analyzed():
 
     assert count == 0
     conn.close()
+
+
+def _signal(label: str) -> OpinionSignal:
+    return OpinionSignal(item_id=0, label=label, model_version="test")
+
+
+def test_predict_shards_keeps_order_and_bounds_concurrency():
+    import threading
+    import time
+
+    from agents.opinion_analyst.tasks import _predict_shards
+
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def predict_batch(texts):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.02)
+        with lock:
+            state["active"] -= 1
+        if texts[0] == "t4":
+            raise RuntimeError("model down")
+        return [_signal(t) for t in texts]
+
+    model = MagicMock()
+    model.predict_batch.side_effect = predict_batch
+    texts = [f"t{i}" for i in range(10)]
+    signals = _predict_shards(model, texts, batch_size=2, concurrency=3)
+
+    assert model.predict_batch.call_count == 5
+    assert state["peak"] <= 3
+    assert [s.label if s else None for s in signals] == [
+        "t0", "t1", "t2", "t3", None, None, "t6", "t7", "t8", "t9",
+    ]
+
+
+def test_analyze_opinions_drains_multiple_batches():
+    import time
+
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    HNItemRepository(conn).upsert_many([
+        HNItem(id=i, type="comment", text_clean=f"text {i}", time=now - i) for i in range(1, 8)
+    ])
+    _pass_moderation(conn, list(range(1, 8)))
+
+    mock_model = MagicMock()
+    mock_model.predict_batch.side_effect = lambda texts: [_signal("neutral") for _ in texts]
+
+    with (
+        patch("agents.opinion_analyst.tasks.get_worker_conn", return_value=_ConnWrapper(conn)),
+        patch("agents.opinion_analyst.tasks.get_model", return_value=mock_model),
+    ):
+        count = analyze_opinions(batch_size=3)
+
+    assert count == 7
+    assert mock_model.predict_batch.call_count == 3
+    signal = OpinionSignalRepository(conn).get_by_item_id(7)
+    assert signal is not None
+    assert signal.analyzed_at >= now
+    conn.close()
+
+
+def test_analyze_opinions_reuses_cached_sentiment():
+    import time
+
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="comment", text_clean="+1", time=now))
+    repo.upsert(HNItem(id=2, type="comment", text_clean="+1", time=now))
+    _pass_moderation(conn, [1, 2])
+
+    mock_model = MagicMock()
+    mock_model.predict_batch.side_effect = lambda texts: [_signal("positive") for _ in texts]
+
+    def run() -> int:
+        with (
+            patch("agents.opinion_analyst.tasks.get_worker_conn", return_value=_ConnWrapper(conn)),
+            patch("agents.opinion_analyst.tasks.get_model", return_value=mock_model),
+        ):
+            return analyze_opinions()
+
+    assert run() == 2
+    mock_model.predict_batch.assert_called_once_with(["+1"])
+
+    repo.upsert(HNItem(id=3, type="comment", text_clean="+1", time=now))
+    _pass_moderation(conn, [3])
+    assert run() == 1
+    assert mock_model.predict_batch.call_count == 1
+    signal = OpinionSignalRepository(conn).get_by_item_id(3)
+    assert signal is not None
+    assert signal.label == "positive"
+    conn.close()
+
+
+def test_sentiment_cache_is_keyed_by_configured_model(monkeypatch):
+    import time
+
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="comment", text_clean="+1", time=int(time.time())))
+    _pass_moderation(conn, [1])
+
+    mock_model = MagicMock()
+    mock_model.predict_batch.side_effect = lambda texts: [_signal("positive") for _ in texts]
+
+    def run() -> int:
+        with (
+            patch("agents.opinion_analyst.tasks.get_worker_conn", return_value=_ConnWrapper(conn)),
+            patch("agents.opinion_analyst.tasks.get_model", return_value=mock_model),
+        ):
+            return analyze_opinions()
+
+    monkeypatch.setenv("DD_OPINION_MODEL", "model-a")
+    assert run() == 1
+    repo.upsert(HNItem(id=2, type="comment", text_clean="+1", time=int(time.time())))
+    _pass_moderation(conn, [2])
+    monkeypatch.setenv("DD_OPINION_MODEL", "model-b")
+    assert run() == 1
+
+    # the second model does not see the first model's cached score
+    assert mock_model.predict_batch.call_count == 2
+    conn.close()
+
+
+def test_skipped_texts_stay_pending_and_uncached():
+    import time
+
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="comment", text_clean="first", time=now))
+    repo.upsert(HNItem(id=2, type="comment", text_clean="second", time=now - 1))
+    _pass_moderation(conn, [1, 2])
+
+    mock_model = MagicMock()
+    # the model answers for the first text only
+    mock_model.predict_batch.side_effect = lambda texts: [_signal("positive"), None][:len(texts)]
+
+    with (
+        patch("agents.opinion_analyst.tasks.get_worker_conn", return_value=_ConnWrapper(conn)),
+        patch("agents.opinion_analyst.tasks.get_model", return_value=mock_model),
+    ):
+        assert analyze_opinions() == 1
+        assert OpinionSignalRepository(conn).get_by_item_id(2) is None
+        assert analyze_opinions() == 1
+
+    assert mock_model.predict_batch.call_args_list[-1].args == (["second"],)
+    assert OpinionSignalRepository(conn).get_by_item_id(2).label == "positive"
+    conn.close()
+
+
+def test_texts_that_never_score_fall_back_to_neutral():
+    import time
+
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    HNItemRepository(conn).upsert(
+        HNItem(id=1, type="comment", text_clean="unscorable", time=int(time.time())),
+    )
+    _pass_moderation(conn, [1])
+
+    mock_model = MagicMock()
+    mock_model.predict_batch.side_effect = lambda texts: [None for _ in texts]
+
+    with (
+        patch("agents.opinion_analyst.tasks.get_worker_conn", return_value=_ConnWrapper(conn)),
+        patch("agents.opinion_analyst.tasks.get_model", return_value=mock_model),
+    ):
+        for _ in range(_MAX_ATTEMPTS - 1):
+            assert analyze_opinions() == 0
+        assert OpinionSignalRepository(conn).get_by_item_id(1) is None
+        assert analyze_opinions() == 1
+        assert analyze_opinions() == 0
+
+    assert mock_model.predict_batch.call_count == _MAX_ATTEMPTS
+    signal = OpinionSignalRepository(conn).get_by_item_id(1)
+    assert signal is not None
+    assert (signal.label, signal.confidence, signal.model_version) == ("neutral", 0.0, "fallback")
+    assert PipelineQueueRepository(conn).pending(SENTIMENT) == 0
+    # the fallback is not cached as the text's score
+    assert conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0] == 0
+    conn.close()
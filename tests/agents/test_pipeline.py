@@ -0,0 +1,168 @@
+import json
+from unittest.mock import patch
+
+import duckdb
+import fakeredis
+import pytest
+
+from agents.moderator.tasks import moderate_items
+from agents.normalizer.tasks import normalize_items
+from agents.pipeline import PipelineRunner, Stage, event_item_ids, publish_downstream
+from libs.events.channels import STREAM_MAXLEN
+from libs.events.publisher import EventPublisher
+from libs.schemas.hn_item import HNItem
+from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.moderation_flag_repository import ModerationFlagRepository
+from libs.storage.schema import init_schema
+from tests.agents.test_normalizer import _ConnWrapper
+
+
+def test_event_item_ids_dedupes_in_order():
+    events = [{"item_ids": [3, 1]}, {"story_id": 9}, {"item_ids": [1, 2]}]
+    assert event_item_ids(events) == [3, 1, 2]
+
+
+def test_stages_process_only_the_ids_they_are_handed(monkeypatch):
+    monkeypatch.setenv("DD_PIPELINE_MODE", "true")
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="comment", text="<b>mail me at a@b.com</b>"))
+    repo.upsert(HNItem(id=2, type="comment", text="not in any event"))
+
+    redis = fakeredis.FakeRedis()
+    normalize = Stage("normalize", "hn.content",
+                      lambda events: normalize_items(item_ids=event_item_ids(events)))
+    moderate = Stage("moderate", "hn.normalized",
+                     lambda events: moderate_items(item_ids=event_item_ids(events)))
+    runner = PipelineRunner(redis, [normalize, moderate])
+    normalize_consumer = runner.consumer(normalize)
+    moderate_consumer = runner.consumer(moderate)
+    EventPublisher(redis).publish("hn.content", {"story_id": 1, "item_ids": [1]})
+
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.normalizer.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.moderator.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.pipeline.Redis") as mock_redis_cls,
+    ):
+        mock_redis_cls.from_url.return_value = redis
+        assert runner.poll(normalize, normalize_consumer) == 1
+        assert runner.poll(moderate, moderate_consumer) == 1
+        assert runner.poll(moderate, moderate_consumer) == 0  # nothing new
+
+    item2 = repo.get_by_id(2)
+    assert item2 is not None and item2.text_clean is None
+    flag = ModerationFlagRepository(conn).get_by_item_id(1)
+    assert flag is not None and flag.status == "sensitive"
+    moderated = redis.xrange("hn.moderated")
+    assert len(moderated) == 1 and b'"item_ids": [1]' in moderated[0][1][b"data"]
+    conn.close()
+
+
+def test_no_downstream_events_outside_pipeline_mode():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    HNItemRepository(conn).upsert(HNItem(id=1, type="comment", text="hello"))
+
+    with (
+        patch("agents.normalizer.tasks.get_worker_conn", return_value=_ConnWrapper(conn)),
+        patch("agents.pipeline.Redis") as mock_redis_cls,
+    ):
+        assert normalize_items() == 1
+    mock_redis_cls.from_url.assert_not_called()
+    conn.close()
+
+
+def test_downstream_events_are_trimmed(monkeypatch):
+    monkeypatch.setenv("DD_PIPELINE_MODE", "true")
+    with patch("agents.pipeline.Redis") as mock_redis_cls:
+        publish_downstream("hn.normalized", [1, 2])
+
+    redis = mock_redis_cls.from_url.return_value
+    assert redis.xadd.call_args.kwargs == {"maxlen": STREAM_MAXLEN, "approximate": True}
+
+
+def test_failed_batch_stays_pending_and_is_retried():
+    redis = fakeredis.FakeRedis()
+    calls = []
+
+    def run(events):
+        calls.append(event_item_ids(events))
+        if len(calls) == 1:
+            raise RuntimeError("worker died")
+        return len(events)
+
+    stage = Stage("flaky", "hn.content", run)
+    runner = PipelineRunner(redis, [stage], reclaim_idle_ms=0)
+    consumer = runner.consumer(stage)
+    EventPublisher(redis).publish("hn.content", {"item_ids": [7]})
+
+    with pytest.raises(RuntimeError):
+        runner.poll(stage, consumer)
+    assert redis.xpending("hn.content", "pipeline.flaky")["pending"] == 1
+
+    assert runner.poll(stage, consumer) == 1
+    assert calls == [[7], [7]]
+    assert redis.xpending("hn.content", "pipeline.flaky")["pending"] == 0
+
+
+def test_failed_batch_is_retried_per_event():
+    redis = fakeredis.FakeRedis()
+    calls = []
+
+    def run(events):
+        ids = event_item_ids(events)
+        calls.append(ids)
+        if 2 in ids:
+            raise RuntimeError("bad item")
+        return len(ids)
+
+    stage = Stage("split", "hn.content", run)
+    runner = PipelineRunner(redis, [stage], reclaim_idle_ms=0)
+    consumer = runner.consumer(stage)
+    for item_id in (1, 2, 3):
+        EventPublisher(redis).publish("hn.content", {"item_ids": [item_id]})
+
+    with pytest.raises(RuntimeError):
+        runner.poll(stage, consumer)
+
+    assert calls == [[1, 2, 3], [1], [2], [3]]
+    pending = redis.xpending_range("hn.content", "pipeline.split", "-", "+", 10)
+    assert len(pending) == 1  # only the bad event is left to retry
+
+
+def test_poison_event_is_dead_lettered():
+    redis = fakeredis.FakeRedis()
+    calls = []
+
+    def run(events):
+        calls.append(event_item_ids(events))
+        raise RuntimeError("always fails")
+
+    stage = Stage("poison", "hn.content", run)
+    runner = PipelineRunner(redis, [stage], reclaim_idle_ms=0, max_deliveries=3)
+    consumer = runner.consumer(stage)
+    EventPublisher(redis).publish("hn.content", {"item_ids": [9]})
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            runner.poll(stage, consumer)
+    assert runner.poll(stage, consumer) == 0
+
+    assert len(calls) == 3
+    assert redis.xpending("hn.content", "pipeline.poison")["pending"] == 0
+    dead = json.loads(redis.xrange("pipeline.dead_letter")[0][1][b"data"])
+    assert dead["stage"] == "poison"
+    assert dead["deliveries"] == 4
+    assert dead["event"]["item_ids"] == [9]
+
+
+def test_stop_joins_stage_threads():
+    redis = fakeredis.FakeRedis()
+    stage = Stage("idle", "hn.content", lambda events: len(events))
+    runner = PipelineRunner(redis, [stage], block_ms=50)
+    runner.start()
+
+    assert runner.stop(timeout=2)
+    assert not any(thread.is_alive() for thread in runner._threads)
@@ -1,13 +1,30 @@
+import random
 import time
 from unittest.mock import patch
 
 import duckdb
+import fakeredis
+import pytest
 
+from agents.rollup_accountant.engine import (
+    INFLUENCE_CAP,
+    MIN_AUTHORS,
+    WINDOWS,
+    aggregate_rollups,
+)
+from agents.rollup_accountant.formulas import (
+    compute_consensus,
+    compute_heat,
+    compute_momentum,
+    compute_split,
+)
 from agents.rollup_accountant.tasks import compute_rollups
 from libs.schemas.hn_item import HNItem
 from libs.schemas.item_metric_edge import ItemMetricEdge
 from libs.schemas.metric_node import MetricNode
+from libs.schemas.metric_rollup import MetricRollup
 from libs.schemas.opinion_signal import OpinionSignal
+from libs.storage.backfill_state_repository import BackfillStateRepository
 from libs.storage.hn_item_repository import HNItemRepository
 from libs.storage.item_metric_edge_repository import ItemMetricEdgeRepository
 from libs.storage.metric_node_repository import MetricNodeRepository
@@ -48,11 +65,17 @@ def test_compute_rollups():
             item_id=i, node_id="n1", weight=0.5, created_at=now,
         ))
 
+    redis = fakeredis.FakeRedis()
     wrapper = _ConnWrapper(conn)
-    with patch("agents.rollup_accountant.tasks.get_worker_conn", return_value=wrapper):
+    with (
+        patch("agents.rollup_accountant.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.rollup_accountant.tasks.Redis") as mock_redis_cls,
+    ):
+        mock_redis_cls.from_url.return_value = redis
         count = compute_rollups()
 
     assert count > 0
+    assert len(redis.xrange("metric.rollups")) == 1
 
     rollup_repo = MetricRollupRepository(conn)
     # should have at least the "hour" window rollup (min_authors=1)
@@ -62,3 +85,243 @@ def test_compute_rollups():
     assert latest.sentiment_positive > 0
     assert latest.sentiment_negative > 0
     conn.close()
+
+
+def _reference_rollups(conn, now):
+    """Per-node, per-window Python aggregation the engine replaced."""
+    rollup_repo = MetricRollupRepository(conn)
+    out = {}
+    for node in MetricNodeRepository(conn).get_active():
+        for window_name, window_secs in WINDOWS.items():
+            bucket_start = now - window_secs
+            rows = conn.execute(
+                'SELECT h.id, h.author_hash, h."type", '
+                "o.valence, o.intensity, o.confidence, o.label, e.weight "
+                "FROM item_metric_edge e JOIN hn_item h ON e.item_id = h.id "
+                "LEFT JOIN opinion_signal o ON h.id = o.item_id "
+                'WHERE e.node_id = ? AND h."time" >= ? '
+                'ORDER BY h."time" DESC, h.id DESC',
+                [node.node_id, bucket_start],
+            ).fetchall()
+            counts: dict = {}
+            capped = []
+            for row in rows:
+                counts[row[1]] = counts.get(row[1], 0) + 1
+                if counts[row[1]] <= INFLUENCE_CAP:
+                    capped.append(row)
+            authors = len({r[1] for r in capped if r[1]})
+            if not rows or authors < MIN_AUTHORS[window_name]:
+                continue
+            tw = pw = nw = uw = val = inten = 0.0
+            threads = set()
+            for r in capped:
+                w = (r[5] or 0.0) * (r[7] or 0.0)
+                tw += w
+                label = r[6] or "neutral"
+                if label == "positive":
+                    pw += w
+                elif label == "negative":
+                    nw += w
+                else:
+                    uw += w
+                val += (r[3] or 0.0) * w
+                inten += (r[4] or 0.0) * (r[7] or 0.0)
+                if r[2] == "story":
+                    threads.add(r[0])
+            if tw == 0:
+                continue
+            presence = len(capped) / len(rows)
+            prev = rollup_repo.get_latest(node.node_id, window_name)
+            cons_pos, cons_neg = compute_consensus(pw / tw, nw / tw)
+            out[(node.node_id, window_name)] = MetricRollup(
+                node_id=node.node_id, window=window_name, bucket_start=bucket_start,
+                presence=round(presence, 4),
+                sentiment_positive=round(pw / tw, 4),
+                sentiment_negative=round(nw / tw, 4),
+                sentiment_neutral=round(uw / tw, 4),
+                valence_score=round(val / tw, 2),
+                split_score=compute_split(pw / tw, nw / tw),
+                consensus_pos=cons_pos, consensus_neg=cons_neg,
+                heat_score=compute_heat(inten, authors),
+                momentum=compute_momentum(presence, prev.presence if prev else 0.0),
+                unique_authors=authors, thread_count=len(threads),
+            )
+    return out
+
+
+def test_aggregate_rollups_matches_reference():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    rng = random.Random(7)
+    now = int(time.time())
+
+    item_repo = HNItemRepository(conn)
+    sig_repo = OpinionSignalRepository(conn)
+    edge_repo = ItemMetricEdgeRepository(conn)
+    node_repo = MetricNodeRepository(conn)
+    for n in ("n1", "n2", "n3"):
+        node_repo.upsert(MetricNode(node_id=n, centroid=[0.1] * EMBEDDING_DIM))
+    node_repo.upsert(MetricNode(node_id="old", centroid=[0.1] * EMBEDDING_DIM, status="retired"))
+    MetricRollupRepository(conn).upsert(
+        MetricRollup(node_id="n1", window="week", bucket_start=0, presence=0.5),
+    )
+
+    items, edges = [], []
+    for i in range(1, 400):
+        author = rng.choice([None] + [f"a{k}" for k in range(60)])
+        items.append(HNItem(
+            id=i, type=rng.choice(["story", "comment", "comment"]),
+            author_hash=author, time=now - rng.randint(0, 40 * 86400),
+        ))
+        if rng.random() < 0.8:
+            sig_repo.upsert(OpinionSignal(
+                item_id=i, valence=rng.uniform(-100, 100), intensity=rng.random(),
+                confidence=rng.random(),
+                label=rng.choice(["positive", "negative", "neutral", "mixed"]),
+            ))
+        for node_id in rng.sample(["n1", "n2", "n3", "old"], k=rng.randint(1, 3)):
+            edges.append(ItemMetricEdge(item_id=i, node_id=node_id, weight=rng.random()))
+    item_repo.upsert_many(items)
+    edge_repo.upsert_many(edges)
+
+    expected = _reference_rollups(conn, now)
+    actual = {(r.node_id, r.window): r for r in aggregate_rollups(conn, now)}
+
+    assert expected
+    assert actual.keys() == expected.keys()
+    for key, rollup in actual.items():
+        for field, value in rollup.model_dump().items():
+            assert value == pytest.approx(getattr(expected[key], field), abs=1e-2), (key, field)
+    conn.close()
+
+
+def test_aggregate_rollups_applies_influence_cap():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    MetricNodeRepository(conn).upsert(MetricNode(node_id="n1", centroid=[0.1] * EMBEDDING_DIM))
+    for i in range(1, 9):  # one author posting 8 items
+        HNItemRepository(conn).upsert(
+            HNItem(id=i, type="comment", author_hash="spammer", time=now - i),
+        )
+        OpinionSignalRepository(conn).upsert(
+            OpinionSignal(item_id=i, confidence=1.0, label="positive"),
+        )
+        ItemMetricEdgeRepository(conn).upsert(ItemMetricEdge(item_id=i, node_id="n1", weight=1.0))
+
+    hour = next(r for r in aggregate_rollups(conn, now) if r.window == "hour")
+    assert hour.presence == round(INFLUENCE_CAP / 8, 4)
+    assert hour.unique_authors == 1
+    conn.close()
+
+
+def _seed_node(conn, node_id, first_id, now, created_at):
+    MetricNodeRepository(conn).upsert(MetricNode(node_id=node_id, centroid=[0.1] * EMBEDDING_DIM))
+    for i in range(first_id, first_id + 3):
+        HNItemRepository(conn).upsert(
+            HNItem(id=i, type="comment", author_hash=f"h{i}", time=now - 10),
+        )
+        OpinionSignalRepository(conn).upsert(
+            OpinionSignal(item_id=i, confidence=0.9, label="positive", analyzed_at=created_at),
+        )
+        ItemMetricEdgeRepository(conn).upsert(
+            ItemMetricEdge(item_id=i, node_id=node_id, weight=0.5, created_at=created_at),
+        )
+
+
+def test_compute_rollups_incremental():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    _seed_node(conn, "n1", 1, now, created_at=now - 100)
+    _seed_node(conn, "n2", 10, now, created_at=now - 100)
+
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.rollup_accountant.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.rollup_accountant.tasks.Redis") as mock_redis_cls,
+    ):
+        mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+        assert compute_rollups() == 2  # first run is full: hour window for both nodes
+        assert BackfillStateRepository(conn).get("rollup_watermark") == str(now - 100)
+
+        ItemMetricEdgeRepository(conn).upsert(
+            ItemMetricEdge(item_id=11, node_id="n2", weight=0.7, created_at=now - 50),
+        )
+        assert compute_rollups() == 1  # only n2 has a newer edge
+        OpinionSignalRepository(conn).upsert(
+            OpinionSignal(item_id=12, confidence=0.5, label="negative", analyzed_at=now - 40),
+        )
+        assert compute_rollups() == 1  # only n2 changed
+        assert compute_rollups() == 0  # nothing new since
+        assert BackfillStateRepository(conn).get("rollup_watermark") == str(now - 40)
+        assert compute_rollups(full=True) == 2
+    conn.close()
+
+
+def test_compute_rollups_skips_when_unchanged():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    _seed_node(conn, "n1", 1, now, created_at=now - 100)
+
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.rollup_accountant.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.rollup_accountant.tasks.Redis") as mock_redis_cls,
+    ):
+        mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+        assert compute_rollups() == 1
+        assert compute_rollups() == 0
+    conn.close()
+
+
+def test_compute_rollups_rereads_current_second():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    _seed_node(conn, "n1", 1, now, created_at=now - 100)
+    state = BackfillStateRepository(conn)
+    state.set("rollup_watermark", str(now - 100), now)
+    state.set("rollup_full_refresh", str(now), now)
+    # a signal stamped in the second the run happens in
+    OpinionSignalRepository(conn).upsert(
+        OpinionSignal(item_id=1, confidence=0.9, label="positive", analyzed_at=now + 60),
+    )
+
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.rollup_accountant.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.rollup_accountant.tasks.Redis") as mock_redis_cls,
+        patch("agents.rollup_accountant.tasks.time.time", return_value=now + 60),
+    ):
+        mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+        assert compute_rollups() == 1
+        # later writes in that second are still newer than the watermark
+        assert state.get("rollup_watermark") == str(now + 59)
+    conn.close()
+
+
+def test_compute_rollups_for_touched_nodes():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    _seed_node(conn, "n1", 1, now, created_at=now - 100)
+    _seed_node(conn, "n2", 10, now, created_at=now - 100)
+
+    redis = fakeredis.FakeRedis()
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.rollup_accountant.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.rollup_accountant.tasks.Redis") as mock_redis_cls,
+    ):
+        mock_redis_cls.from_url.return_value = redis
+        assert compute_rollups(node_ids=["n1"]) == 1
+        assert compute_rollups(item_ids=[10, 11]) == 1  # resolved to n2 via edges
+        assert compute_rollups(item_ids=[999]) == 0
+
+    # scoped runs leave the sweep's watermark alone
+    assert BackfillStateRepository(conn).get("rollup_watermark") is None
+    assert MetricRollupRepository(conn).get_latest("n2", "hour") is not None
+    assert len(redis.xrange("metric.rollups")) == 2
+    conn.close()
@@ -1,4 +1,15 @@
+import glob
+import time
+from unittest.mock import patch
+
+import duckdb
+
 from agents.supervisor.schedule import BEAT_SCHEDULE
+from agents.supervisor.tasks import archive_cold_items
+from libs.schemas.hn_item import HNItem
+from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.schema import init_schema
+from tests.agents.test_normalizer import _ConnWrapper
 
 
 def test_schedule_has_all_tasks():
@@ -6,7 +17,7 @@ def test_schedule_has_all_tasks():
         "discover-trending", "harvest-threads", "cleanup-watchlist",
         "normalize-items", "update-author-profiles", "analyze-opinions",
         "moderate-items", "map-items-to-metrics", "garden-metrics",
-        "compute-rollups", "backfill-stories",
+        "compute-rollups", "backfill-stories", "archive-cold-items", "ingest-firehose",
     ]
     for name in expected:
         assert name in BEAT_SCHEDULE, f"Missing task: {name}"
@@ -25,7 +36,27 @@ def test_schedule_intervals():
         "garden-metrics": 3600,
         "compute-rollups": 45,
         "backfill-stories": 300,
+        "archive-cold-items": 3600,
+        "ingest-firehose": 15,
     }
     for name, expected_secs in intervals.items():
         actual = BEAT_SCHEDULE[name]["schedule"].run_every.total_seconds()
         assert actual == expected_secs, f"{name}: {actual} != {expected_secs}"
+
+
+def test_archive_cold_items_respects_min_hot_window(tmp_path, monkeypatch):
+    monkeypatch.setenv("DD_DB_PATH", str(tmp_path / "dd.duckdb"))
+    monkeypatch.setenv("DD_COLD_TIER_AGE_DAYS", "7")
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    now = int(time.time())
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="comment", time=now - 20 * 86400))
+    repo.upsert(HNItem(id=2, type="comment", time=now - 40 * 86400))
+
+    with patch("agents.supervisor.tasks.get_worker_conn", return_value=_ConnWrapper(conn)):
+        assert archive_cold_items() == 1  # clamped to 31 days, so only item 2 moves
+
+    assert conn.execute("SELECT id FROM hn_item").fetchall() == [(1,)]
+    assert glob.glob(str(tmp_path / "dd.duckdb.cold" / "hn_item" / "*" / "*.parquet"))
+    conn.close()
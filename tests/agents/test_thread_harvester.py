@@ -1,20 +1,33 @@
+import asyncio
 import json
+import time
 from unittest.mock import AsyncMock, patch
 
 import duckdb
 import fakeredis
+import httpx
+import pytest
 
-from agents.thread_harvester.tasks import _item_from_raw, harvest_threads
+from agents.thread_harvester import tasks as harvester_tasks
+from agents.thread_harvester.items import item_from_raw
+from agents.thread_harvester.tasks import (
+    _fetch_thread,
+    _fetch_tree,
+    _flatten_tree,
+    _poll_schedule,
+    harvest_threads,
+)
+from libs.schemas.hn_item import HNItem
 from libs.schemas.watchlist import WatchlistEntry
-from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.hn_item_repository import HNItemRepository, ThreadShape
 from libs.storage.schema import init_schema
 from libs.storage.watchlist_repository import WatchlistRepository
 from tests.agents.test_normalizer import _ConnWrapper
 
 
-def test_item_from_raw():
+def testitem_from_raw():
     raw = {"id": 1, "type": "story", "by": "pg", "time": 1000, "title": "Hello"}
-    item = _item_from_raw(raw, "salt")
+    item = item_from_raw(raw, "salt")
     assert item.id == 1
     assert item.by == "pg"
     assert item.author_hash is not None
@@ -23,7 +36,7 @@ def test_item_from_raw():
 
 def test_item_from_raw_no_author():
     raw = {"id": 1, "type": "story"}
-    item = _item_from_raw(raw, "salt")
+    item = item_from_raw(raw, "salt")
     assert item.author_hash is None
 
 
@@ -46,8 +59,11 @@ def test_harvest_threads():
         patch("agents.thread_harvester.tasks.get_worker_conn", return_value=wrapper),
         patch("agents.thread_harvester.tasks.Redis") as mock_redis_cls,
         patch("agents.thread_harvester.tasks.FirebaseHNClient") as mock_fb_cls,
+        patch("agents.thread_harvester.tasks.AlgoliaHNClient") as mock_algolia_cls,
     ):
         mock_redis_cls.from_url.return_value = redis
+        # Algolia has not indexed the story yet, so the tree comes from Firebase
+        mock_algolia_cls.return_value = AsyncMock(get_item_tree=AsyncMock(return_value=None))
 
         mock_client = AsyncMock()
         mock_client.get_item = AsyncMock(side_effect=mock_get_item)
@@ -63,3 +79,385 @@ def test_harvest_threads():
     data = json.loads(messages[0][1][b"data"])
     assert data["story_id"] == 100
     assert data["items_count"] == 2
+
+
+class _TreeClient:
+    """Fake Firebase client that tracks peak in-flight requests."""
+
+    def __init__(self, tree: dict[int, dict]) -> None:
+        self._tree = tree
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.requested: list[int] = []
+
+    async def get_item(self, item_id):
+        self.calls += 1
+        self.requested.append(item_id)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        return self._tree.get(item_id)
+
+
+@pytest.mark.asyncio
+async def test_fetch_tree_level_by_level():
+    tree = {
+        1: {"id": 1, "type": "story", "kids": [2, 3]},
+        2: {"id": 2, "type": "comment", "kids": [4]},
+        3: {"id": 3, "type": "comment"},
+        4: {"id": 4, "type": "comment"},
+    }
+    client = _TreeClient(tree)
+    items = await _fetch_tree(client, 1, "salt", asyncio.Semaphore(4))
+    assert [i.id for i in items] == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_fetch_tree_respects_limits():
+    # wide tree: root with 100 kids, each with 100 kids of its own
+    tree = {1: {"id": 1, "type": "story", "kids": list(range(100, 200))}}
+    for kid in range(100, 200):
+        grandkids = list(range(kid * 1000, kid * 1000 + 100))
+        tree[kid] = {"id": kid, "type": "comment", "kids": grandkids}
+        for grandkid in range(kid * 1000, kid * 1000 + 100):
+            tree[grandkid] = {"id": grandkid, "type": "comment"}
+
+    client = _TreeClient(tree)
+    items = await _fetch_tree(client, 1, "salt", asyncio.Semaphore(3))
+
+    assert len(items) == harvester_tasks._MAX_COMMENTS
+    assert client.calls == harvester_tasks._MAX_COMMENTS
+    # only the first _MAX_FANOUT kids of the root are followed
+    level1 = [i.id for i in items if 100 <= i.id < 200]
+    assert len(level1) == harvester_tasks._MAX_FANOUT
+    assert client.peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_tree_skips_missing_items():
+    tree = {1: {"id": 1, "type": "story", "kids": [2, 3]}, 3: {"id": 3, "type": "comment"}}
+    items = await _fetch_tree(_TreeClient(tree), 1, "salt", asyncio.Semaphore(2))
+    assert [i.id for i in items] == [1, 3]
+
+
+def _algolia_tree(root_id: int, width: int, depth: int) -> dict:
+    """Algolia ``/items`` payload: ``width`` children per node, ``depth`` levels."""
+    next_id = root_id
+
+    def node(level: int, parent: int | None) -> dict:
+        nonlocal next_id
+        node_id, next_id = next_id, next_id + 1
+        children = [node(level + 1, node_id) for _ in range(width)] if level < depth else []
+        return {
+            "id": node_id, "type": "story" if parent is None else "comment",
+            "author": "pg", "created_at_i": 1000, "text": None if parent is None else "hi",
+            "parent_id": parent, "points": 3 if parent is None else None,
+            "children": children,
+        }
+
+    return node(0, None)
+
+
+def test_flatten_tree_is_uncapped():
+    tree = _algolia_tree(1, width=60, depth=3)
+    items = _flatten_tree(tree, "salt")
+
+    assert len(items) == 1 + 60 + 60 ** 2 + 60 ** 3
+    assert items[0].id == 1
+    assert len(items[0].kids) == 60
+    assert items[1].parent == 1
+    assert items[1].author_hash is not None
+
+
+@pytest.mark.asyncio
+async def test_fetch_thread_prefers_algolia_and_refreshes_root():
+    algolia = AsyncMock(get_item_tree=AsyncMock(return_value=_algolia_tree(1, 2, 2)))
+    firebase = _TreeClient({1: {"id": 1, "type": "story", "score": 42, "descendants": 7,
+                                "kids": [2, 5, 99]}})
+
+    items = await _fetch_thread(algolia, firebase, 1, "salt", asyncio.Semaphore(2))
+
+    assert len(items) == 7
+    assert firebase.calls == 1  # only the root, for freshness
+    assert (items[0].score, items[0].descendants, items[0].kids) == (42, 7, [2, 5, 99])
+
+
+@pytest.mark.asyncio
+async def test_fetch_thread_falls_back_to_firebase():
+    algolia = AsyncMock(get_item_tree=AsyncMock(side_effect=httpx.ConnectError("down")))
+    tree = {1: {"id": 1, "type": "story", "kids": [2]}, 2: {"id": 2, "type": "comment"}}
+
+    items = await _fetch_thread(algolia, _TreeClient(tree), 1, "salt", asyncio.Semaphore(2))
+
+    assert [i.id for i in items] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_fetch_thread_skips_unchanged_thread():
+    algolia = AsyncMock(get_item_tree=AsyncMock(return_value=_algolia_tree(1, 2, 2)))
+    # same comments as stored, only re-ranked and re-scored
+    firebase = _TreeClient({1: {"id": 1, "type": "story", "score": 50, "descendants": 2,
+                                "kids": [3, 2]}})
+    stored = ThreadShape(2, {2, 3}, {1, 2, 3}, {1: {2, 3}})  # both are direct replies
+
+    items = await _fetch_thread(algolia, firebase, 1, "salt", asyncio.Semaphore(2), stored)
+
+    assert [(i.id, i.score) for i in items] == [(1, 50)]
+    assert firebase.calls == 1
+    algolia.get_item_tree.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_fetch_thread_refetches_changed_thread():
+    algolia = AsyncMock(get_item_tree=AsyncMock(return_value=_algolia_tree(1, 2, 2)))
+    firebase = _TreeClient({1: {"id": 1, "type": "story", "descendants": 6, "kids": [2, 5]}})
+    # a reply deep in the tree changes descendants but not the story's kids
+    stored = ThreadShape(5, {2, 5}, {1, 2, 3, 4, 5, 6}, {1: {2, 5}, 2: {3, 4}, 5: {6}})
+
+    items = await _fetch_thread(algolia, firebase, 1, "salt", asyncio.Semaphore(2), stored)
+
+    assert len(items) == 7
+    algolia.get_item_tree.assert_awaited_once_with(1)
+
+
+@pytest.mark.asyncio
+async def test_fetch_thread_fallback_reuses_root():
+    algolia = AsyncMock(get_item_tree=AsyncMock(return_value=None))
+    tree = {1: {"id": 1, "type": "story", "kids": [2]}, 2: {"id": 2, "type": "comment"}}
+    firebase = _TreeClient(tree)
+
+    items = await _fetch_thread(algolia, firebase, 1, "salt", asyncio.Semaphore(2))
+
+    assert [i.id for i in items] == [1, 2]
+    assert firebase.calls == 2  # the root is not fetched twice
+
+
+@pytest.mark.asyncio
+async def test_fetch_thread_fallback_stops_once_missing_comments_found():
+    algolia = AsyncMock(get_item_tree=AsyncMock(return_value=None))
+    # 2 and 3 are stored; 4 is a new reply to the story, 5 a new reply under 2
+    tree = {
+        1: {"id": 1, "type": "story", "descendants": 6, "kids": [2, 3, 4]},
+        2: {"id": 2, "type": "comment", "by": "a", "kids": [5, 6]},
+        3: {"id": 3, "type": "comment", "by": "a"},
+        4: {"id": 4, "type": "comment", "by": "a"},
+        5: {"id": 5, "type": "comment", "by": "a"},
+        6: {"id": 6, "type": "comment", "by": "a", "kids": [7]},
+        7: {"id": 7, "type": "comment", "by": "a"},
+    }
+    firebase = _TreeClient(tree)
+    stored = ThreadShape(4, {2, 3}, {1, 2, 3, 6, 7}, {1: {2, 3}, 2: {6}, 6: {7}})
+
+    items = await _fetch_thread(algolia, firebase, 1, "salt", asyncio.Semaphore(2), stored)
+
+    assert {4, 5} <= {i.id for i in items}
+    # two comments were missing; the walk ends with the level that found both,
+    # so the stored subtree under 6 is never walked
+    assert firebase.calls == 1 + 3 + 2
+    assert 7 not in {i.id for i in items}
+
+
+@pytest.mark.asyncio
+async def test_fetch_tree_never_fetches_unchanged_subtrees():
+    # 6 is a new reply under 3; nothing changed below 2
+    tree = {
+        1: {"id": 1, "type": "story", "kids": [2, 3]},
+        2: {"id": 2, "type": "comment", "kids": [4]},
+        3: {"id": 3, "type": "comment", "kids": [5, 6]},
+        4: {"id": 4, "type": "comment", "kids": [7]},
+        5: {"id": 5, "type": "comment"},
+        6: {"id": 6, "type": "comment"},
+        7: {"id": 7, "type": "comment"},
+    }
+    stored = ThreadShape(5, {2, 3}, {1, 2, 3, 4, 5, 7}, {1: {2, 3}, 2: {4}, 3: {5}, 4: {7}})
+    client = _TreeClient(tree)
+
+    items = await _fetch_tree(client, 1, "salt", asyncio.Semaphore(4), stored=stored)
+
+    assert 6 in {i.id for i in items}
+    assert client.requested == [1, 2, 3, 6, 5]
+
+
+def _harvest(conn, story_raw, tree):
+    """Run harvest_threads against one Firebase root and one Algolia tree."""
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.thread_harvester.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.thread_harvester.tasks.Redis") as mock_redis_cls,
+        patch("agents.thread_harvester.tasks.FirebaseHNClient") as mock_fb_cls,
+        patch("agents.thread_harvester.tasks.AlgoliaHNClient") as mock_algolia_cls,
+    ):
+        mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+        mock_fb_cls.return_value = AsyncMock(get_item=AsyncMock(return_value=story_raw))
+        mock_algolia = AsyncMock(get_item_tree=AsyncMock(return_value=tree))
+        mock_algolia_cls.return_value = mock_algolia
+
+        total = harvest_threads(limit=10)
+    return total, mock_algolia.get_item_tree
+
+
+def _comment(item_id, parent, children=()):
+    return {"id": item_id, "type": "comment", "author": "a", "text": "hi",
+            "parent_id": parent, "children": list(children)}
+
+
+def test_harvest_threads_only_stores_root_when_unchanged():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    WatchlistRepository(conn).upsert(
+        WatchlistEntry(story_id=100, priority_score=5.0, ttl_expires=9999999999, last_fetched=1),
+    )
+    HNItemRepository(conn).upsert_many([
+        HNItem(id=100, type="story", descendants=1, kids=[101]),
+        HNItem(id=101, type="comment", by="a", parent=100),
+    ])
+
+    story_raw = {"id": 100, "type": "story", "descendants": 1, "kids": [101], "score": 9}
+    total, get_item_tree = _harvest(conn, story_raw, None)
+
+    assert total == 1
+    get_item_tree.assert_not_awaited()
+    assert HNItemRepository(conn).get_by_id(100).score == 9
+    conn.close()
+
+
+def test_harvest_threads_refetches_after_lagging_index():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    WatchlistRepository(conn).upsert(
+        WatchlistEntry(story_id=100, priority_score=5.0, ttl_expires=9999999999),
+    )
+    story_raw = {"id": 100, "type": "story", "by": "pg", "descendants": 2, "kids": [101]}
+    lagging = {"id": 100, "type": "story", "author": "pg",
+               "children": [_comment(101, 100)]}
+    complete = {"id": 100, "type": "story", "author": "pg",
+                "children": [_comment(101, 100, [_comment(102, 101)])]}
+
+    # Algolia has not indexed comment 102 yet; the story still reports two
+    assert _harvest(conn, story_raw, lagging)[0] == 2
+    conn.execute("UPDATE watchlist SET next_poll = 0")
+    total, get_item_tree = _harvest(conn, story_raw, complete)
+    assert total == 3
+    get_item_tree.assert_awaited_once()
+
+    # now everything the story reports is stored
+    conn.execute("UPDATE watchlist SET next_poll = 0")
+    total, get_item_tree = _harvest(conn, story_raw, complete)
+    assert total == 1
+    get_item_tree.assert_not_awaited()
+    conn.close()
+
+
+def test_poll_schedule_first_harvest_uses_story_average():
+    entry = WatchlistEntry(story_id=1)
+    story = HNItem(id=1, type="story", time=10_000 - 3600, descendants=100)
+
+    rate, next_poll, new = _poll_schedule(entry, story, 10_000)
+
+    assert rate == pytest.approx(100 / 3600)
+    assert next_poll == 10_000 + int(5 / rate)
+    assert new == 100
+
+
+def test_poll_schedule_bursting_thread_is_polled_fast():
+    entry = WatchlistEntry(story_id=1, last_fetched=9_940, next_poll=9_960,
+                           comment_rate=0.1, last_descendants=50)
+    story = HNItem(id=1, type="story", descendants=80)  # 30 comments in a minute
+
+    rate, next_poll, _ = _poll_schedule(entry, story, 10_000)
+
+    assert rate == pytest.approx(0.5 * 30 / 60 + 0.5 * 0.1)
+    assert next_poll == 10_000 + harvester_tasks._MIN_POLL_SECONDS
+
+
+def test_poll_schedule_cooling_thread_backs_off():
+    entry = WatchlistEntry(story_id=1, last_fetched=9_000, next_poll=9_300,
+                           comment_rate=0.01, last_descendants=50)
+    story = HNItem(id=1, type="story", descendants=50)
+
+    rate, next_poll, new = _poll_schedule(entry, story, 10_000)
+
+    assert new == 0
+    assert rate == pytest.approx(0.005)
+    assert next_poll == 10_000 + 600  # twice the last interval
+
+    entry = entry.model_copy(update={"last_fetched": 9_000, "next_poll": 9_000 + 3000})
+    assert _poll_schedule(entry, story, 10_000)[1] == 10_000 + harvester_tasks._MAX_POLL_SECONDS
+
+
+def test_harvest_threads_schedules_next_poll():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    watchlist = WatchlistRepository(conn)
+    watchlist.upsert(WatchlistEntry(story_id=100, priority_score=5.0, ttl_expires=9999999999))
+    # not due yet, so it is skipped this tick
+    watchlist.upsert(WatchlistEntry(story_id=200, priority_score=9.0, ttl_expires=9999999999))
+    conn.execute("UPDATE watchlist SET next_poll = 9999999998 WHERE story_id = 200")
+
+    story_raw = {"id": 100, "type": "story", "time": int(time.time()) - 600,
+                 "descendants": 60, "kids": []}
+
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.thread_harvester.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.thread_harvester.tasks.Redis") as mock_redis_cls,
+        patch("agents.thread_harvester.tasks.FirebaseHNClient") as mock_fb_cls,
+        patch("agents.thread_harvester.tasks.AlgoliaHNClient") as mock_algolia_cls,
+    ):
+        mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+        mock_fb_cls.return_value = AsyncMock(get_item=AsyncMock(return_value=story_raw))
+        mock_algolia_cls.return_value = AsyncMock(get_item_tree=AsyncMock(return_value=None))
+
+        before = int(time.time())
+        total = harvest_threads(limit=10)
+
+    assert total == 1
+    entry = {e.story_id: e for e in watchlist.get_active(now_ts=0)}[100]
+    assert entry.last_descendants == 60
+    assert entry.comment_rate == pytest.approx(0.1, rel=0.05)
+    assert before + 45 <= entry.next_poll <= before + 60
+    conn.close()
+
+
+def test_harvest_threads_skips_failed_story():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    watchlist = WatchlistRepository(conn)
+    for story_id in (100, 200):
+        watchlist.upsert(WatchlistEntry(story_id=story_id, priority_score=5.0,
+                                        ttl_expires=9999999999))
+    raws = {
+        100: {"id": 100, "type": "story", "kids": [101]},
+        101: {"id": 101, "type": "comment", "by": "a", "parent": 100},
+        200: {"id": 200, "type": "story", "kids": [201]},
+    }
+
+    async def get_item(item_id):
+        if item_id == 201:
+            raise httpx.ConnectError("down")
+        return raws.get(item_id)
+
+    wrapper = _ConnWrapper(conn)
+    with (
+        patch("agents.thread_harvester.tasks.get_worker_conn", return_value=wrapper),
+        patch("agents.thread_harvester.tasks.Redis") as mock_redis_cls,
+        patch("agents.thread_harvester.tasks.FirebaseHNClient") as mock_fb_cls,
+        patch("agents.thread_harvester.tasks.AlgoliaHNClient") as mock_algolia_cls,
+    ):
+        mock_redis_cls.from_url.return_value = fakeredis.FakeRedis()
+        mock_algolia_cls.return_value = AsyncMock(get_item_tree=AsyncMock(return_value=None))
+        mock_fb_cls.return_value = AsyncMock(get_item=AsyncMock(side_effect=get_item))
+
+        total = harvest_threads(limit=10)
+
+    # the healthy thread is stored; the failed one is neither stored nor rescheduled
+    assert total == 2
+    repo = HNItemRepository(conn)
+    assert repo.get_by_id(101) is not None
+    assert repo.get_by_id(200) is None
+    entries = {e.story_id: e for e in watchlist.get_active(now_ts=0)}
+    assert entries[100].last_fetched is not None
+    assert entries[200].last_fetched is None
+    conn.close()
@@ -0,0 +1,82 @@
+import time
+
+import duckdb
+import fakeredis
+from fastapi.testclient import TestClient
+
+from apps.api.cache import InvalidationListener, ResponseCache, response_cache
+from apps.api.db import set_db
+from apps.api.main import app
+from libs.events.publisher import EventPublisher
+from libs.schemas.hn_item import HNItem
+from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.schema import init_schema
+
+
+def test_get_miss_and_hit():
+    cache = ResponseCache()
+    assert cache.get("k") == (False, None)
+    cache.set("k", [1], frozenset({"a"}))
+    assert cache.get("k") == (True, [1])
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl=0.01)
+    cache.set("k", 1, frozenset())
+    time.sleep(0.02)
+    assert cache.get("k") == (False, None)
+
+
+def test_lru_eviction():
+    cache = ResponseCache(maxsize=2)
+    cache.set("a", 1, frozenset())
+    cache.set("b", 2, frozenset())
+    cache.get("a")  # touch so "b" is least recently used
+    cache.set("c", 3, frozenset())
+    assert cache.get("a")[0]
+    assert not cache.get("b")[0]
+    assert cache.get("c")[0]
+
+
+def test_invalidate_by_tag():
+    cache = ResponseCache()
+    cache.set("a", 1, frozenset({"x"}))
+    cache.set("b", 2, frozenset({"x", "y"}))
+    cache.set("c", 3, frozenset({"y"}))
+    assert cache.invalidate("x") == 2
+    assert len(cache) == 1
+    assert cache.get("c")[0]
+
+
+def test_listener_invalidates_on_event():
+    redis = fakeredis.FakeRedis()
+    cache = ResponseCache()
+    cache.set("trending", [], frozenset({"hn.content"}))
+    cache.set("rankings", [], frozenset({"metric.rollups"}))
+
+    listener = InvalidationListener(redis, ["hn.content", "metric.rollups"], cache=cache)
+    last_ids = listener._tail_ids()
+    EventPublisher(redis).publish("hn.content", {"story_id": 1})
+
+    assert listener.poll(last_ids) == 1
+    assert not cache.get("trending")[0]
+    assert cache.get("rankings")[0]
+    assert listener.poll(last_ids) == 0  # already consumed
+
+
+def test_trending_route_is_cached_until_invalidated():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    set_db(conn)
+    client = TestClient(app)
+    repo = HNItemRepository(conn)
+    repo.upsert(HNItem(id=1, type="story", title="First", score=10))
+
+    assert len(client.get("/stories/trending").json()) == 1
+    repo.upsert(HNItem(id=2, type="story", title="Second", score=20))
+    assert len(client.get("/stories/trending").json()) == 1  # served from cache
+    assert len(client.get("/stories/trending?limit=5").json()) == 2  # distinct key
+
+    response_cache.invalidate("hn.content")
+    assert len(client.get("/stories/trending").json()) == 2
+    conn.close()
@@ -0,0 +1,189 @@
+import threading
+import time
+
+from apps.api.scheduler import ScheduledTask, Scheduler, _build_schedule
+
+
+def test_drain_task_backs_off_when_idle_and_resets_on_work():
+    task = ScheduledTask("t", lambda: 0, priority=0, interval=1, max_interval=8)
+
+    assert task.delay_after(5) == 0.0
+    assert [task.delay_after(0) for _ in range(5)] == [1, 2, 4, 8, 8]
+    assert task.delay_after(3) == 0.0
+    assert task.delay_after(None) == 1  # failures back off too
+
+
+def test_poll_task_keeps_fixed_interval():
+    task = ScheduledTask("t", lambda: 0, priority=0, interval=30)
+    assert task.delay_after(10) == 30
+    assert task.delay_after(0) == 30
+
+
+def test_priority_with_aging():
+    urgent = ScheduledTask("urgent", lambda: 0, priority=0, interval=1, next_run=100.0)
+    patient = ScheduledTask("patient", lambda: 0, priority=4, interval=1, next_run=100.0)
+    later = ScheduledTask("later", lambda: 0, priority=0, interval=1, next_run=200.0)
+    scheduler = Scheduler([urgent, patient, later])
+
+    assert scheduler.next_task(100.0) is urgent
+    urgent.next_run = 150.0  # just re-queued after draining a batch
+    assert scheduler.next_task(150.0) is patient  # waited long enough to win
+
+    urgent.running = patient.running = True
+    assert scheduler.next_task(150.0) is None
+
+
+def test_drains_backlog_back_to_back_without_overlap():
+    backlog = {"n": 5}
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def work():
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        time.sleep(0.001)
+        active["now"] -= 1
+        if backlog["n"] == 0:
+            done.set()
+            return 0
+        backlog["n"] -= 1
+        return 1
+
+    polls = []
+    scheduler = Scheduler(
+        [
+            ScheduledTask("drain", work, priority=0, interval=60, max_interval=60),
+            ScheduledTask("poll", lambda: polls.append(1), priority=1, interval=60),
+        ],
+        workers=2,
+        lock=lock,
+    )
+    scheduler.start()
+    try:
+        assert done.wait(2)
+    finally:
+        scheduler.stop(wait=True)
+
+    # Five productive runs followed immediately by one idle run, far inside
+    # the 60s interval; the shared lock keeps runs from overlapping.
+    assert backlog["n"] == 0
+    assert active["max"] == 1
+    assert polls == [1]
+    assert scheduler.tasks["drain"].idle_runs == 1
+
+
+def test_notify_wakes_idle_task():
+    runs = []
+    ran = threading.Event()
+
+    def work():
+        runs.append(1)
+        ran.set()
+        return 0
+
+    scheduler = Scheduler([ScheduledTask("t", work, priority=0, interval=60, max_interval=60)])
+    scheduler.start()
+    try:
+        assert ran.wait(2)
+        ran.clear()
+        scheduler.notify("t")
+        assert ran.wait(2)
+    finally:
+        scheduler.stop(wait=True)
+    assert len(runs) == 2
+    assert scheduler.tasks["t"].idle_runs == 1
+
+
+def test_aggregates_run_on_fixed_cadence():
+    # compute_rollups and update_author_profiles return work done, not backlog
+    tasks = {t.name: t for t in _build_schedule()}
+    assert not tasks["compute_rollups"].drains
+    assert not tasks["update_author_profiles"].drains
+    assert tasks["normalize_items"].drains
+
+
+def test_unlocked_task_runs_while_the_lock_is_held():
+    lock = threading.Lock()
+    holding = threading.Event()
+    release = threading.Event()
+    fetched = threading.Event()
+
+    def writer():
+        holding.set()
+        release.wait(2)
+        return 0
+
+    def fetcher():
+        fetched.set()
+        return 0
+
+    scheduler = Scheduler(
+        [
+            ScheduledTask("writer", writer, priority=0, interval=60),
+            ScheduledTask("fetcher", fetcher, priority=1, interval=60, locked=False),
+        ],
+        workers=2,
+        lock=lock,
+    )
+    scheduler.start()
+    try:
+        assert holding.wait(2)
+        assert fetched.wait(2)  # not held back by the writer's lock
+    finally:
+        release.set()
+        scheduler.stop(wait=True)
+
+
+def test_productive_run_wakes_downstream_tasks():
+    ran = threading.Event()
+    upstream = {"n": 1}
+
+    def produce():
+        n, upstream["n"] = upstream["n"], 0
+        return n
+
+    def consume():
+        ran.set()
+        return 0
+
+    scheduler = Scheduler([
+        ScheduledTask("produce", produce, priority=0, interval=60, wakes=("consume",)),
+        ScheduledTask("consume", consume, priority=1, interval=60, max_interval=60,
+                      next_run=time.monotonic() + 60),
+    ])
+    scheduler.start()
+    try:
+        assert ran.wait(2)
+    finally:
+        scheduler.stop(wait=True)
+
+
+def test_fetchers_wake_the_pipeline_and_run_unlocked():
+    tasks = {t.name: t for t in _build_schedule()}
+    assert tasks["ingest_firehose"].wakes == ("normalize_items",)
+    assert tasks["moderate_items"].wakes == ("analyze_opinions", "map_items_to_metrics")
+    assert not tasks["harvest_threads"].locked
+    assert not tasks["map_items_to_metrics"].locked
+    assert tasks["normalize_items"].locked
+
+
+def test_stop_waits_for_in_flight_runs_within_timeout():
+    started = threading.Event()
+    release = threading.Event()
+    finished = []
+
+    def slow():
+        started.set()
+        release.wait(2)
+        finished.append(1)
+        return 0
+
+    scheduler = Scheduler([ScheduledTask("slow", slow, priority=0, interval=60)])
+    scheduler.start()
+    assert started.wait(2)
+    assert not scheduler.stop(wait=True, timeout=0.05)  # gave up on the hung run
+
+    release.set()
+    assert scheduler.stop(wait=True, timeout=2)
+    assert finished == [1]
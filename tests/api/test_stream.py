@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+from apps.api.broadcast import SnapshotBroadcaster
+
+
+@pytest.mark.asyncio
+async def test_one_query_per_tick_shared_by_subscribers():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [{"id": 1}]
+
+    broadcaster = SnapshotBroadcaster("test", fetch, interval=0.01)
+    first = broadcaster.subscribe()
+    second = broadcaster.subscribe()
+
+    assert json.loads(await asyncio.wait_for(first.get(), 1)) == [{"id": 1}]
+    assert json.loads(await asyncio.wait_for(second.get(), 1)) == [{"id": 1}]
+    await asyncio.sleep(0.05)
+
+    # Unchanged snapshots are not re-sent, and fetches are not per-client.
+    assert first.empty() and second.empty()
+    assert len(calls) < 10
+    broadcaster.unsubscribe(first)
+    broadcaster.unsubscribe(second)
+
+
+@pytest.mark.asyncio
+async def test_sends_only_on_change_and_seeds_late_subscribers():
+    state = {"value": 1}
+    broadcaster = SnapshotBroadcaster("test", lambda: state, interval=0.01)
+    early = broadcaster.subscribe()
+    assert json.loads(await asyncio.wait_for(early.get(), 1)) == {"value": 1}
+
+    late = broadcaster.subscribe()
+    assert json.loads(late.get_nowait()) == {"value": 1}
+
+    state["value"] = 2
+    assert json.loads(await asyncio.wait_for(early.get(), 1)) == {"value": 2}
+    assert json.loads(await asyncio.wait_for(late.get(), 1)) == {"value": 2}
+    broadcaster.unsubscribe(early)
+    broadcaster.unsubscribe(late)
+
+
+@pytest.mark.asyncio
+async def test_producer_stops_after_last_subscriber_leaves():
+    broadcaster = SnapshotBroadcaster("test", lambda: [], interval=0.01)
+    stream = broadcaster.stream()
+    assert await asyncio.wait_for(stream.__anext__(), 1) == "[]"
+    assert broadcaster.subscriber_count == 1
+
+    await stream.aclose()
+    assert broadcaster.subscriber_count == 0
+    await asyncio.sleep(0.05)
+    assert broadcaster._task is not None and broadcaster._task.done()
+
+
+@pytest.mark.asyncio
+async def test_query_runs_off_event_loop_thread():
+    import threading
+
+    threads = []
+
+    def fetch():
+        threads.append(threading.get_ident())
+        return []
+
+    broadcaster = SnapshotBroadcaster("test", fetch, interval=0.01)
+    queue = broadcaster.subscribe()
+    await asyncio.wait_for(queue.get(), 1)
+    broadcaster.unsubscribe(queue)
+    assert threads and threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_keeps_only_latest_snapshot():
+    counter = {"n": 0}
+
+    def fetch():
+        counter["n"] += 1
+        return counter["n"]
+
+    broadcaster = SnapshotBroadcaster("test", fetch, interval=0.005)
+    queue = broadcaster.subscribe()
+    while counter["n"] < 5:
+        await asyncio.sleep(0.01)
+
+    assert queue.qsize() == 1
+    assert int(queue.get_nowait()) >= 4
+    broadcaster.unsubscribe(queue)
+
+
+@pytest.mark.asyncio
+async def test_resubscribe_while_producer_is_cancelling():
+    broadcaster = SnapshotBroadcaster("test", lambda: [], interval=0.01)
+    first = broadcaster.subscribe()
+    assert await asyncio.wait_for(first.get(), 1) == "[]"
+    stale = broadcaster._task
+
+    # the cancelled producer has not run again before the next client arrives
+    broadcaster.unsubscribe(first)
+    second = broadcaster.subscribe()
+
+    assert broadcaster._task is not stale
+    assert await asyncio.wait_for(second.get(), 1) == "[]"
+    broadcaster.unsubscribe(second)
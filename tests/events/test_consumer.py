@@ -25,8 +25,12 @@ def test_consumer_acks_messages():
     consumer = EventConsumer(r, "test.channel", "grp", "worker-1")
     events = consumer.read(count=10)
     assert len(events) == 1
+    assert r.xpending("test.channel", "grp")["pending"] == 1  # not acked on read
 
-    # second read returns nothing (already acked)
+    assert consumer.ack(events) == 1
+    assert r.xpending("test.channel", "grp")["pending"] == 0
+
+    # second read returns nothing (already delivered)
     events = consumer.read(count=10)
     assert len(events) == 0
 
@@ -36,3 +40,21 @@ def test_consumer_empty_stream():
     consumer = EventConsumer(r, "test.channel", "grp", "worker-1")
     events = consumer.read(count=10)
     assert events == []
+
+
+def test_consumer_reclaims_stale_pending():
+    r = fakeredis.FakeRedis()
+    pub = EventPublisher(r)
+    pub.publish_many("test.channel", [{"item": 1}, {"item": 2}])
+
+    crashed = EventConsumer(r, "test.channel", "grp", "worker-1")
+    assert len(crashed.read(count=10)) == 2  # dies before acking
+
+    survivor = EventConsumer(r, "test.channel", "grp", "worker-2")
+    assert survivor.read(count=10) == []
+    assert survivor.reclaim(min_idle_ms=60_000) == []  # not stale yet
+    claimed = survivor.reclaim(min_idle_ms=0)
+    assert [e["item"] for e in claimed] == [1, 2]
+
+    assert survivor.ack(claimed) == 2
+    assert r.xpending("test.channel", "grp")["pending"] == 0
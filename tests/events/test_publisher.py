@@ -1,4 +1,5 @@
 import json
+from unittest.mock import MagicMock
 
 import fakeredis
 
@@ -23,3 +24,26 @@ def test_publish_returns_unique_ids():
     id1 = pub.publish(HN_DISCOVERY, {"a": 1})
     id2 = pub.publish(HN_DISCOVERY, {"a": 2})
     assert id1 != id2
+
+
+def test_publish_many_pipelines_in_order():
+    r = fakeredis.FakeRedis()
+    pub = EventPublisher(r)
+    ids = pub.publish_many(HN_DISCOVERY, ({"story_id": i} for i in range(5)))
+    assert len(ids) == 5
+    messages = r.xrange(HN_DISCOVERY)
+    assert [m[0].decode() for m in messages] == ids
+    assert [json.loads(m[1][b"data"])["story_id"] for m in messages] == list(range(5))
+    assert pub.publish_many(HN_DISCOVERY, []) == []
+
+
+def test_publish_many_trims_approximately():
+    r = MagicMock()
+    r.pipeline.return_value.execute.return_value = [b"1-0", b"1-1"]
+    ids = EventPublisher(r).publish_many(HN_DISCOVERY, [{"a": 1}, {"a": 2}], maxlen=10)
+
+    assert ids == ["1-0", "1-1"]
+    r.pipeline.assert_called_once_with(transaction=False)
+    for call in r.pipeline.return_value.xadd.call_args_list:
+        assert call.kwargs == {"maxlen": 10, "approximate": True}
+    r.xadd.assert_not_called()  # one round trip, not one per event
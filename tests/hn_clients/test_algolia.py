@@ -63,3 +63,38 @@ async def test_context_manager_closes_own_client():
     async with AlgoliaHNClient(client=httpx.AsyncClient(transport=transport)) as client:
         result = await client.search_front_page()
     assert result == []
+
+
+@pytest.mark.asyncio
+async def test_get_item_tree():
+    tree = {"id": 1, "type": "story", "children": [{"id": 2, "type": "comment", "children": []}]}
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json=tree)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        result = await AlgoliaHNClient(client=http).get_item_tree(1)
+    assert result == tree
+    assert seen == ["/api/v1/items/1"]
+
+
+@pytest.mark.asyncio
+async def test_get_item_tree_not_found():
+    async with httpx.AsyncClient(transport=_error_transport(404)) as http:
+        assert await AlgoliaHNClient(client=http).get_item_tree(1) is None
+
+
+@pytest.mark.asyncio
+async def test_search_by_date_page():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(dict(request.url.params))
+        return httpx.Response(200, json={"hits": [{"objectID": "4"}], "page": 2, "nbPages": 3})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        result = await AlgoliaHNClient(client=http).search_by_date_page(page=2)
+    assert result["nbPages"] == 3
+    assert seen[0]["page"] == "2"
@@ -74,6 +74,25 @@ async def test_get_best_stories():
     assert result == ids
 
 
+@pytest.mark.asyncio
+async def test_get_max_item():
+    transport = _mock_transport(41234567)
+    async with httpx.AsyncClient(transport=transport) as http:
+        client = FirebaseHNClient(client=http)
+        result = await client.get_max_item()
+    assert result == 41234567
+
+
+@pytest.mark.asyncio
+async def test_get_updates():
+    updates = {"items": [5, 6], "profiles": ["pg"]}
+    transport = _mock_transport(updates)
+    async with httpx.AsyncClient(transport=transport) as http:
+        client = FirebaseHNClient(client=http)
+        result = await client.get_updates()
+    assert result == updates
+
+
 @pytest.mark.asyncio
 async def test_error_raises():
     transport = _error_transport(500)
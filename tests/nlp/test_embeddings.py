@@ -1,6 +1,15 @@
+import numpy as np
 import pytest
 
-from libs.nlp.embeddings import cosine_similarity, softmax_weights
+from libs.nlp.embeddings import (
+    EmbeddingModel,
+    chunk_by_tokens,
+    cosine_similarity,
+    cosine_similarity_matrix,
+    normalize_rows,
+    softmax_rows,
+    softmax_weights,
+)
 from libs.storage.schema import EMBEDDING_DIM
 
 
@@ -42,13 +51,114 @@ def test_softmax_weights_temperature():
     assert (sharp[0] - sharp[1]) > (flat[0] - flat[1])
 
 
+def test_normalize_rows():
+    m = np.array([[3.0, 4.0], [0.0, 0.0]], dtype=np.float32)
+    out = normalize_rows(m)
+    assert np.allclose(out[0], [0.6, 0.8])
+    assert np.allclose(out[1], [0.0, 0.0])
+
+
+def test_softmax_rows_matches_softmax_weights():
+    scores = np.array([[0.9, 0.5, 0.1], [0.2, 0.2, 0.7]])
+    out = softmax_rows(scores, temperature=0.5)
+    for row, expected in zip(out, scores, strict=True):
+        assert np.allclose(row, softmax_weights(expected.tolist(), temperature=0.5))
+
+
+def test_cosine_similarity_matrix_matches_pairwise():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(3, 8))
+    b = np.vstack([rng.normal(size=(4, 8)), np.zeros((1, 8))])
+    sims = cosine_similarity_matrix(a, b)
+    assert sims.shape == (3, 5)
+    for i in range(3):
+        for j in range(5):
+            assert abs(sims[i, j] - cosine_similarity(a[i], b[j])) < 1e-5
+
+
+def test_decode_response_accepts_base64_and_floats():
+    from types import SimpleNamespace
+
+    from libs.nlp.embeddings import _decode_response
+
+    encoded = SimpleNamespace(data=[
+        SimpleNamespace(index=1, embedding=_b64([3.0, 4.0])),
+        SimpleNamespace(index=0, embedding=_b64([1.0, 2.0])),
+    ])
+    assert _decode_response(encoded).tolist() == [[1.0, 2.0], [3.0, 4.0]]
+    plain = SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.5, 0.25])])
+    assert _decode_response(plain).tolist() == [[0.5, 0.25]]
+
+
+def test_chunk_by_tokens_respects_budgets():
+    texts = ["a" * 40] * 10  # ~11 tokens each
+    assert chunk_by_tokens(texts, max_tokens=1000, max_inputs=4) == [(0, 4), (4, 8), (8, 10)]
+    assert chunk_by_tokens(texts, max_tokens=25, max_inputs=100) == [
+        (0, 2), (2, 4), (4, 6), (6, 8), (8, 10),
+    ]
+    assert chunk_by_tokens(["a" * 400, "b"], max_tokens=10) == [(0, 1), (1, 2)]
+    assert chunk_by_tokens([]) == []
+
+
+def _b64(values: list[float]) -> str:
+    import base64
+
+    return base64.b64encode(np.asarray(values, dtype=np.float32).tobytes()).decode()
+
+
+class _FakeEmbeddings:
+    def __init__(self) -> None:
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def create(self, model, input, dimensions, encoding_format):  # noqa: A002
+        import asyncio
+        from types import SimpleNamespace
+
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        assert encoding_format == "base64"
+        # return out of order; the model must reassemble by index
+        data = [
+            SimpleNamespace(index=i, embedding=_b64([float(t), -float(t)]))
+            for i, t in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.mark.asyncio
+async def test_aencode_batch_chunks_concurrently_in_order():
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock, patch
+
+    embeddings = _FakeEmbeddings()
+    client = SimpleNamespace(embeddings=embeddings, close=AsyncMock())
+    texts = [str(i) for i in range(200)]
+    with (
+        patch("libs.nlp.embeddings.new_async_client", return_value=client),
+        patch("libs.nlp.embeddings.get_client"),
+        patch("libs.nlp.embeddings.get_embedding_model", return_value="test"),
+    ):
+        vectors = await EmbeddingModel().aencode_batch(texts, concurrency=2)
+
+    assert vectors.dtype == np.float32
+    assert vectors.tolist() == [[float(i), -float(i)] for i in range(200)]
+    assert embeddings.calls == len(chunk_by_tokens(texts)) > 1
+    assert embeddings.peak == 2
+    client.close.assert_awaited_once()
+
+
 @pytest.mark.slow
 def test_encode():
     from libs.nlp.embeddings import get_model
     model = get_model()
     vec = model.encode("hello world")
-    assert len(vec) == EMBEDDING_DIM
-    assert isinstance(vec[0], float)
+    assert vec.shape == (EMBEDDING_DIM,)
+    assert vec.dtype == np.float32
 
 
 @pytest.mark.slow
@@ -56,8 +166,7 @@ def test_encode_batch():
     from libs.nlp.embeddings import get_model
     model = get_model()
     vecs = model.encode_batch(["hello", "world"])
-    assert len(vecs) == 2
-    assert len(vecs[0]) == EMBEDDING_DIM
+    assert vecs.shape == (2, EMBEDDING_DIM)
 
 
 @pytest.mark.slow
@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+from openai import BadRequestError, RateLimitError
+
+from libs.nlp.navigator import call_with_retry, retry_delay
+
+
+def _error(cls, status: int, headers: dict[str, str] | None = None):
+    request = httpx.Request("POST", "http://test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("failed", response=response, body=None)
+
+
+def test_retries_rate_limits_until_success():
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _error(RateLimitError, 429)
+        return "ok"
+
+    with patch("libs.nlp.navigator.time.sleep") as sleep:
+        assert call_with_retry(fn) == "ok"
+    assert len(calls) == 3
+    assert sleep.call_count == 2
+
+
+def test_gives_up_after_attempts_and_skips_non_retryable():
+    with patch("libs.nlp.navigator.time.sleep"), pytest.raises(RateLimitError):
+        call_with_retry(lambda: (_ for _ in ()).throw(_error(RateLimitError, 429)), attempts=2)
+
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise _error(BadRequestError, 400)
+
+    with pytest.raises(BadRequestError):
+        call_with_retry(bad_request)
+    assert len(calls) == 1
+
+
+def test_retry_delay_honors_retry_after():
+    assert retry_delay(_error(RateLimitError, 429, {"retry-after": "7"}), 0, 1.0, 30.0) == 7.0
+    assert retry_delay(_error(RateLimitError, 429, {"retry-after": "90"}), 0, 1.0, 30.0) == 30.0
+    assert 0 <= retry_delay(_error(RateLimitError, 429), 3, 1.0, 30.0) <= 8.0
+
+
+@pytest.mark.asyncio
+async def test_async_retry_until_success():
+    from unittest.mock import AsyncMock
+
+    from libs.nlp.navigator import acall_with_retry
+
+    fn = AsyncMock(side_effect=[_error(RateLimitError, 429, {"retry-after": "0"}), "ok"])
+    assert await acall_with_retry(fn) == "ok"
+    assert fn.await_count == 2
@@ -29,3 +29,11 @@ def test_set_updates():
     repo.set("checkpoint", "200", 2000)
     assert repo.get("checkpoint") == "200"
     conn.close()
+
+
+def test_delete():
+    conn, repo = _setup()
+    repo.set("checkpoint", "100", 1000)
+    repo.delete("checkpoint")
+    assert repo.get("checkpoint") is None
+    conn.close()
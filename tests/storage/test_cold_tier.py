@@ -0,0 +1,73 @@
+import glob
+import os
+
+import duckdb
+
+from libs.schemas.hn_item import HNItem
+from libs.storage.cold_tier import archive_items, cold_tier_dir, refresh_view
+from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.pipeline_queue_repository import NORMALIZE, PipelineQueueRepository
+from libs.storage.schema import init_schema
+
+_DAY = 86400
+_NOW = 1_717_200_000  # 2024-06-01
+
+
+def _setup(tmp_path):
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    repo = HNItemRepository(conn)
+    for i in range(1, 7):
+        # ids 1-4 are 100-103 days old, 5-6 are fresh
+        age = (100 + i) * _DAY if i <= 4 else _DAY
+        repo.upsert(HNItem(id=i, type="comment", parent=1, time=_NOW - age, text=f"t{i}"))
+    return conn, repo, str(tmp_path / "cold" / "hn_item")
+
+
+def test_cold_tier_dir():
+    assert cold_tier_dir(":memory:") is None
+    assert cold_tier_dir("data/dd.duckdb") == "data/dd.duckdb.cold/hn_item"
+
+
+def test_archive_moves_old_items_to_day_partitions(tmp_path):
+    conn, repo, root = _setup(tmp_path)
+
+    assert archive_items(conn, root, _NOW - 90 * _DAY, _NOW, batch_size=3) == 3
+    assert archive_items(conn, root, _NOW - 90 * _DAY, _NOW) == 1
+    assert archive_items(conn, root, _NOW - 90 * _DAY, _NOW) == 0
+
+    hot = [r[0] for r in conn.execute("SELECT id FROM hn_item ORDER BY id").fetchall()]
+    assert hot == [5, 6]
+    days = sorted(os.path.basename(d) for d in glob.glob(os.path.join(root, "*")))
+    assert len(days) == 4 and all(d.startswith("day=2024-02-") for d in days)
+    assert PipelineQueueRepository(conn).peek(NORMALIZE) == [5, 6]
+
+    rows = conn.execute(
+        'SELECT id, "text", kids FROM hn_item_all ORDER BY id',
+    ).fetchall()
+    assert [r[0] for r in rows] == [1, 2, 3, 4, 5, 6]
+    assert rows[0][1] == "t1"
+    conn.close()
+
+
+def test_view_prefers_hot_and_newest_copies(tmp_path):
+    conn, repo, root = _setup(tmp_path)
+    archive_items(conn, root, _NOW - 90 * _DAY, _NOW)
+
+    # re-harvested after archiving: the hot row wins
+    repo.upsert(HNItem(id=1, type="comment", time=_NOW - 101 * _DAY, text="edited"))
+    assert conn.execute('SELECT "text" FROM hn_item_all WHERE id = 1').fetchall() == [("edited",)]
+
+    # archived a second time: the newer copy wins
+    archive_items(conn, root, _NOW - 90 * _DAY, _NOW + 1)
+    assert conn.execute('SELECT "text" FROM hn_item_all WHERE id = 1').fetchall() == [("edited",)]
+    assert conn.execute("SELECT COUNT(*) FROM hn_item_all").fetchone() == (6,)
+    conn.close()
+
+
+def test_refresh_view_without_partitions(tmp_path):
+    conn, _repo, root = _setup(tmp_path)
+    refresh_view(conn, root)
+    refresh_view(conn, None)
+    assert conn.execute("SELECT COUNT(*) FROM hn_item_all").fetchone() == (6,)
+    conn.close()
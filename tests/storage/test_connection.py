@@ -1,7 +1,8 @@
 import tempfile
+import threading
 from pathlib import Path
 
-from libs.storage.connection import DuckDBConnection
+from libs.storage.connection import ConnectionManager, DuckDBConnection, get_manager
 
 
 def test_in_memory_connection():
@@ -50,3 +51,60 @@ def test_cursor_context_manager():
         row = cur.execute("SELECT x FROM t").fetchone()
         assert row == (42,)
     db.close()
+
+
+def test_manager_reader_is_per_thread():
+    manager = ConnectionManager()
+    main = manager.reader()
+    assert manager.reader() is main
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(manager.reader()))
+    t.start()
+    t.join()
+    assert other[0] is not main
+    manager.close()
+
+
+def test_manager_readers_share_database():
+    manager = ConnectionManager()
+    with manager.writer() as cur:
+        cur.execute("CREATE TABLE t (x INTEGER)")
+        cur.execute("INSERT INTO t VALUES (7)")
+
+    rows = []
+    t = threading.Thread(target=lambda: rows.extend(
+        manager.reader().execute("SELECT x FROM t").fetchall()
+    ))
+    t.start()
+    t.join()
+    assert rows == [(7,)]
+    manager.close()
+
+
+def test_manager_writer_serializes():
+    manager = ConnectionManager()
+    with manager.writer():
+        acquired = []
+        t = threading.Thread(
+            target=lambda: acquired.append(manager.write_lock.acquire(blocking=False)),
+        )
+        t.start()
+        t.join()
+        assert acquired == [False]
+    manager.close()
+
+
+def test_manager_reopens_after_close():
+    manager = ConnectionManager()
+    manager.reader().execute("SELECT 1")
+    manager.close()
+    assert manager.reader().execute("SELECT 2").fetchone() == (2,)
+    manager.close()
+
+
+def test_get_manager_is_process_wide():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "shared.duckdb")
+        assert get_manager(path) is get_manager(path)
+        get_manager(path).close()
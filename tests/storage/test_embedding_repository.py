@@ -1,4 +1,6 @@
 import duckdb
+import numpy as np
+import pytest
 
 from libs.schemas.embedding import Embedding
 from libs.storage.embedding_repository import EmbeddingRepository
@@ -41,3 +43,68 @@ def test_get_by_item_ids():
 def test_get_by_item_ids_empty():
     _, repo = _setup()
     assert repo.get_by_item_ids([]) == []
+
+
+def test_upsert_many():
+    conn, repo = _setup()
+    repo.upsert(Embedding(item_id=1, embedding=[0.0] * EMBEDDING_DIM, model_version="old"))
+    vecs = {i: [float(i) + j / EMBEDDING_DIM for j in range(EMBEDDING_DIM)] for i in (1, 2, 3)}
+    repo.upsert_many([
+        Embedding(item_id=i, embedding=v, model_version=f"v{i}") for i, v in vecs.items()
+    ])
+    for i, vec in vecs.items():
+        result = repo.get_by_item_id(i)
+        assert result is not None
+        assert result.model_version == f"v{i}"
+        assert result.embedding == pytest.approx(vec, abs=1e-5)
+    conn.close()
+
+
+def test_upsert_many_empty():
+    conn, repo = _setup()
+    repo.upsert_many([])
+    assert repo.get_by_item_ids([1]) == []
+    conn.close()
+
+
+def test_quantized_upsert_and_mixed_get_vectors():
+    from libs.storage.embedding_repository import EmbeddingRepository as Repo
+
+    conn, repo = _setup()
+    rng = np.random.default_rng(1)
+    vecs = rng.normal(size=(3, EMBEDDING_DIM)).astype(np.float32)
+    repo.upsert(Embedding(item_id=1, embedding=vecs[0].tolist(), model_version="v1"))
+    Repo(conn, encoding="float16").upsert(
+        Embedding(item_id=2, embedding=vecs[1].tolist(), model_version="v1"),
+    )
+    Repo(conn, encoding="int8").upsert_vectors(np.array([3]), vecs[2:], ["v1"])
+
+    ids, matrix = repo.get_vectors([3, 1, 2, 99])
+    assert ids.tolist() == [1, 2, 3]
+    assert matrix.dtype == np.float32
+    np.testing.assert_allclose(matrix, vecs, atol=0.05)
+
+    fetched = repo.get_by_item_id(3)
+    assert fetched is not None
+    assert len(fetched.embedding) == EMBEDDING_DIM
+    conn.close()
+
+
+def test_migrate_embedding_encoding():
+    from libs.storage.embedding_repository import migrate_embedding_encoding
+
+    conn, repo = _setup()
+    vecs = np.random.default_rng(2).normal(size=(5, EMBEDDING_DIM)).astype(np.float32)
+    repo.upsert_vectors(np.arange(5), vecs, ["v1"] * 5)
+
+    assert migrate_embedding_encoding(conn, "int8", batch_size=2) == 5
+    assert conn.execute(
+        "SELECT COUNT(*) FROM embedding WHERE embedding IS NULL AND \"encoding\" = 'int8'"
+    ).fetchone()[0] == 5
+    assert migrate_embedding_encoding(conn, "int8") == 0  # idempotent
+
+    assert migrate_embedding_encoding(conn, "float32") == 5
+    ids, matrix = repo.get_vectors(list(range(5)))
+    np.testing.assert_allclose(matrix, vecs, atol=0.05)
+    assert repo.get_by_item_id(0).model_version == "v1"
+    conn.close()
@@ -1,7 +1,8 @@
 import duckdb
 
 from libs.schemas.hn_item import HNItem
-from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.hn_item_repository import HNItemRepository, ThreadShape
+from libs.storage.pipeline_queue_repository import NORMALIZE, SENTIMENT, PipelineQueueRepository
 from libs.storage.schema import init_schema
 
 
@@ -84,3 +85,76 @@ def test_kids_array():
     assert result is not None
     assert result.kids == [10, 20, 30]
     conn.close()
+
+
+def test_upsert_many():
+    conn, repo = _setup()
+    repo.upsert(HNItem(id=1, type="story", title="v1", score=10))
+    repo.upsert_many([
+        HNItem(id=1, score=42),
+        HNItem(id=2, type="comment", parent=1, text="hi"),
+        HNItem(id=3, type="story", kids=[10, 20]),
+    ])
+    first = repo.get_by_id(1)
+    assert first is not None
+    assert first.score == 42
+    assert first.title == "v1"  # preserved via COALESCE
+    assert repo.get_by_id(2).text == "hi"
+    assert repo.get_by_id(3).kids == [10, 20]
+    conn.close()
+
+
+def test_upsert_many_merges_duplicate_ids():
+    conn, repo = _setup()
+    repo.upsert_many([
+        HNItem(id=1, type="story", title="v1", score=10),
+        HNItem(id=1, score=42),
+    ])
+    result = repo.get_by_id(1)
+    assert result is not None
+    assert result.score == 42
+    assert result.title == "v1"
+    conn.close()
+
+
+def test_upsert_many_empty():
+    conn, repo = _setup()
+    repo.upsert_many([])
+    assert repo.get_recent() == []
+    conn.close()
+
+
+def test_get_thread_shapes():
+    conn, repo = _setup()
+    repo.upsert_many([
+        HNItem(id=1, type="story"),
+        HNItem(id=2, type="comment", by="a", parent=1),
+        HNItem(id=3, type="comment", by="b", parent=2),
+        HNItem(id=4, type="comment", parent=1, deleted=True),
+        HNItem(id=5, type="comment", by="c", parent=3, dead=True),
+        HNItem(id=6, type="story"),
+    ])
+    shapes = repo.get_thread_shapes([1, 6, 99])
+    assert shapes == {
+        1: ThreadShape(2, {2, 4}, {1, 2, 3, 4, 5}, {1: {2, 4}, 2: {3}, 3: {5}}),
+        6: ThreadShape(0, set(), {6}, {}),
+    }
+    conn.close()
+
+
+def test_items_before_enqueue_since_are_stored_but_not_queued():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    repo = HNItemRepository(conn, enqueue_since=1000)
+    repo.upsert_many([
+        HNItem(id=1, type="comment", text="old edit", time=500),
+        HNItem(id=2, type="comment", text="new", time=1500),
+        HNItem(id=3, type="comment", text_clean="old clean", time=500),
+        HNItem(id=4, type="comment", text="no time"),
+    ])
+
+    queue = PipelineQueueRepository(conn)
+    assert sorted(queue.peek(NORMALIZE)) == [2, 4]
+    assert queue.peek(SENTIMENT) == []
+    assert repo.get_by_id(1).text == "old edit"
+    conn.close()
@@ -0,0 +1,71 @@
+import duckdb
+import numpy as np
+
+from libs.schemas.opinion_signal import OpinionSignal
+from libs.storage.inference_cache_repository import InferenceCacheRepository
+from libs.storage.schema import EMBEDDING_DIM, init_schema
+
+
+def _setup() -> tuple[duckdb.DuckDBPyConnection, InferenceCacheRepository]:
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    return conn, InferenceCacheRepository(conn)
+
+
+def test_embeddings_roundtrip_per_model_version():
+    conn, repo = _setup()
+    vectors = np.random.default_rng(0).normal(size=(2, EMBEDDING_DIM)).astype(np.float32)
+    repo.put_embeddings(["h1", "h2"], vectors, "m1", created_at=10)
+
+    found = repo.get_embeddings(["h1", "h2", "h3"], "m1")
+    assert set(found) == {"h1", "h2"}
+    np.testing.assert_allclose(found["h2"], vectors[1])
+    assert repo.get_embeddings(["h1"], "m2") == {}
+    assert repo.get_embeddings([], "m1") == {}
+    conn.close()
+
+
+def test_embeddings_overwrite():
+    conn, repo = _setup()
+    repo.put_embeddings(["h1"], np.zeros((1, EMBEDDING_DIM)), "m1", created_at=1)
+    repo.put_embeddings(["h1"], np.ones((1, EMBEDDING_DIM)), "m1", created_at=2)
+    assert repo.get_embeddings(["h1"], "m1")["h1"][0] == 1.0
+    conn.close()
+
+
+def test_embeddings_cached_in_configured_encoding():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    vectors = np.random.default_rng(1).normal(size=(2, EMBEDDING_DIM)).astype(np.float32)
+    InferenceCacheRepository(conn, encoding="int8").put_embeddings(
+        ["h1", "h2"], vectors, "m1", created_at=1,
+    )
+    InferenceCacheRepository(conn).put_embeddings(["h3"], vectors[:1], "m1", created_at=1)
+
+    rows = conn.execute(
+        'SELECT content_hash, "encoding", embedding IS NULL, octet_length(quantized) '
+        "FROM embedding_cache ORDER BY content_hash"
+    ).fetchall()
+    assert rows == [
+        ("h1", "int8", True, EMBEDDING_DIM),
+        ("h2", "int8", True, EMBEDDING_DIM),
+        ("h3", "float32", False, None),
+    ]
+
+    # reads decode whatever encoding each entry was written in
+    found = InferenceCacheRepository(conn).get_embeddings(["h1", "h2", "h3"], "m1")
+    np.testing.assert_allclose(found["h2"], vectors[1], atol=np.abs(vectors[1]).max() / 127)
+    np.testing.assert_array_equal(found["h3"], vectors[0])
+    conn.close()
+
+def test_sentiments_roundtrip():
+    conn, repo = _setup()
+    repo.put_sentiments(
+        ["h1"], [OpinionSignal(item_id=9, valence=40.0, label="positive")], "s1", created_at=5,
+    )
+    found = repo.get_sentiments(["h1", "h2"], "s1")
+    assert list(found) == ["h1"]
+    assert found["h1"].valence == 40.0
+    assert found["h1"].item_id == 0
+    assert repo.get_sentiments(["h1"], "s2") == {}
+    conn.close()
@@ -39,3 +39,18 @@ def test_upsert_updates_weight():
     assert len(edges) == 1
     assert edges[0].weight == 0.9
     conn.close()
+
+
+def test_upsert_many():
+    conn, repo = _setup()
+    repo.upsert(ItemMetricEdge(item_id=1, node_id="n1", weight=0.5))
+    repo.upsert_many([
+        ItemMetricEdge(item_id=1, node_id="n1", weight=0.9, created_at=10),
+        ItemMetricEdge(item_id=1, node_id="n2", weight=0.1, created_at=10),
+        ItemMetricEdge(item_id=2, node_id="n1", weight=0.3, created_at=10),
+    ])
+    edges = {e.node_id: e for e in repo.get_edges_for_item(1)}
+    assert edges["n1"].weight == 0.9
+    assert edges["n2"].weight == 0.1
+    assert len(repo.get_edges_for_node("n1")) == 2
+    conn.close()
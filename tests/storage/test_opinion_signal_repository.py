@@ -62,3 +62,18 @@ def test_get_recent():
     assert len(results) == 3
     assert results[0].item_id == 5  # desc order
     conn.close()
+
+
+def test_upsert_many():
+    conn, repo = _setup()
+    repo.upsert(OpinionSignal(item_id=1, valence=50.0, label="positive"))
+    repo.upsert_many([
+        OpinionSignal(item_id=1, valence=-10.0, label="negative", analyzed_at=5),
+        OpinionSignal(item_id=2, valence=20.0, label="positive", analyzed_at=5),
+    ])
+    first = repo.get_by_item_id(1)
+    assert first is not None
+    assert first.valence == -10.0
+    assert first.analyzed_at == 5
+    assert len(repo.get_by_item_ids([1, 2])) == 2
+    conn.close()
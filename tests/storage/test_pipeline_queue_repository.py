@@ -0,0 +1,112 @@
+import duckdb
+
+from libs.schemas.hn_item import HNItem
+from libs.storage.hn_item_repository import HNItemRepository
+from libs.storage.pipeline_queue_repository import (
+    MAPPING,
+    MODERATE,
+    NORMALIZE,
+    SENTIMENT,
+    PipelineQueueRepository,
+)
+from libs.storage.schema import init_schema
+
+
+def _setup():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    return conn, PipelineQueueRepository(conn)
+
+
+def test_enqueue_is_idempotent_and_complete_is_bulk():
+    conn, queue = _setup()
+    queue.enqueue([MODERATE, SENTIMENT], [1, 2, 3], 100)
+    queue.enqueue([MODERATE], [3, 4], 200)
+    assert queue.pending(MODERATE) == 4
+    assert queue.pending(SENTIMENT) == 3
+
+    queue.complete(MODERATE, [1, 3, 99])
+    assert queue.peek(MODERATE) == [2, 4]
+    assert queue.peek(SENTIMENT) == [1, 2, 3]
+    queue.complete(MODERATE, [])
+    conn.close()
+
+
+def test_advance_queues_each_stage_after_the_last():
+    conn, queue = _setup()
+    queue.enqueue([NORMALIZE], [1, 2])
+
+    queue.advance(NORMALIZE, [1, 2], [1, 2])
+    assert queue.pending(NORMALIZE) == 0
+    assert queue.peek(MODERATE) == [1, 2]
+    assert queue.pending(SENTIMENT) == 0  # not until moderation passes them
+
+    queue.advance(MODERATE, [1, 2], [2])  # item 1 blocked
+    assert queue.pending(MODERATE) == 0
+    assert queue.peek(SENTIMENT) == queue.peek(MAPPING) == [2]
+
+    queue.advance(SENTIMENT, [2])  # last stage: nothing further to queue
+    assert queue.pending(SENTIMENT) == 0
+    assert queue.peek(MAPPING) == [2]
+    conn.close()
+
+
+def test_fail_reports_items_out_of_attempts():
+    conn, queue = _setup()
+    queue.enqueue([SENTIMENT], [1, 2])
+    assert queue.fail(SENTIMENT, [1, 2], 2) == []
+    assert queue.fail(SENTIMENT, [2], 2) == [2]
+    assert queue.fail(SENTIMENT, [], 2) == []
+    assert queue.peek(SENTIMENT) == [1, 2]  # the stage decides what to do with them
+    conn.close()
+
+
+def test_item_upserts_queue_their_next_stage():
+    conn, queue = _setup()
+    repo = HNItemRepository(conn)
+    repo.upsert_many([
+        HNItem(id=1, type="comment", text="raw"),
+        HNItem(id=2, type="story", title="no text"),
+        HNItem(id=3, type="comment", text_clean="already clean"),
+    ])
+    assert queue.peek(NORMALIZE) == [1]
+    assert queue.peek(MODERATE) == [3]
+    assert queue.pending(SENTIMENT) == queue.pending(MAPPING) == 0
+
+    # re-harvesting a cleaned item does not queue it again
+    conn.execute("UPDATE hn_item SET text_clean = 'raw' WHERE id = 1")
+    queue.complete(NORMALIZE, [1])
+    repo.upsert(HNItem(id=1, type="comment", text="raw", score=5))
+    assert queue.pending(NORMALIZE) == 0
+    conn.close()
+
+
+def test_schema_seeds_queue_for_existing_databases():
+    conn, queue = _setup()
+    HNItemRepository(conn).upsert_many([
+        HNItem(id=1, type="comment", text_clean="clean"),
+        HNItem(id=2, type="comment", text_clean="unmoderated"),
+        HNItem(id=3, type="comment", text_clean="blocked"),
+    ])
+    conn.execute(
+        "INSERT INTO moderation_flag (item_id, status) VALUES (1, 'clean'), (3, 'blocked')"
+    )
+    conn.execute("INSERT INTO opinion_signal (item_id) VALUES (1)")
+    conn.execute("DROP TABLE pipeline_queue")
+
+    init_schema(conn)
+    assert queue.peek(MODERATE) == [2]
+    assert queue.peek(MAPPING) == [1]
+    assert queue.pending(SENTIMENT) == 0  # already analyzed
+    conn.close()
+
+
+def test_schema_drops_nlp_rows_queued_ahead_of_moderation():
+    conn, queue = _setup()
+    HNItemRepository(conn).upsert(HNItem(id=1, type="comment", text_clean="unmoderated"))
+    queue.enqueue([SENTIMENT, MAPPING], [1])
+
+    init_schema(conn)
+    assert queue.peek(MODERATE) == [1]
+    assert queue.pending(SENTIMENT) == queue.pending(MAPPING) == 0
+    conn.close()
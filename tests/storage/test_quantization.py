@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from libs.storage.quantization import dequantize, quantize
+
+
+@pytest.mark.parametrize(("encoding", "nbytes", "tol"), [("float16", 2, 1e-3), ("int8", 1, 1e-2)])
+def test_roundtrip_within_tolerance(encoding, nbytes, tol):
+    matrix = np.random.default_rng(0).normal(size=(5, 64)).astype(np.float32)
+    matrix[2] = 0.0
+    blobs, scales = quantize(matrix, encoding)
+    assert all(len(b) == 64 * nbytes for b in blobs)
+
+    decoded = dequantize(blobs, scales, encoding, 64)
+    assert decoded.dtype == np.float32
+    peaks = np.abs(matrix).max(axis=1, keepdims=True) + 1e-9
+    assert np.max(np.abs(decoded - matrix) / peaks) < tol
+    assert not decoded[2].any()
+
+
+def test_rejects_unknown_and_native_encodings():
+    with pytest.raises(ValueError):
+        quantize(np.zeros((1, 4)), "bf16")
+    with pytest.raises(ValueError):
+        quantize(np.zeros((1, 4)), "float32")
+    assert dequantize([], [], "int8", 4).shape == (0, 4)
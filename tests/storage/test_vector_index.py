@@ -0,0 +1,164 @@
+import os
+import threading
+
+import duckdb
+import numpy as np
+
+from libs.schemas.embedding import Embedding
+from libs.storage.embedding_repository import EmbeddingRepository
+from libs.storage.schema import EMBEDDING_DIM, init_schema
+from libs.storage.vector_index import VectorIndex, index_path
+
+
+def _vectors(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def _exact_top(matrix: np.ndarray, query: np.ndarray, k: int) -> list[int]:
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.argsort(-(unit @ (query / np.linalg.norm(query))))[:k].tolist()
+
+
+def test_exact_search_before_training():
+    data = _vectors(50)
+    index = VectorIndex(dim=16)
+    index.add(list(range(50)), data)
+    assert not index.is_trained
+
+    hits = index.search(data[7], k=5)
+    assert [item_id for item_id, _ in hits] == _exact_top(data, data[7], 5)
+    # scores are cosines against the int8 codes, so within quantization error
+    assert hits[0] == (7, hits[0][1]) and abs(hits[0][1] - 1.0) < 1e-3
+
+
+def test_add_replaces_and_remove_compacts():
+    index = VectorIndex(dim=2)
+    index.add([1, 2, 3], np.array([[1, 0], [0, 1], [1, 1]], dtype=np.float32))
+    index.add([1], np.array([[0, 1]], dtype=np.float32))
+    assert len(index) == 3
+    assert index.search([0, 1], k=2)[0][1] > 0.999
+
+    index.remove([1, 99])
+    assert len(index) == 2
+    assert {item_id for item_id, _ in index.search([1, 0], k=10)} == {2, 3}
+
+
+def test_trained_index_recall():
+    rng = np.random.default_rng(0)
+    topics = rng.normal(size=(40, 32))
+    noise = 0.3 * rng.normal(size=(5000, 32))
+    data = (topics[rng.integers(0, 40, 5000)] + noise).astype(np.float32)
+    index = VectorIndex(dim=32)
+    index.add(list(range(5000)), data)
+    index._trainer.join(10)  # training runs off the write path
+    assert index.is_trained
+    assert index._codes.dtype == np.int8
+
+    queries = data[rng.integers(0, 5000, 20)] + 0.1 * rng.normal(size=(20, 32))
+    recall = np.mean([
+        len({i for i, _ in index.search(q, k=10)} & set(_exact_top(data, q, 10))) / 10
+        for q in queries
+    ])
+    assert recall >= 0.8
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "db.duckdb.vectors.npz")
+    data = _vectors(30)
+    index = VectorIndex(dim=16, path=path)
+    index.add(list(range(100, 130)), data)
+    index.save()
+
+    loaded = VectorIndex.load(path, dim=16)
+    assert len(loaded) == 30
+    assert loaded.search(data[3], k=1)[0][0] == 103
+    assert index_path(":memory:") is None
+
+
+def test_save_appends_changes_and_load_replays_them(tmp_path):
+    path = str(tmp_path / "db.duckdb.vectors.npz")
+    data = _vectors(40)
+    index = VectorIndex(dim=16, path=path)
+    index.add(list(range(40)), data)
+    index.save()
+    snapshot = os.path.getsize(path)
+
+    index.add([5], data[[9]])
+    index.remove([7])
+    index.add([99], data[[20]])
+    index.save()
+
+    # only the changed rows were written, to the log
+    assert os.path.getsize(path) == snapshot
+    assert os.path.exists(f"{path}.1.log")
+    loaded = VectorIndex.load(path, dim=16)
+    assert len(loaded) == 40
+    assert loaded.search(data[9], k=2)[0][0] in {5, 9}
+    assert {i for i, _ in loaded.search(data[20], k=2)} == {20, 99}
+    assert 7 not in {i for i, _ in loaded.search(data[7], k=40)}
+
+
+def test_retrain_rewrites_snapshot(tmp_path):
+    path = str(tmp_path / "db.duckdb.vectors.npz")
+    data = _vectors(200)
+    index = VectorIndex(dim=16, path=path)
+    index.add(list(range(200)), data)
+    index.save()
+    index.train()
+    index.save()
+
+    assert not os.path.exists(f"{path}.1.log")
+    loaded = VectorIndex.load(path, dim=16)
+    assert loaded.is_trained
+    assert loaded.search(data[42], k=1)[0][0] == 42
+
+
+def test_writes_during_training_are_reassigned():
+    data = _vectors(400)
+    index = VectorIndex(dim=16)
+    index.add(list(range(200)), data[:200])
+
+    started, release = threading.Event(), threading.Event()
+    nearest = index._nearest
+
+    def paused_nearest(codes, centroids):
+        if threading.current_thread() is index._trainer and not started.is_set():
+            started.set()  # clustering is done; hold before the swap
+            release.wait(10)
+        return nearest(codes, centroids)
+
+    index._nearest = paused_nearest
+    index._train_in_background()
+    assert started.wait(10)
+    index.add(list(range(200, 300)), data[200:300])
+    index.add([100], data[[350]])
+    index.remove([0])
+    release.set()
+    index._trainer.join(10)
+
+    assert index.is_trained and len(index) == 299
+    assert index.search(data[250], k=1)[0][0] == 250
+    assert index.search(data[350], k=1)[0][0] == 100
+    assert 0 not in {i for i, _ in index.search(data[0], k=10)}
+
+
+def test_repository_keeps_index_current_and_sync_catches_up():
+    conn = duckdb.connect(":memory:")
+    init_schema(conn)
+    data = _vectors(6, dim=EMBEDDING_DIM)
+    EmbeddingRepository(conn).upsert_many([  # written without an index
+        Embedding(item_id=i, embedding=data[i].tolist(), model_version="v1") for i in range(3)
+    ])
+
+    index = VectorIndex()
+    assert index.sync(conn) == 3
+    repo = EmbeddingRepository(conn, index=index)
+    repo.upsert_many([
+        Embedding(item_id=i, embedding=data[i].tolist(), model_version="v1") for i in range(3, 5)
+    ])
+    repo.upsert(Embedding(item_id=5, embedding=data[5].tolist(), model_version="v1"))
+
+    assert len(index) == 6
+    assert index.sync(conn) == 0
+    assert repo.search(data[4].tolist(), k=1)[0][0] == 4
+    conn.close()
@@ -82,3 +82,69 @@ def test_remove_expired():
     assert len(active) == 1
     assert active[0].story_id == 3
     conn.close()
+
+
+def test_upsert_many():
+    conn, repo = _setup()
+    repo.upsert(WatchlistEntry(story_id=1, priority_score=1.0, ttl_expires=5000, last_fetched=10))
+    repo.upsert_many([
+        WatchlistEntry(story_id=1, priority_score=9.0, ttl_expires=6000),
+        WatchlistEntry(story_id=2, priority_score=3.0, ttl_expires=6000),
+        WatchlistEntry(story_id=2, priority_score=4.0, ttl_expires=6000),
+    ])
+    active = {e.story_id: e for e in repo.get_active(now_ts=0)}
+    assert (active[1].priority_score, active[1].last_fetched) == (9.0, 10)
+    assert active[2].priority_score == 4.0
+    conn.close()
+
+
+def test_get_due_orders_by_next_poll():
+    conn, repo = _setup()
+    for story_id, priority in [(1, 1.0), (2, 9.0), (3, 5.0), (4, 7.0)]:
+        repo.upsert(WatchlistEntry(story_id=story_id, priority_score=priority, ttl_expires=5000))
+    repo.record_poll(1, now_ts=900, next_poll=950, comment_rate=0.1, descendants=10)
+    repo.record_poll(2, now_ts=900, next_poll=2000, comment_rate=0.0, descendants=3)
+    repo.upsert(WatchlistEntry(story_id=4, priority_score=7.0, ttl_expires=500))  # expired
+    due = repo.get_due(now_ts=1000)
+    # never-polled entries are due at 0, ahead of story 1; story 2 is not due
+    assert [e.story_id for e in due] == [3, 1]
+    assert due[1].last_descendants == 10
+    conn.close()
+
+
+def test_record_poll_keeps_active_threads():
+    conn, repo = _setup()
+    repo.upsert(WatchlistEntry(story_id=1, ttl_expires=5000))
+    repo.record_poll(1, now_ts=100, next_poll=200, comment_rate=0.1, descendants=4,
+                     keep_until=9000)
+    repo.record_poll(1, now_ts=200, next_poll=400, comment_rate=0.1, descendants=None)
+    entry = repo.get_active(now_ts=0)[0]
+    assert (entry.ttl_expires, entry.last_descendants, entry.last_fetched) == (9000, 4, 200)
+    conn.close()
+
+
+def test_get_due_serves_live_lane_before_backfill():
+    conn, repo = _setup()
+    repo.upsert_many([
+        WatchlistEntry(story_id=i, priority_score=500.0, ttl_expires=5000, next_poll=100,
+                       lane="backfill")
+        for i in range(10, 20)
+    ])
+    repo.upsert(WatchlistEntry(story_id=1, priority_score=1.0, ttl_expires=5000, next_poll=990))
+    repo.upsert(WatchlistEntry(story_id=2, priority_score=50.0, ttl_expires=5000, next_poll=990))
+    due = repo.get_due(now_ts=1000, limit=3)
+    assert [e.story_id for e in due][:2] == [2, 1]
+    assert due[2].lane == "backfill"
+    conn.close()
+
+
+def test_upsert_keeps_schedule_and_promotes_to_live():
+    conn, repo = _setup()
+    repo.upsert(WatchlistEntry(story_id=1, ttl_expires=5000, next_poll=100, lane="backfill"))
+    repo.record_poll(1, now_ts=100, next_poll=700, comment_rate=0.1, descendants=4)
+    repo.upsert(WatchlistEntry(story_id=1, ttl_expires=5000, next_poll=200))
+    entry = repo.get_active(now_ts=0)[0]
+    assert (entry.next_poll, entry.lane) == (700, "live")
+    repo.upsert_many([WatchlistEntry(story_id=1, ttl_expires=5000, lane="backfill")])
+    assert repo.get_active(now_ts=0)[0].lane == "live"
+    conn.close()